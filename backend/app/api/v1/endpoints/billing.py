@@ -1,10 +1,15 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Header, Query
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, Header, Query, Request
+from fastapi.responses import Response
 from sqlalchemy.orm import Session
 
 from app.common.api import PaginationParams, build_paginated_response, pagination_params
+from app.common.downloads import (
+    document_file_response,
+    is_not_modified,
+    not_modified_response,
+)
 from app.db.session import get_db
 from app.schemas.billing import (
     BillingRunRequest,
@@ -71,13 +76,18 @@ def get_invoice_endpoint(
 @router.get("/invoices/{invoice_id}/pdf")
 def download_invoice_pdf_endpoint(
     invoice_id: str,
+    request: Request,
     db: Annotated[Session, Depends(get_db)],
-) -> FileResponse:
+) -> Response:
+    invoice = get_invoice(db, invoice_id)
+    if invoice.pdf_sha256 and is_not_modified(request, invoice.pdf_sha256):
+        return not_modified_response(invoice.pdf_sha256)
     invoice = get_invoice_for_download(db, invoice_id)
     if not invoice.pdf_file_path or not invoice.pdf_file_name:
         raise RuntimeError("Invoice PDF metadata missing after generation")
-    return FileResponse(
+    return document_file_response(
         path=invoice.pdf_file_path,
         media_type="application/pdf",
         filename=invoice.pdf_file_name,
+        sha256=invoice.pdf_sha256,
     )
@@ -1,3 +1,4 @@
+from datetime import date
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, Header, Query, Request
@@ -7,11 +8,16 @@ from app.common.api import PaginationParams, build_paginated_response, paginatio
 from app.common.auth import get_auth_context
 from app.db.session import get_db
 from app.schemas.collections import (
+    ClientPaymentAllocationResult,
+    ClientPaymentCreate,
+    CollectionAgingSnapshotRead,
     CollectionCaseActionCreate,
     CollectionCaseActionRead,
     CollectionCaseRead,
     CollectionCaseStatusUpdate,
     CollectionOverviewRead,
+    DunningRunRequest,
+    DunningRunResult,
     InvoicePaymentApprovalRequest,
     PaymentAllocationResult,
     PaymentCreate,
@@ -21,10 +27,13 @@ from app.services.collections_service import (
     approve_invoice_paid,
     build_collections_overview,
     create_collection_case_action,
+    list_aging_snapshots,
     list_collection_case_actions,
     list_collection_cases,
     list_payments,
+    record_client_payment,
     record_payment,
+    run_dunning,
     update_collection_case_status,
 )
 
@@ -47,6 +56,27 @@ def record_payment_endpoint(
     )
 
 
+@router.post(
+    "/collections/clients/{client_id}/payments",
+    response_model=ClientPaymentAllocationResult,
+)
+def record_client_payment_endpoint(
+    client_id: str,
+    payload: ClientPaymentCreate,
+    request: Request,
+    idempotency_key: Annotated[str, Header(alias="Idempotency-Key")],
+    db: Annotated[Session, Depends(get_db)],
+) -> ClientPaymentAllocationResult:
+    auth_context = get_auth_context(request)
+    return record_client_payment(
+        db,
+        client_id=client_id,
+        payload=payload,
+        idempotency_key=idempotency_key,
+        actor_id=auth_context.actor_id,
+    )
+
+
 @router.post(
     "/collections/invoices/{invoice_id}/approve-paid",
     response_model=PaymentAllocationResult,
@@ -149,8 +179,30 @@ def create_collection_case_action_endpoint(
     return CollectionCaseActionRead.model_validate(record)
 
 
+@router.post("/collections/dunning/runs", response_model=DunningRunResult)
+def run_dunning_endpoint(
+    payload: DunningRunRequest,
+    request: Request,
+    db: Annotated[Session, Depends(get_db)],
+) -> DunningRunResult:
+    auth_context = get_auth_context(request)
+    return run_dunning(db, payload=payload, actor_id=auth_context.actor_id)
+
+
 @router.get("/collections/overview", response_model=CollectionOverviewRead)
 def collections_overview_endpoint(
     db: Annotated[Session, Depends(get_db)],
 ) -> CollectionOverviewRead:
     return build_collections_overview(db)
+
+
+@router.get(
+    "/collections/overview/history",
+    response_model=list[CollectionAgingSnapshotRead],
+)
+def collections_overview_history_endpoint(
+    db: Annotated[Session, Depends(get_db)],
+    date_from: Annotated[date | None, Query()] = None,
+    date_to: Annotated[date | None, Query()] = None,
+) -> list[CollectionAgingSnapshotRead]:
+    return list_aging_snapshots(db, date_from=date_from, date_to=date_to)
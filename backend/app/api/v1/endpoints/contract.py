@@ -1,26 +1,38 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.orm import Session
 
 from app.common.api import PaginationParams, build_paginated_response, pagination_params
-from app.common.auth import get_auth_context
+from app.common.auth import AuthContext, get_auth_context, require_roles
 from app.db.session import get_db
 from app.schemas.contract import (
     ContractAuditEventRead,
+    ContractBatchProvisionRequest,
+    ContractBatchProvisionResult,
+    ContractBulkStatusResult,
+    ContractBulkStatusUpdate,
     ContractCreate,
     ContractOfferUpdate,
     ContractProvisionRequest,
     ContractProvisionResult,
     ContractRead,
+    ContractScheduledEventCreate,
+    ContractScheduledEventRead,
     ContractStatusUpdate,
 )
 from app.services.contract_service import (
+    bulk_update_contract_status,
+    cancel_contract_scheduled_event,
     create_contract,
     get_contract,
     list_contract_audit_events,
+    list_contract_scheduled_events,
     list_contracts,
     provision_contract,
+    provision_contracts_batch,
+    schedule_contract_event,
+    search_contract_audit_events,
     update_contract_offer,
     update_contract_status,
 )
@@ -48,6 +60,25 @@ def provision_contract_endpoint(
     )
 
 
+@router.post("/contracts/provision/batch", response_model=ContractBatchProvisionResult)
+def provision_contracts_batch_endpoint(
+    payload: ContractBatchProvisionRequest,
+    request: Request,
+    db: Annotated[Session, Depends(get_db)],
+) -> ContractBatchProvisionResult:
+    auth_context = get_auth_context(request)
+    return provision_contracts_batch(db, payload, actor_id=auth_context.actor_id)
+
+
+@router.post("/contracts/status/bulk", response_model=ContractBulkStatusResult)
+def bulk_update_contract_status_endpoint(
+    payload: ContractBulkStatusUpdate,
+    auth_context: Annotated[AuthContext, Depends(require_roles(["admin"]))],
+    db: Annotated[Session, Depends(get_db)],
+) -> ContractBulkStatusResult:
+    return bulk_update_contract_status(db, payload, actor_id=auth_context.actor_id)
+
+
 @router.post("/contracts", response_model=ContractRead)
 def create_contract_endpoint(
     payload: ContractCreate,
@@ -68,6 +99,34 @@ def list_contracts_endpoint(
     return build_paginated_response(data=data, params=params, total=total)
 
 
+@router.get("/contracts/audit")
+def search_contract_audit_events_endpoint(
+    params: Annotated[PaginationParams, Depends(pagination_params)],
+    db: Annotated[Session, Depends(get_db)],
+    event_type: Annotated[str | None, Query()] = None,
+    actor_id: Annotated[str | None, Query()] = None,
+    from_offer_id: Annotated[str | None, Query()] = None,
+    to_offer_id: Annotated[str | None, Query()] = None,
+) -> dict[str, object]:
+    details = {
+        key: value
+        for key, value in (("from_offer_id", from_offer_id), ("to_offer_id", to_offer_id))
+        if value
+    }
+    records, total = search_contract_audit_events(
+        db,
+        page=params.page,
+        size=params.size,
+        event_type=event_type,
+        actor_id=actor_id,
+        details=details,
+    )
+    data = [
+        ContractAuditEventRead.model_validate(record).model_dump(mode="json") for record in records
+    ]
+    return build_paginated_response(data=data, params=params, total=total)
+
+
 @router.get("/contracts/{contract_id}", response_model=ContractRead)
 def get_contract_endpoint(
     contract_id: str,
@@ -109,3 +168,52 @@ def list_contract_audit_events_endpoint(
 ) -> list[ContractAuditEventRead]:
     records = list_contract_audit_events(db, contract_id)
     return [ContractAuditEventRead.model_validate(record) for record in records]
+
+
+@router.get(
+    "/contracts/{contract_id}/scheduled-events",
+    response_model=list[ContractScheduledEventRead],
+)
+def list_contract_scheduled_events_endpoint(
+    contract_id: str,
+    db: Annotated[Session, Depends(get_db)],
+) -> list[ContractScheduledEventRead]:
+    records = list_contract_scheduled_events(db, contract_id)
+    return [ContractScheduledEventRead.model_validate(record) for record in records]
+
+
+@router.post(
+    "/contracts/{contract_id}/scheduled-events",
+    response_model=ContractScheduledEventRead,
+)
+def schedule_contract_event_endpoint(
+    contract_id: str,
+    payload: ContractScheduledEventCreate,
+    request: Request,
+    db: Annotated[Session, Depends(get_db)],
+) -> ContractScheduledEventRead:
+    auth_context = get_auth_context(request)
+    return ContractScheduledEventRead.model_validate(
+        schedule_contract_event(db, contract_id, payload, actor_id=auth_context.actor_id),
+    )
+
+
+@router.delete(
+    "/contracts/{contract_id}/scheduled-events/{event_id}",
+    response_model=ContractScheduledEventRead,
+)
+def cancel_contract_scheduled_event_endpoint(
+    contract_id: str,
+    event_id: str,
+    request: Request,
+    db: Annotated[Session, Depends(get_db)],
+) -> ContractScheduledEventRead:
+    auth_context = get_auth_context(request)
+    return ContractScheduledEventRead.model_validate(
+        cancel_contract_scheduled_event(
+            db,
+            contract_id,
+            event_id,
+            actor_id=auth_context.actor_id,
+        ),
+    )
@@ -1,18 +1,44 @@
+import io
+import tempfile
+from datetime import datetime
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app.common.api import PaginationParams, build_paginated_response, pagination_params
+from app.common.auth import AuthContext, require_roles
+from app.common.errors import ApiException
 from app.db.session import get_db
 from app.schemas.customer import (
     ClientCreate,
+    ClientPurgeResult,
     ClientRead,
+    ClientSearchResult,
     ClientUpdate,
+    CustomerImportFormat,
+    CustomerImportResult,
     SubscriberCreate,
     SubscriberRead,
     SubscriberUpdate,
 )
+from app.schemas.customer_overview import ClientOverviewRead
+from app.services.client_search_service import (
+    CLIENT_SEARCH_LIMIT,
+    CLIENT_SEARCH_LIMIT_MAX,
+    CLIENT_SEARCH_MIN_QUERY_LENGTH,
+    search_clients,
+)
+from app.services.customer_import_service import (
+    CUSTOMER_IMPORT_DECODE_ERRORS,
+    import_customers,
+)
+from app.services.customer_overview_service import (
+    CUSTOMER_OVERVIEW_INVOICE_LIMIT,
+    CUSTOMER_OVERVIEW_INVOICE_LIMIT_MAX,
+    get_client_overview,
+)
 from app.services.customer_service import (
     create_client,
     create_subscriber,
@@ -21,12 +47,21 @@ from app.services.customer_service import (
     get_subscriber,
     list_clients,
     list_subscribers_by_client,
+    purge_prospect_clients,
     update_client,
     update_subscriber,
 )
 
 router = APIRouter(tags=["customer"])
 
+CUSTOMER_IMPORT_MEDIA_TYPES: dict[str, CustomerImportFormat] = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+}
+# Uploads larger than this spill from memory to a temporary file on disk.
+CUSTOMER_IMPORT_SPOOL_BYTES = 1024 * 1024
+
 
 @router.post("/customers", response_model=ClientRead)
 def create_client_endpoint(
@@ -46,6 +81,64 @@ def list_clients_endpoint(
     return build_paginated_response(data=data, params=params, total=total)
 
 
+@router.get("/customers/search", response_model=ClientSearchResult)
+def search_clients_endpoint(
+    q: Annotated[str, Query(min_length=CLIENT_SEARCH_MIN_QUERY_LENGTH, max_length=150)],
+    db: Annotated[Session, Depends(get_db)],
+    limit: Annotated[int, Query(ge=1, le=CLIENT_SEARCH_LIMIT_MAX)] = CLIENT_SEARCH_LIMIT,
+) -> ClientSearchResult:
+    return search_clients(db, query=q.strip(), limit=limit)
+
+
+@router.post("/customers/import", response_model=CustomerImportResult)
+async def import_customers_endpoint(
+    request: Request,
+    _: Annotated[AuthContext, Depends(require_roles(["admin"]))],
+    db: Annotated[Session, Depends(get_db)],
+    source_format: Annotated[CustomerImportFormat | None, Query(alias="format")] = None,
+) -> CustomerImportResult:
+    if source_format is None:
+        media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+        source_format = CUSTOMER_IMPORT_MEDIA_TYPES.get(media_type)
+    if source_format is None:
+        raise ApiException(
+            status_code=415,
+            code="customer_import_format_unsupported",
+            message="Send text/csv or application/x-ndjson, or set the format query parameter",
+        )
+
+    with tempfile.SpooledTemporaryFile(max_size=CUSTOMER_IMPORT_SPOOL_BYTES) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        # utf-8-sig drops the BOM spreadsheet exports put in front of the CSV header.
+        lines = io.TextIOWrapper(
+            spool,
+            encoding="utf-8-sig",
+            errors=CUSTOMER_IMPORT_DECODE_ERRORS,
+            newline="",
+        )
+        try:
+            return await run_in_threadpool(
+                import_customers,
+                db,
+                lines,
+                source_format=source_format,
+            )
+        finally:
+            lines.detach()
+
+
+@router.post("/customers/purge-prospects", response_model=ClientPurgeResult)
+def purge_prospect_clients_endpoint(
+    _: Annotated[AuthContext, Depends(require_roles(["admin"]))],
+    db: Annotated[Session, Depends(get_db)],
+    created_before: datetime | None = None,
+    dry_run: bool = False,
+) -> ClientPurgeResult:
+    return purge_prospect_clients(db, created_before=created_before, dry_run=dry_run)
+
+
 @router.get("/customers/{client_id}", response_model=ClientRead)
 def get_client_endpoint(
     client_id: str,
@@ -54,6 +147,18 @@ def get_client_endpoint(
     return ClientRead.model_validate(get_client(db, client_id))
 
 
+@router.get("/customers/{client_id}/overview", response_model=ClientOverviewRead)
+def get_client_overview_endpoint(
+    client_id: str,
+    db: Annotated[Session, Depends(get_db)],
+    invoice_limit: Annotated[
+        int,
+        Query(ge=1, le=CUSTOMER_OVERVIEW_INVOICE_LIMIT_MAX),
+    ] = CUSTOMER_OVERVIEW_INVOICE_LIMIT,
+) -> ClientOverviewRead:
+    return get_client_overview(db, client_id, invoice_limit=invoice_limit)
+
+
 @router.put("/customers/{client_id}", response_model=ClientRead)
 def update_client_endpoint(
     client_id: str,
@@ -1,9 +1,15 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Header, Query
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, Query, Request
+from fastapi.responses import JSONResponse, Response
 from sqlalchemy.orm import Session
 
+from app.common.downloads import (
+    document_file_response,
+    is_not_modified,
+    not_modified_response,
+)
+from app.core.settings import get_settings
 from app.db.session import get_db
 from app.schemas.landing import (
     LandingBootstrapResponse,
@@ -12,6 +18,7 @@ from app.schemas.landing import (
     LandingContractDocumentLinkRequest,
     LandingContractDocumentLinkResponse,
     LandingDraftCreate,
+    LandingDraftPatch,
     LandingDraftRead,
     LandingDraftUpdate,
     LandingInvoiceLookupResponse,
@@ -20,20 +27,27 @@ from app.schemas.landing import (
     LandingPlanChangeSubmitRequest,
     LandingSubmitResult,
 )
-from app.services.landing_service import (
+from app.services.billing_service import get_invoice_for_download
+from app.services.idempotency_service import run_idempotent
+from app.services.landing_draft_service import (
     create_landing_draft,
-    get_idempotent_response,
     get_landing_draft,
+    patch_landing_draft,
+    update_landing_draft,
+)
+from app.services.landing_service import (
+    LANDING_INVOICE_PAGE_SIZE,
+    LANDING_INVOICE_PAGE_SIZE_MAX,
+    ensure_contract_document_file,
     issue_contract_document_link,
     list_landing_bootstrap_data,
     lookup_client_invoices,
     lookup_client_subscriptions,
+    render_pending_contract_document,
     resolve_contract_document_for_download,
     resolve_invoice_document_for_download,
-    save_idempotent_response,
     submit_new_subscription,
     submit_plan_change,
-    update_landing_draft,
     verify_lookup_identity_by_cin,
 )
 
@@ -72,6 +86,15 @@ def update_landing_draft_endpoint(
     return update_landing_draft(db, draft_id, payload)
 
 
+@router.patch("/landing/drafts/{draft_id}", response_model=LandingDraftRead)
+def patch_landing_draft_endpoint(
+    draft_id: str,
+    payload: LandingDraftPatch,
+    db: Annotated[Session, Depends(get_db)],
+) -> LandingDraftRead:
+    return patch_landing_draft(db, draft_id, payload)
+
+
 @router.get("/landing/clients/{cin}/subscriptions", response_model=LandingClientLookupResponse)
 def lookup_landing_client_subscriptions_endpoint(
     cin: str,
@@ -90,11 +113,18 @@ def lookup_landing_client_invoices_endpoint(
     cin: str,
     lookup_token: Annotated[str, Query(alias="lookup_token")],
     db: Annotated[Session, Depends(get_db)],
+    limit: Annotated[
+        int,
+        Query(ge=1, le=LANDING_INVOICE_PAGE_SIZE_MAX),
+    ] = LANDING_INVOICE_PAGE_SIZE,
+    cursor: Annotated[str | None, Query()] = None,
 ) -> LandingInvoiceLookupResponse:
     return lookup_client_invoices(
         db,
         cin=cin.strip().upper(),
         lookup_token=lookup_token.strip(),
+        limit=limit,
+        cursor=cursor.strip() if cursor else None,
     )
 
 
@@ -111,24 +141,23 @@ def submit_landing_new_subscription_endpoint(
     payload: LandingNewSubscriptionSubmitRequest,
     idempotency_key: Annotated[str, Header(alias="Idempotency-Key")],
     db: Annotated[Session, Depends(get_db)],
+    background_tasks: BackgroundTasks,
 ) -> LandingSubmitResult:
-    operation = "landing_submit_new"
-    replayed, request_hash = get_idempotent_response(
+    result, replayed = run_idempotent(
         db,
-        operation=operation,
+        operation="landing_submit_new",
         idempotency_key=idempotency_key,
         request_payload=payload.model_dump(mode="json"),
+        response_model=LandingSubmitResult,
+        execute=lambda: submit_new_subscription(db, payload),
     )
     if replayed:
-        return replayed.model_copy(update={"idempotency_replayed": True})
+        return result.model_copy(update={"idempotency_replayed": True})
 
-    result = submit_new_subscription(db, payload)
-    save_idempotent_response(
-        db,
-        operation=operation,
-        idempotency_key=idempotency_key,
-        request_hash=request_hash,
-        response=result,
+    background_tasks.add_task(
+        render_pending_contract_document,
+        db.get_bind(),
+        contract_id=result.contract.id,
     )
     return result
 
@@ -138,24 +167,23 @@ def submit_landing_plan_change_endpoint(
     payload: LandingPlanChangeSubmitRequest,
     idempotency_key: Annotated[str, Header(alias="Idempotency-Key")],
     db: Annotated[Session, Depends(get_db)],
+    background_tasks: BackgroundTasks,
 ) -> LandingSubmitResult:
-    operation = "landing_submit_plan_change"
-    replayed, request_hash = get_idempotent_response(
+    result, replayed = run_idempotent(
         db,
-        operation=operation,
+        operation="landing_submit_plan_change",
         idempotency_key=idempotency_key,
         request_payload=payload.model_dump(mode="json"),
+        response_model=LandingSubmitResult,
+        execute=lambda: submit_plan_change(db, payload),
     )
     if replayed:
-        return replayed.model_copy(update={"idempotency_replayed": True})
+        return result.model_copy(update={"idempotency_replayed": True})
 
-    result = submit_plan_change(db, payload)
-    save_idempotent_response(
-        db,
-        operation=operation,
-        idempotency_key=idempotency_key,
-        request_hash=request_hash,
-        response=result,
+    background_tasks.add_task(
+        render_pending_contract_document,
+        db.get_bind(),
+        contract_id=result.contract.id,
     )
     return result
 
@@ -176,17 +204,28 @@ def issue_landing_contract_document_link_endpoint(
 def download_landing_contract_document_endpoint(
     contract_id: str,
     token: Annotated[str, Query(alias="token")],
+    request: Request,
     db: Annotated[Session, Depends(get_db)],
-) -> FileResponse:
+) -> Response:
     document = resolve_contract_document_for_download(
         db,
         contract_id=contract_id,
         access_token=token.strip(),
     )
-    return FileResponse(
+    if document.status != "ready":
+        return JSONResponse(
+            status_code=202,
+            content={"contract_id": contract_id, "status": document.status},
+            headers={"Retry-After": str(get_settings().contract_document_retry_after_seconds)},
+        )
+    if is_not_modified(request, document.sha256):
+        return not_modified_response(document.sha256)
+    document = ensure_contract_document_file(document)
+    return document_file_response(
         path=document.file_path,
         media_type=document.mime_type,
         filename=document.file_name,
+        sha256=document.sha256,
     )
 
 
@@ -194,17 +233,22 @@ def download_landing_contract_document_endpoint(
 def download_landing_invoice_document_endpoint(
     invoice_id: str,
     token: Annotated[str, Query(alias="token")],
+    request: Request,
     db: Annotated[Session, Depends(get_db)],
-) -> FileResponse:
+) -> Response:
     invoice = resolve_invoice_document_for_download(
         db,
         invoice_id=invoice_id,
         access_token=token.strip(),
     )
+    if invoice.pdf_sha256 and is_not_modified(request, invoice.pdf_sha256):
+        return not_modified_response(invoice.pdf_sha256)
+    invoice = get_invoice_for_download(db, invoice.id)
     if not invoice.pdf_file_path or not invoice.pdf_file_name:
         raise RuntimeError("Invoice PDF metadata missing after generation")
-    return FileResponse(
+    return document_file_response(
         path=invoice.pdf_file_path,
         media_type="application/pdf",
         filename=invoice.pdf_file_name,
+        sha256=invoice.pdf_sha256,
     )
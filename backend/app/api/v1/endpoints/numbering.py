@@ -0,0 +1,32 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.common.auth import AuthContext, require_roles
+from app.db.session import get_db
+from app.schemas.numbering import (
+    IdentifierPoolStats,
+    IdentifierRangeImport,
+    IdentifierRangeImportResult,
+)
+from app.services.numbering_service import get_pool_stats, import_identifier_range
+
+router = APIRouter(tags=["numbering"])
+
+
+@router.post("/numbering/pools/import", response_model=IdentifierRangeImportResult)
+def import_identifier_range_endpoint(
+    payload: IdentifierRangeImport,
+    _: Annotated[AuthContext, Depends(require_roles(["admin"]))],
+    db: Annotated[Session, Depends(get_db)],
+) -> IdentifierRangeImportResult:
+    return import_identifier_range(db, payload=payload)
+
+
+@router.get("/numbering/pools/stats", response_model=list[IdentifierPoolStats])
+def get_pool_stats_endpoint(
+    _: Annotated[AuthContext, Depends(require_roles(["admin"]))],
+    db: Annotated[Session, Depends(get_db)],
+) -> list[IdentifierPoolStats]:
+    return get_pool_stats(db)
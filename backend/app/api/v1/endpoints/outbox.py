@@ -0,0 +1,39 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.common.api import PaginationParams, build_paginated_response, pagination_params
+from app.common.auth import AuthContext, require_roles
+from app.db.session import get_db
+from app.schemas.outbox import OutboxDispatchResult, OutboxEventRead
+from app.services.outbox_service import drain_outbox, list_outbox_events
+
+router = APIRouter(tags=["outbox"])
+
+
+@router.get("/admin/outbox/events")
+def list_outbox_events_endpoint(
+    _: Annotated[AuthContext, Depends(require_roles(["admin"]))],
+    params: Annotated[PaginationParams, Depends(pagination_params)],
+    db: Annotated[Session, Depends(get_db)],
+    status: Annotated[str | None, Query(pattern="^(pending|delivered|failed)$")] = None,
+    event_type: Annotated[str | None, Query()] = None,
+) -> dict[str, object]:
+    records, total = list_outbox_events(
+        db,
+        page=params.page,
+        size=params.size,
+        status=status,
+        event_type=event_type,
+    )
+    data = [OutboxEventRead.model_validate(record).model_dump(mode="json") for record in records]
+    return build_paginated_response(data=data, params=params, total=total)
+
+
+@router.post("/admin/outbox/dispatch", response_model=OutboxDispatchResult)
+def dispatch_outbox_endpoint(
+    _: Annotated[AuthContext, Depends(require_roles(["admin"]))],
+    db: Annotated[Session, Depends(get_db)],
+) -> OutboxDispatchResult:
+    return drain_outbox(db)
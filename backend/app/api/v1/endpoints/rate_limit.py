@@ -0,0 +1,16 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+
+from app.common.auth import AuthContext, require_roles
+from app.common.rate_limit import get_rate_limiter
+from app.schemas.rate_limit import RateLimitStats
+
+router = APIRouter(tags=["rate-limit"])
+
+
+@router.get("/admin/rate-limits", response_model=RateLimitStats)
+def get_rate_limit_stats_endpoint(
+    _: Annotated[AuthContext, Depends(require_roles(["admin"]))],
+) -> RateLimitStats:
+    return get_rate_limiter().stats()
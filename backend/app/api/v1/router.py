@@ -9,6 +9,9 @@ from app.api.v1.endpoints.conventions import router as conventions_router
 from app.api.v1.endpoints.customer import router as customer_router
 from app.api.v1.endpoints.health import router as health_router
 from app.api.v1.endpoints.landing import router as landing_router
+from app.api.v1.endpoints.numbering import router as numbering_router
+from app.api.v1.endpoints.outbox import router as outbox_router
+from app.api.v1.endpoints.rate_limit import router as rate_limit_router
 
 router = APIRouter(prefix="/api/v1")
 router.include_router(health_router)
@@ -20,3 +23,6 @@ router.include_router(contract_router)
 router.include_router(landing_router)
 router.include_router(billing_router)
 router.include_router(collections_router)
+router.include_router(numbering_router)
+router.include_router(outbox_router)
+router.include_router(rate_limit_router)
@@ -0,0 +1,45 @@
+import logging
+import threading
+from collections.abc import Callable
+
+logger = logging.getLogger("mt_facturation.background")
+
+
+class PeriodicWorker:
+    def __init__(self, *, name: str, interval_seconds: float, task: Callable[[], object]) -> None:
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self._task = task
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        logger.info(
+            "background.worker_started name=%s interval=%s",
+            self.name,
+            self.interval_seconds,
+        )
+
+    def stop(self, *, timeout_seconds: float = 10.0) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout_seconds)
+            self._thread = None
+        logger.info("background.worker_stopped name=%s", self.name)
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self._task()
+            except Exception:
+                logger.exception("background.worker_task_failed name=%s", self.name)
+            self._stop_event.wait(self.interval_seconds)
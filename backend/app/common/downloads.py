@@ -0,0 +1,43 @@
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+# Clients may keep the file but must revalidate, which costs a 304 instead of the body.
+DOCUMENT_CACHE_CONTROL = "private, no-cache"
+
+
+def document_etag(sha256: str) -> str:
+    return f'"{sha256}"'
+
+
+def is_not_modified(request: Request, sha256: str | None) -> bool:
+    if not sha256:
+        return False
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/"x" matches a strong "x".
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return document_etag(sha256) in candidates
+
+
+def not_modified_response(sha256: str) -> Response:
+    return Response(
+        status_code=304,
+        headers={"ETag": document_etag(sha256), "Cache-Control": DOCUMENT_CACHE_CONTROL},
+    )
+
+
+def document_file_response(
+    *,
+    path: str,
+    media_type: str,
+    filename: str,
+    sha256: str | None,
+) -> FileResponse:
+    """Stream a stored document in chunks; FileResponse also serves Range/If-Range requests."""
+    headers = {"Cache-Control": DOCUMENT_CACHE_CONTROL}
+    if sha256:
+        headers["ETag"] = document_etag(sha256)
+    return FileResponse(path=path, media_type=media_type, filename=filename, headers=headers)
@@ -0,0 +1,416 @@
+import json
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Protocol
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.responses import Response
+
+from app.common.errors import build_error_response
+from app.common.observability import get_request_id
+from app.core.settings import get_settings
+from app.models.rate_limit import RateLimitBucket
+from app.schemas.rate_limit import RateLimitScopeCounters, RateLimitStats
+
+logger = logging.getLogger("mt_facturation.rate_limit")
+
+RATE_LIMIT_BODY_MAX_BYTES = 64 * 1024
+MEMORY_BUCKET_MAX_KEYS = 100_000
+
+
+@dataclass(frozen=True)
+class BucketPolicy:
+    capacity: float
+    refill_per_second: float
+
+
+@dataclass(frozen=True)
+class BucketDecision:
+    allowed: bool
+    retry_after_seconds: float
+
+
+def _refill(
+    tokens: float,
+    refilled_at: float,
+    *,
+    policy: BucketPolicy,
+    now: float,
+) -> tuple[float, BucketDecision]:
+    elapsed = max(0.0, now - refilled_at)
+    tokens = min(policy.capacity, tokens + elapsed * policy.refill_per_second)
+    if tokens >= 1.0:
+        return tokens - 1.0, BucketDecision(allowed=True, retry_after_seconds=0.0)
+    if policy.refill_per_second <= 0:
+        return tokens, BucketDecision(allowed=False, retry_after_seconds=60.0)
+    wait = (1.0 - tokens) / policy.refill_per_second
+    return tokens, BucketDecision(allowed=False, retry_after_seconds=wait)
+
+
+class RateLimitBackend(Protocol):
+    name: str
+
+    def consume(self, key: str, *, policy: BucketPolicy) -> BucketDecision: ...
+
+    def purge_idle(self, *, idle_seconds: float, batch_size: int) -> int: ...
+
+    def reset(self) -> None: ...
+
+
+class MemoryRateLimitBackend:
+    name = "memory"
+
+    def __init__(
+        self,
+        *,
+        max_keys: int = MEMORY_BUCKET_MAX_KEYS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, *, policy: BucketPolicy) -> BucketDecision:
+        now = self._clock()
+        with self._lock:
+            tokens, refilled_at = self._buckets.get(key, (policy.capacity, now))
+            tokens, decision = _refill(tokens, refilled_at, policy=policy, now=now)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            # Evicting the least recently seen key only ever hands a full bucket back.
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return decision
+
+    def purge_idle(self, *, idle_seconds: float, batch_size: int) -> int:
+        cutoff = self._clock() - idle_seconds
+        purged = 0
+        with self._lock:
+            # Keys are kept in last-seen order, so idle buckets sit at the front.
+            while self._buckets:
+                key, (_, refilled_at) = next(iter(self._buckets.items()))
+                if refilled_at >= cutoff:
+                    break
+                del self._buckets[key]
+                purged += 1
+        return purged
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class DatabaseRateLimitBackend:
+    """Shares buckets across nodes through `rate_limit_buckets`, one row lock per check."""
+
+    name = "database"
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        *,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._session_factory = session_factory
+        self._clock = clock
+
+    def consume(self, key: str, *, policy: BucketPolicy) -> BucketDecision:
+        for _ in range(2):
+            now = self._clock()
+            with self._session_factory() as db:
+                bucket = db.scalar(
+                    select(RateLimitBucket)
+                    .where(RateLimitBucket.bucket_key == key)
+                    .with_for_update(),
+                )
+                if bucket is None:
+                    tokens, decision = _refill(policy.capacity, now, policy=policy, now=now)
+                    db.add(RateLimitBucket(bucket_key=key, tokens=tokens, refilled_at=now))
+                else:
+                    tokens, decision = _refill(
+                        bucket.tokens,
+                        bucket.refilled_at,
+                        policy=policy,
+                        now=now,
+                    )
+                    bucket.tokens = tokens
+                    bucket.refilled_at = now
+                try:
+                    db.commit()
+                except IntegrityError:
+                    # Another node created the bucket first; retry against its row.
+                    db.rollback()
+                    continue
+                return decision
+        return BucketDecision(allowed=True, retry_after_seconds=0.0)
+
+    def purge_idle(self, *, idle_seconds: float, batch_size: int) -> int:
+        cutoff = self._clock() - idle_seconds
+        purged = 0
+        with self._session_factory() as db:
+            while True:
+                idle_keys = list(
+                    db.scalars(
+                        select(RateLimitBucket.bucket_key)
+                        .where(RateLimitBucket.refilled_at < cutoff)
+                        .limit(batch_size),
+                    ),
+                )
+                if not idle_keys:
+                    break
+                # Re-check the cutoff so a bucket touched since the select is kept.
+                db.execute(
+                    delete(RateLimitBucket).where(
+                        RateLimitBucket.bucket_key.in_(idle_keys),
+                        RateLimitBucket.refilled_at < cutoff,
+                    ),
+                )
+                db.commit()
+                purged += len(idle_keys)
+                if len(idle_keys) < batch_size:
+                    break
+        return purged
+
+    def reset(self) -> None:
+        with self._session_factory() as db:
+            db.execute(delete(RateLimitBucket))
+            db.commit()
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        *,
+        backend: RateLimitBackend,
+        policies: dict[str, BucketPolicy],
+        max_inflight: int = 0,
+    ) -> None:
+        self.backend = backend
+        self.policies = policies
+        self.max_inflight = max_inflight
+        self._inflight = 0
+        self._shed = 0
+        self._allowed = {scope: 0 for scope in policies}
+        self._limited = {scope: 0 for scope in policies}
+        self._lock = threading.Lock()
+
+    def check(self, scope: str, identity: str) -> BucketDecision:
+        decision = self.backend.consume(f"{scope}:{identity}", policy=self.policies[scope])
+        with self._lock:
+            if decision.allowed:
+                self._allowed[scope] += 1
+            else:
+                self._limited[scope] += 1
+        return decision
+
+    def purge_idle_buckets(self) -> int:
+        """Drop buckets idle long enough to have refilled completely.
+
+        A missing bucket starts full, so forgetting such a bucket never changes a decision.
+        """
+        settings = get_settings()
+        idle_seconds = max(
+            [
+                settings.rate_limit_bucket_idle_seconds,
+                *(
+                    policy.capacity / policy.refill_per_second
+                    for policy in self.policies.values()
+                    if policy.refill_per_second > 0
+                ),
+            ],
+        )
+        purged = self.backend.purge_idle(
+            idle_seconds=idle_seconds,
+            batch_size=settings.rate_limit_bucket_purge_batch_size,
+        )
+        if purged:
+            logger.info("rate_limit.buckets_purged count=%s idle_seconds=%s", purged, idle_seconds)
+        return purged
+
+    def try_enter(self) -> bool:
+        with self._lock:
+            if self.max_inflight > 0 and self._inflight >= self.max_inflight:
+                self._shed += 1
+                return False
+            self._inflight += 1
+            return True
+
+    def leave(self) -> None:
+        with self._lock:
+            self._inflight = max(0, self._inflight - 1)
+
+    def stats(self) -> RateLimitStats:
+        with self._lock:
+            return RateLimitStats(
+                enabled=get_settings().rate_limit_enabled,
+                backend=self.backend.name,
+                inflight=self._inflight,
+                max_inflight=self.max_inflight,
+                shed=self._shed,
+                scopes=[
+                    RateLimitScopeCounters(
+                        scope=scope,
+                        allowed=self._allowed[scope],
+                        limited=self._limited[scope],
+                    )
+                    for scope in self.policies
+                ],
+            )
+
+    def reset(self) -> None:
+        self.backend.reset()
+        with self._lock:
+            self._inflight = 0
+            self._shed = 0
+            self._allowed = {scope: 0 for scope in self.policies}
+            self._limited = {scope: 0 for scope in self.policies}
+
+
+@lru_cache(maxsize=1)
+def get_rate_limiter() -> RateLimiter:
+    settings = get_settings()
+    backend: RateLimitBackend
+    if settings.rate_limit_backend.strip().lower() == "database":
+        from app.db.session import SessionLocal
+
+        backend = DatabaseRateLimitBackend(SessionLocal)
+    else:
+        backend = MemoryRateLimitBackend()
+    return RateLimiter(
+        backend=backend,
+        policies={
+            "ip": BucketPolicy(
+                capacity=settings.rate_limit_ip_capacity,
+                refill_per_second=settings.rate_limit_ip_refill_per_second,
+            ),
+            "cin": BucketPolicy(
+                capacity=settings.rate_limit_cin_capacity,
+                refill_per_second=settings.rate_limit_cin_refill_per_second,
+            ),
+        },
+        max_inflight=settings.rate_limit_max_inflight,
+    )
+
+
+def _client_ip(request: Request) -> str:
+    if get_settings().rate_limit_trust_forwarded_for:
+        forwarded = request.headers.get("X-Forwarded-For", "")
+        first_hop = forwarded.split(",")[0].strip()
+        if first_hop:
+            return first_hop
+    return request.client.host if request.client else "unknown"
+
+
+async def _request_cin(request: Request, path_prefix: str) -> str | None:
+    # Path lookups carry the CIN as the segment after /clients/.
+    segments = request.url.path.removeprefix(path_prefix).strip("/").split("/")
+    if len(segments) >= 2 and segments[0] == "clients" and segments[1] != "verify-cin":
+        return segments[1].strip().upper() or None
+    if request.method != "POST":
+        return None
+    if "application/json" not in request.headers.get("content-type", ""):
+        return None
+    body = await request.body()
+    if not body or len(body) > RATE_LIMIT_BODY_MAX_BYTES:
+        return None
+    try:
+        payload = json.loads(body)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    cin = payload.get("cin") if isinstance(payload, dict) else None
+    if isinstance(cin, str) and cin.strip():
+        return cin.strip().upper()
+    return None
+
+
+def _limited_response(
+    request: Request,
+    *,
+    status_code: int,
+    code: str,
+    message: str,
+    retry_after_seconds: float,
+    details: dict[str, object],
+) -> JSONResponse:
+    retry_after = max(1, math.ceil(retry_after_seconds))
+    return JSONResponse(
+        status_code=status_code,
+        headers={"Retry-After": str(retry_after)},
+        content=build_error_response(
+            code=code,
+            message=message,
+            details={**details, "retry_after_seconds": retry_after},
+            trace_id=get_request_id(request),
+        ),
+    )
+
+
+class RateLimitMiddleware(BaseHTTPMiddleware):
+    """Applies per-IP and per-CIN token buckets to public paths before any endpoint runs."""
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        settings = get_settings()
+        if not settings.rate_limit_enabled or request.method == "OPTIONS":
+            return await call_next(request)
+        path_prefix = next(
+            (
+                prefix
+                for prefix in settings.rate_limit_paths_list
+                if request.url.path == prefix or request.url.path.startswith(f"{prefix}/")
+            ),
+            None,
+        )
+        if path_prefix is None:
+            return await call_next(request)
+
+        limiter = get_rate_limiter()
+        checks = [("ip", _client_ip(request))]
+        cin = await _request_cin(request, path_prefix)
+        if cin is not None:
+            checks.append(("cin", cin))
+        for scope, identity in checks:
+            # The database backend locks and commits a row; keep that off the event loop.
+            decision = await run_in_threadpool(limiter.check, scope, identity)
+            if not decision.allowed:
+                logger.warning(
+                    "rate_limit.limited scope=%s path=%s retry_after=%.2f",
+                    scope,
+                    request.url.path,
+                    decision.retry_after_seconds,
+                )
+                return _limited_response(
+                    request,
+                    status_code=429,
+                    code="rate_limited",
+                    message="Too many requests, retry later",
+                    retry_after_seconds=decision.retry_after_seconds,
+                    details={"scope": scope},
+                )
+
+        if not limiter.try_enter():
+            logger.warning("rate_limit.shed path=%s", request.url.path)
+            return _limited_response(
+                request,
+                status_code=503,
+                code="service_overloaded",
+                message="Service is temporarily overloaded, retry later",
+                retry_after_seconds=1.0,
+                details={},
+            )
+        try:
+            return await call_next(request)
+        finally:
+            limiter.leave()
@@ -29,6 +29,60 @@ class Settings(BaseSettings):
     landing_document_token_ttl_seconds: int = 86400
     contract_documents_dir: str = "generated/contracts"
     invoice_documents_dir: str = "generated/invoices"
+    contract_document_retry_after_seconds: int = 2
+    contract_document_render_timeout_seconds: int = 120
+    outbox_dispatcher_enabled: bool = False
+    outbox_dispatch_interval_seconds: float = 2.0
+    outbox_batch_size: int = 100
+    outbox_max_attempts: int = 8
+    outbox_retry_base_seconds: int = 5
+    outbox_retry_max_seconds: int = 900
+    outbox_sink: str = "log"
+    outbox_file_path: str = "generated/outbox/events.ndjson"
+    outbox_http_url: str = ""
+    outbox_http_timeout_seconds: float = 5.0
+    identifier_release_quarantine_days: int = 90
+    contract_provision_chunk_size: int = 100
+    contract_bulk_status_batch_size: int = 1000
+    contract_expiry_grace_days: int = 0
+    contract_scheduler_enabled: bool = False
+    contract_scheduler_interval_seconds: float = 300.0
+    contract_scheduler_batch_size: int = 500
+    customer_import_batch_size: int = 1000
+    customer_import_rejects_dir: str = "generated/imports"
+    customer_purge_batch_size: int = 500
+    customer_purge_retention_days: int = 90
+    customer_overview_cache_max_entries: int = 4096
+    customer_overview_cache_ttl_seconds: int = 60
+    idempotency_retention_hours: int = 168
+    idempotency_cache_max_entries: int = 2048
+    idempotency_cache_ttl_seconds: int = 900
+    idempotency_purge_enabled: bool = False
+    idempotency_purge_interval_seconds: float = 3600.0
+    idempotency_purge_batch_size: int = 1000
+    idempotency_wait_timeout_seconds: float = 10.0
+    idempotency_wait_poll_seconds: float = 0.2
+    idempotency_in_progress_timeout_seconds: int = 300
+    idempotency_heartbeat_interval_seconds: float = 60.0
+    landing_draft_store: str = "sql"
+    landing_draft_ttl_hours: int = 72
+    landing_draft_coalesce_seconds: float = 0.0
+    landing_draft_purge_enabled: bool = False
+    landing_draft_purge_interval_seconds: float = 3600.0
+    landing_draft_purge_batch_size: int = 1000
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "memory"
+    rate_limit_paths: str = "/api/v1/landing"
+    rate_limit_ip_capacity: int = 120
+    rate_limit_ip_refill_per_second: float = 2.0
+    rate_limit_cin_capacity: int = 20
+    rate_limit_cin_refill_per_second: float = 0.2
+    rate_limit_max_inflight: int = 0
+    rate_limit_trust_forwarded_for: bool = False
+    rate_limit_bucket_purge_enabled: bool = True
+    rate_limit_bucket_purge_interval_seconds: float = 600.0
+    rate_limit_bucket_purge_batch_size: int = 1000
+    rate_limit_bucket_idle_seconds: float = 3600.0
 
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=False, extra="ignore")
 
@@ -57,6 +111,11 @@ class Settings(BaseSettings):
     def public_paths_set(self) -> set[str]:
         return {path.strip() for path in self.public_paths.split(",") if path.strip()}
 
+    @property
+    def rate_limit_paths_list(self) -> list[str]:
+        paths = self.rate_limit_paths.split(",")
+        return [path.strip().rstrip("/") for path in paths if path.strip()]
+
     @property
     def cors_allow_origins_list(self) -> list[str]:
         return [origin.strip() for origin in self.cors_allow_origins.split(",") if origin.strip()]
@@ -0,0 +1,56 @@
+import argparse
+from pathlib import Path
+
+from app.db.session import SessionLocal, initialize_schema
+from app.schemas.customer import CustomerImportFormat
+from app.services.customer_import_service import (
+    CUSTOMER_IMPORT_DECODE_ERRORS,
+    import_customers,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Import clients and subscribers from a CSV or NDJSON file.",
+    )
+    parser.add_argument("path", type=Path, help="CSV (with header row) or NDJSON file")
+    parser.add_argument(
+        "--format",
+        choices=("csv", "ndjson"),
+        help="Input format; defaults to the file extension",
+    )
+    parser.add_argument("--rejects", type=Path, help="Where to write rejected rows (NDJSON)")
+    parser.add_argument("--batch-size", type=int, help="Rows per insert batch and commit")
+    args = parser.parse_args()
+
+    source_format: CustomerImportFormat = args.format or (
+        "csv" if args.path.suffix.lower() == ".csv" else "ndjson"
+    )
+    initialize_schema()
+    with (
+        SessionLocal() as db,
+        args.path.open(
+            encoding="utf-8-sig",
+            errors=CUSTOMER_IMPORT_DECODE_ERRORS,
+            newline="",
+        ) as lines,
+    ):
+        result = import_customers(
+            db,
+            lines,
+            source_format=source_format,
+            rejects_path=args.rejects,
+            batch_size=args.batch_size,
+        )
+
+    print(
+        f"Customer import: {result.rows_read} rows read, {result.clients_created} clients created, "
+        f"{result.clients_matched} matched, {result.subscribers_created} subscribers created, "
+        f"{result.rejected_count} rejected.",
+    )
+    if result.reject_file:
+        print(f"Rejected rows written to {result.reject_file}")
+
+
+if __name__ == "__main__":
+    main()
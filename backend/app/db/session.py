@@ -1,11 +1,15 @@
+import logging
 from collections.abc import Generator
 
 from sqlalchemy import create_engine, text
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.settings import get_settings
 from app.db.base import Base
 
+logger = logging.getLogger("mt_facturation.db")
+
 settings = get_settings()
 
 engine = create_engine(settings.database_url, pool_pre_ping=True)
@@ -21,7 +25,18 @@ def get_db() -> Generator[Session, None, None]:
 
 
 def initialize_schema() -> None:
-    from app.models import billing, catalog, collections, contract, customer, landing  # noqa: F401
+    from app.models import (  # noqa: F401
+        billing,
+        catalog,
+        collections,
+        contract,
+        customer,
+        idempotency,
+        landing,
+        numbering,
+        outbox,
+        rate_limit,
+    )
 
     Base.metadata.create_all(bind=engine)
     _ensure_runtime_columns()
@@ -86,8 +101,125 @@ def _ensure_runtime_columns() -> None:
         "ALTER TABLE offers ALTER COLUMN internet_tv_included SET NOT NULL",
         "ALTER TABLE offers ALTER COLUMN landline_national_included SET NOT NULL",
         "ALTER TABLE offers ALTER COLUMN activation_fee SET NOT NULL",
+        "ALTER TABLE contract_documents ADD COLUMN IF NOT EXISTS status VARCHAR(16)",
+        "UPDATE contract_documents SET status = 'ready' WHERE status IS NULL",
+        "ALTER TABLE contract_documents ALTER COLUMN status SET DEFAULT 'ready'",
+        "ALTER TABLE contract_documents ALTER COLUMN status SET NOT NULL",
+        "ALTER TABLE idempotency_records ADD COLUMN IF NOT EXISTS status VARCHAR(16)",
+        "ALTER TABLE idempotency_records ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ",
+        "UPDATE idempotency_records SET status = 'completed' WHERE status IS NULL",
+        "UPDATE idempotency_records SET updated_at = created_at WHERE updated_at IS NULL",
+        "ALTER TABLE idempotency_records ALTER COLUMN status SET NOT NULL",
+        "ALTER TABLE idempotency_records ALTER COLUMN updated_at SET DEFAULT now()",
+        "ALTER TABLE idempotency_records ALTER COLUMN updated_at SET NOT NULL",
+        "ALTER TABLE idempotency_records ALTER COLUMN response_payload DROP NOT NULL",
+        "ALTER TABLE payments ALTER COLUMN idempotency_key DROP NOT NULL",
+        # Released numbers stay on their terminated subscriber, so uniqueness only covers live
+        # subscribers; rows rewritten to "<number>#<id>" by an earlier release get it back.
+        "ALTER TABLE subscribers DROP CONSTRAINT IF EXISTS subscribers_service_identifier_key",
+        (
+            "UPDATE subscribers SET service_identifier = split_part(service_identifier, '#', 1) "
+            "WHERE status = 'terminated' AND service_identifier LIKE '+%#%'"
+        ),
+        (
+            "CREATE INDEX IF NOT EXISTS ix_subscribers_service_identifier "
+            "ON subscribers (service_identifier)"
+        ),
+        (
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_subscribers_live_service_identifier "
+            "ON subscribers (service_identifier) WHERE status <> 'terminated'"
+        ),
+        (
+            "CREATE INDEX IF NOT EXISTS ix_landing_drafts_updated_at "
+            "ON landing_drafts (updated_at)"
+        ),
+        (
+            "CREATE INDEX IF NOT EXISTS ix_idempotency_records_created_at "
+            "ON idempotency_records (created_at)"
+        ),
+        (
+            "CREATE INDEX IF NOT EXISTS ix_service_identifier_pool_kind_status_released_at "
+            "ON service_identifier_pool (kind, status, released_at)"
+        ),
+        (
+            "CREATE INDEX IF NOT EXISTS ix_rate_limit_buckets_refilled_at "
+            "ON rate_limit_buckets (refilled_at)"
+        ),
+        (
+            "CREATE INDEX IF NOT EXISTS ix_contracts_status_start_date "
+            "ON contracts (status, start_date)"
+        ),
+        *(
+            _text_to_jsonb_statement(table, column)
+            for table, column in (
+                ("contract_audit_events", "details"),
+                ("collection_case_actions", "payload"),
+                ("landing_drafts", "payload"),
+                ("contract_scheduled_events", "payload"),
+                ("collection_aging_snapshots", "bucket_totals"),
+                ("collection_aging_snapshots", "category_totals"),
+                ("idempotency_records", "response_payload"),
+            )
+        ),
+        (
+            "CREATE INDEX IF NOT EXISTS ix_contract_audit_events_details "
+            "ON contract_audit_events USING gin (details jsonb_path_ops)"
+        ),
+        (
+            "CREATE INDEX IF NOT EXISTS ix_collection_case_actions_payload "
+            "ON collection_case_actions USING gin (payload jsonb_path_ops)"
+        ),
     ]
 
     with engine.begin() as connection:
         for statement in statements:
             connection.execute(text(statement))
+    _ensure_trigram_indexes()
+
+
+def _ensure_trigram_indexes() -> None:
+    # pg_trgm may need a role allowed to create extensions; without it only client search
+    # degrades, so this runs in its own transaction and never blocks the DDL above.
+    statements = [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        *(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_{column}_trgm "
+            f"ON {table} USING gin ({column} gin_trgm_ops)"
+            for table, column in (
+                ("clients", "full_name"),
+                ("clients", "cin"),
+                ("clients", "phone"),
+                ("clients", "email"),
+                ("subscribers", "service_identifier"),
+            )
+        ),
+        # Digits-only copies let "216 55 123 456" find "+216-55-123-456".
+        *(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_{column}_digits_trgm "
+            f"ON {table} USING gin ((regexp_replace({column}, '\\D', '', 'g')) gin_trgm_ops)"
+            for table, column in (
+                ("clients", "phone"),
+                ("subscribers", "service_identifier"),
+            )
+        ),
+    ]
+    try:
+        with engine.begin() as connection:
+            for statement in statements:
+                connection.execute(text(statement))
+    except SQLAlchemyError:
+        logger.warning(
+            "db.trigram_indexes_unavailable client search falls back to the memory index",
+            exc_info=True,
+        )
+
+
+def _text_to_jsonb_statement(table: str, column: str) -> str:
+    # Columns created while JSON was stored as Text are converted once; JSONB ones are left alone.
+    return (
+        "DO $$ BEGIN "
+        "IF EXISTS (SELECT 1 FROM information_schema.columns "
+        f"WHERE table_name = '{table}' AND column_name = '{column}' AND data_type = 'text') THEN "
+        f"ALTER TABLE {table} ALTER COLUMN {column} TYPE JSONB USING {column}::jsonb; "
+        "END IF; END $$"
+    )
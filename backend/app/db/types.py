@@ -0,0 +1,25 @@
+from collections.abc import Mapping
+from typing import Any
+
+from sqlalchemy import JSON, ColumnElement, and_, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session
+
+# JSONB (GIN-indexable, containment operators) on Postgres, plain JSON text elsewhere.
+# ``none_as_null`` keeps Python ``None`` as SQL NULL rather than the JSON ``null`` literal.
+JSONDocument = JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql")
+
+
+def json_document_contains(
+    db: Session,
+    column: Any,
+    criteria: Mapping[str, str],
+) -> ColumnElement[bool]:
+    """Match documents whose top-level string keys equal ``criteria``.
+
+    Postgres gets a single ``@>`` containment test the ``jsonb_path_ops`` GIN index can serve;
+    other dialects fall back to per-key JSON extraction.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return type_coerce(column, JSONB).contains(dict(criteria))
+    return and_(*(column[key].as_string() == value for key, value in criteria.items()))
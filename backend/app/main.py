@@ -1,18 +1,37 @@
+import threading
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.v1.router import router as v1_router
 from app.common.auth import AuthContextMiddleware
+from app.common.background import PeriodicWorker
 from app.common.errors import register_exception_handlers
 from app.common.observability import RequestContextMiddleware, configure_logging
+from app.common.rate_limit import RateLimitMiddleware, get_rate_limiter
 from app.core.settings import get_settings
-from app.db.session import initialize_schema
+from app.db.session import SessionLocal, initialize_schema
+from app.services.contract_service import (
+    apply_due_contract_events,
+    backfill_contract_expiry_events,
+)
+from app.services.idempotency_service import (
+    get_reservation_heartbeat,
+    purge_expired_idempotency_records,
+)
+from app.services.landing_draft_service import (
+    flush_landing_drafts,
+    purge_expired_landing_drafts,
+)
+from app.services.outbox_service import drain_outbox
 
 settings = get_settings()
 
 configure_logging()
 app = FastAPI(title=settings.app_name)
 register_exception_handlers(app)
+# Rate limiting sits inside the request context so 429s still carry a request id.
+app.add_middleware(RateLimitMiddleware)
 app.add_middleware(RequestContextMiddleware)
 app.add_middleware(AuthContextMiddleware, public_paths=settings.public_paths_set)
 # Keep CORS middleware outermost so browser headers are present even for auth/errors.
@@ -25,12 +44,104 @@ app.add_middleware(
     allow_headers=["*"],
 )
 app.include_router(v1_router)
+background_workers: list[PeriodicWorker] = []
+contract_expiry_backfilled = threading.Event()
+
+
+def dispatch_outbox() -> None:
+    with SessionLocal() as db:
+        drain_outbox(db)
+
+
+def purge_idempotency_records() -> None:
+    with SessionLocal() as db:
+        purge_expired_idempotency_records(db)
+
+
+def maintain_landing_drafts() -> None:
+    with SessionLocal() as db:
+        flush_landing_drafts(db)
+        if settings.landing_draft_purge_enabled:
+            purge_expired_landing_drafts(db)
+
+
+def purge_rate_limit_buckets() -> None:
+    get_rate_limiter().purge_idle_buckets()
+
+
+def run_contract_scheduler() -> None:
+    with SessionLocal() as db:
+        if not contract_expiry_backfilled.is_set():
+            # Contracts written before the scheduler existed get their expiry events once.
+            backfill_contract_expiry_events(db)
+            contract_expiry_backfilled.set()
+        apply_due_contract_events(db)
 
 
 @app.on_event("startup")
 def startup() -> None:
     if settings.auto_create_schema:
         initialize_schema()
+    if settings.outbox_dispatcher_enabled:
+        worker = PeriodicWorker(
+            name="outbox-dispatcher",
+            interval_seconds=settings.outbox_dispatch_interval_seconds,
+            task=dispatch_outbox,
+        )
+        worker.start()
+        background_workers.append(worker)
+    if settings.landing_draft_coalesce_seconds > 0 or settings.landing_draft_purge_enabled:
+        # Coalesced drafts are flushed at the coalescing cadence; purges ride on the same loop.
+        worker = PeriodicWorker(
+            name="landing-draft-maintenance",
+            interval_seconds=(
+                settings.landing_draft_coalesce_seconds
+                if settings.landing_draft_coalesce_seconds > 0
+                else settings.landing_draft_purge_interval_seconds
+            ),
+            task=maintain_landing_drafts,
+        )
+        worker.start()
+        background_workers.append(worker)
+    if settings.contract_scheduler_enabled:
+        worker = PeriodicWorker(
+            name="contract-scheduler",
+            interval_seconds=settings.contract_scheduler_interval_seconds,
+            task=run_contract_scheduler,
+        )
+        worker.start()
+        background_workers.append(worker)
+    if (
+        settings.rate_limit_enabled
+        and settings.rate_limit_bucket_purge_enabled
+        and settings.rate_limit_backend.strip().lower() == "database"
+    ):
+        # Memory buckets are already capped by LRU eviction; shared rows need a sweep.
+        worker = PeriodicWorker(
+            name="rate-limit-bucket-purge",
+            interval_seconds=settings.rate_limit_bucket_purge_interval_seconds,
+            task=purge_rate_limit_buckets,
+        )
+        worker.start()
+        background_workers.append(worker)
+    if settings.idempotency_purge_enabled:
+        worker = PeriodicWorker(
+            name="idempotency-purge",
+            interval_seconds=settings.idempotency_purge_interval_seconds,
+            task=purge_idempotency_records,
+        )
+        worker.start()
+        background_workers.append(worker)
+
+
+@app.on_event("shutdown")
+def shutdown() -> None:
+    while background_workers:
+        background_workers.pop().stop()
+    get_reservation_heartbeat().stop()
+    if settings.landing_draft_coalesce_seconds > 0:
+        with SessionLocal() as db:
+            flush_landing_drafts(db, force=True)
 
 
 @app.get("/")
@@ -1,11 +1,13 @@
 import uuid
 from datetime import date, datetime
 from decimal import Decimal
+from typing import Any
 
-from sqlalchemy import Date, DateTime, ForeignKey, Integer, Numeric, String, Text, func
+from sqlalchemy import Date, DateTime, ForeignKey, Index, Integer, Numeric, String, Text, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
+from app.db.types import JSONDocument
 
 
 class Payment(Base):
@@ -21,7 +23,9 @@ class Payment(Base):
     reference: Mapped[str | None] = mapped_column(String(120), nullable=True)
     note: Mapped[str | None] = mapped_column(Text, nullable=True)
     status: Mapped[str] = mapped_column(String(32), nullable=False, default="posted")
-    idempotency_key: Mapped[str] = mapped_column(String(200), nullable=False, unique=True)
+    # Only single-invoice payments carry a key; client-level allocations are deduplicated by
+    # their idempotency record.
+    idempotency_key: Mapped[str | None] = mapped_column(String(200), nullable=True, unique=True)
     request_hash: Mapped[str] = mapped_column(String(64), nullable=False)
     invoice_status_after: Mapped[str] = mapped_column(String(32), nullable=False, default="issued")
     outstanding_after: Mapped[Decimal] = mapped_column(
@@ -79,13 +83,21 @@ class CollectionCase(Base):
 
 class CollectionCaseAction(Base):
     __tablename__ = "collection_case_actions"
+    __table_args__ = (
+        Index(
+            "ix_collection_case_actions_payload",
+            "payload",
+            postgresql_using="gin",
+            postgresql_ops={"payload": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     case_id: Mapped[str] = mapped_column(ForeignKey("collection_cases.id"), nullable=False)
     action_type: Mapped[str] = mapped_column(String(64), nullable=False)
     actor_id: Mapped[str | None] = mapped_column(String(120), nullable=True)
     note: Mapped[str | None] = mapped_column(Text, nullable=True)
-    payload: Mapped[str] = mapped_column(Text, nullable=False, default="{}")
+    payload: Mapped[dict[str, Any]] = mapped_column(JSONDocument, nullable=False, default=dict)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         nullable=False,
@@ -93,3 +105,39 @@ class CollectionCaseAction(Base):
     )
 
     collection_case: Mapped[CollectionCase] = relationship(back_populates="actions")
+
+
+class CollectionAgingSnapshot(Base):
+    __tablename__ = "collection_aging_snapshots"
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    snapshot_date: Mapped[date] = mapped_column(Date, nullable=False, unique=True)
+    open_cases: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    in_progress_cases: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    overdue_invoices: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total_outstanding_amount: Mapped[Decimal] = mapped_column(
+        Numeric(12, 2),
+        nullable=False,
+        default=Decimal("0.00"),
+    )
+    bucket_totals: Mapped[dict[str, Any]] = mapped_column(
+        JSONDocument,
+        nullable=False,
+        default=dict,
+    )
+    category_totals: Mapped[dict[str, Any]] = mapped_column(
+        JSONDocument,
+        nullable=False,
+        default=dict,
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
@@ -1,14 +1,28 @@
 import uuid
 from datetime import date, datetime
+from typing import Any
 
-from sqlalchemy import Date, DateTime, ForeignKey, Integer, String, Text, UniqueConstraint, func
+from sqlalchemy import (
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+    func,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
+from app.db.types import JSONDocument
 
 
 class Contract(Base):
     __tablename__ = "contracts"
+    # Billing and the lifecycle scheduler read contracts by status first.
+    __table_args__ = (Index("ix_contracts_status_start_date", "status", "start_date"),)
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     client_id: Mapped[str] = mapped_column(ForeignKey("clients.id"), nullable=False)
@@ -40,16 +54,28 @@ class Contract(Base):
         back_populates="contract",
         cascade="all, delete-orphan",
     )
+    scheduled_events: Mapped[list["ContractScheduledEvent"]] = relationship(
+        back_populates="contract",
+        cascade="all, delete-orphan",
+    )
 
 
 class ContractAuditEvent(Base):
     __tablename__ = "contract_audit_events"
+    __table_args__ = (
+        Index(
+            "ix_contract_audit_events_details",
+            "details",
+            postgresql_using="gin",
+            postgresql_ops={"details": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     contract_id: Mapped[str] = mapped_column(ForeignKey("contracts.id"), nullable=False)
     event_type: Mapped[str] = mapped_column(String(64), nullable=False)
     actor_id: Mapped[str | None] = mapped_column(String(120), nullable=True)
-    details: Mapped[str] = mapped_column(Text, nullable=False, default="{}")
+    details: Mapped[dict[str, Any]] = mapped_column(JSONDocument, nullable=False, default=dict)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         nullable=False,
@@ -76,6 +102,7 @@ class ContractDocument(Base):
     file_path: Mapped[str] = mapped_column(Text, nullable=False)
     mime_type: Mapped[str] = mapped_column(String(120), nullable=False, default="application/pdf")
     sha256: Mapped[str] = mapped_column(String(64), nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="ready")
     issued_by_actor: Mapped[str | None] = mapped_column(String(120), nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
@@ -90,3 +117,38 @@ class ContractDocument(Base):
     )
 
     contract: Mapped[Contract] = relationship(back_populates="documents")
+
+
+class ContractScheduledEvent(Base):
+    __tablename__ = "contract_scheduled_events"
+    __table_args__ = (
+        Index("ix_contract_scheduled_events_status_due_date", "status", "due_date"),
+    )
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    contract_id: Mapped[str] = mapped_column(
+        ForeignKey("contracts.id"),
+        nullable=False,
+        index=True,
+    )
+    event_type: Mapped[str] = mapped_column(String(32), nullable=False)
+    due_date: Mapped[date] = mapped_column(Date, nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="pending")
+    payload: Mapped[dict[str, Any]] = mapped_column(JSONDocument, nullable=False, default=dict)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_by_actor: Mapped[str | None] = mapped_column(String(120), nullable=True)
+    applied_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
+
+    contract: Mapped[Contract] = relationship(back_populates="scheduled_events")
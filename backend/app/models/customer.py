@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, String, func
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, String, func, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -41,13 +41,27 @@ class Client(Base):
     )
 
 
+LIVE_SUBSCRIBER_CONDITION = "status <> 'terminated'"
+
+
 class Subscriber(Base):
     __tablename__ = "subscribers"
+    __table_args__ = (
+        # A terminated subscriber keeps its number for history; only live ones must be unique,
+        # so a released pool number can be handed out again once its quarantine ends.
+        Index(
+            "uq_subscribers_live_service_identifier",
+            "service_identifier",
+            unique=True,
+            postgresql_where=text(LIVE_SUBSCRIBER_CONDITION),
+            sqlite_where=text(LIVE_SUBSCRIBER_CONDITION),
+        ),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     client_id: Mapped[str] = mapped_column(ForeignKey("clients.id"), nullable=False)
     service_type: Mapped[str] = mapped_column(String(32), nullable=False)
-    service_identifier: Mapped[str] = mapped_column(String(100), nullable=False, unique=True)
+    service_identifier: Mapped[str] = mapped_column(String(100), nullable=False, index=True)
     status: Mapped[str] = mapped_column(String(32), nullable=False, default="active")
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
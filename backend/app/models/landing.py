@@ -1,10 +1,12 @@
 import uuid
 from datetime import datetime
+from typing import Any
 
-from sqlalchemy import DateTime, String, Text, UniqueConstraint, func
+from sqlalchemy import DateTime, String, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
+from app.db.types import JSONDocument
 
 
 class LandingDraft(Base):
@@ -14,7 +16,7 @@ class LandingDraft(Base):
     flow_type: Mapped[str] = mapped_column(String(64), nullable=False)
     step: Mapped[str] = mapped_column(String(64), nullable=False)
     cin: Mapped[str | None] = mapped_column(String(40), nullable=True)
-    payload: Mapped[str] = mapped_column(Text, nullable=False, default="{}")
+    payload: Mapped[dict[str, Any]] = mapped_column(JSONDocument, nullable=False, default=dict)
     status: Mapped[str] = mapped_column(String(32), nullable=False, default="in_progress")
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
@@ -26,26 +28,6 @@ class LandingDraft(Base):
         nullable=False,
         server_default=func.now(),
         onupdate=func.now(),
+        index=True,
     )
 
-
-class IdempotencyRecord(Base):
-    __tablename__ = "idempotency_records"
-    __table_args__ = (
-        UniqueConstraint(
-            "operation",
-            "idempotency_key",
-            name="uq_idempotency_records_operation_key",
-        ),
-    )
-
-    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    operation: Mapped[str] = mapped_column(String(80), nullable=False)
-    idempotency_key: Mapped[str] = mapped_column(String(200), nullable=False)
-    request_hash: Mapped[str] = mapped_column(String(64), nullable=False)
-    response_payload: Mapped[str] = mapped_column(Text, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True),
-        nullable=False,
-        server_default=func.now(),
-    )
@@ -0,0 +1,39 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import DateTime, Index, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class ServiceIdentifierPoolEntry(Base):
+    # Deliberately no FK to subscribers: pool rows outlive the subscriber that held them.
+    __tablename__ = "service_identifier_pool"
+    __table_args__ = (
+        Index("ix_service_identifier_pool_kind_status", "kind", "status", "identifier"),
+        Index(
+            "ix_service_identifier_pool_kind_status_released_at",
+            "kind",
+            "status",
+            "released_at",
+        ),
+    )
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    kind: Mapped[str] = mapped_column(String(16), nullable=False)
+    identifier: Mapped[str] = mapped_column(String(40), nullable=False, unique=True)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="available")
+    allocated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    released_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
@@ -1,8 +1,11 @@
+import json
 from datetime import date, datetime
 from decimal import Decimal
 from typing import Literal
 
-from pydantic import BaseModel, ConfigDict, Field, model_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
+
+from app.schemas.catalog import OfferServiceCategory
 
 AgingBucket = Literal["current", "1_30", "31_60", "61_90", "90_plus"]
 CollectionCaseStatus = Literal["open", "in_progress", "resolved", "closed"]
@@ -21,6 +24,7 @@ PaymentStatus = Literal["posted", "reversed"]
 PaymentMethod = Literal["cash", "card", "bank_transfer", "wallet", "other"]
 InvoiceStatus = Literal["issued", "paid", "overdue", "void"]
 AllocationState = Literal["partial", "full"]
+PaymentAllocationOrder = Literal["oldest_due_first", "newest_due_first"]
 
 
 class PaymentCreate(BaseModel):
@@ -32,6 +36,15 @@ class PaymentCreate(BaseModel):
     note: str | None = Field(default=None, max_length=1200)
 
 
+class ClientPaymentCreate(BaseModel):
+    amount: Decimal = Field(gt=Decimal("0.00"))
+    payment_date: date
+    method: PaymentMethod = "other"
+    reference: str | None = Field(default=None, max_length=120)
+    note: str | None = Field(default=None, max_length=1200)
+    allocation_order: PaymentAllocationOrder = "oldest_due_first"
+
+
 class InvoicePaymentApprovalRequest(BaseModel):
     payment_date: date | None = None
     method: PaymentMethod = "other"
@@ -64,6 +77,14 @@ class PaymentAllocationResult(BaseModel):
     idempotency_replayed: bool = False
 
 
+class ClientPaymentAllocationResult(BaseModel):
+    client_id: str
+    amount: Decimal
+    allocation_order: PaymentAllocationOrder
+    allocations: list[PaymentAllocationResult]
+    idempotency_replayed: bool = False
+
+
 class CollectionCaseRead(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -109,6 +130,12 @@ class CollectionCaseActionRead(BaseModel):
     payload: str
     created_at: datetime
 
+    @field_validator("payload", mode="before")
+    @classmethod
+    def serialize_payload(cls, value: object) -> object:
+        # Stored as a JSON document; the API keeps returning the serialized text.
+        return value if isinstance(value, str) else json.dumps(value, sort_keys=True)
+
 
 class CollectionOverviewRead(BaseModel):
     open_cases: int
@@ -116,3 +143,55 @@ class CollectionOverviewRead(BaseModel):
     overdue_invoices: int
     total_outstanding_amount: Decimal
     bucket_totals: dict[AgingBucket, Decimal]
+
+
+class CollectionAgingSnapshotRead(BaseModel):
+    snapshot_date: date
+    open_cases: int
+    in_progress_cases: int
+    overdue_invoices: int
+    total_outstanding_amount: Decimal
+    bucket_totals: dict[AgingBucket, Decimal]
+    category_totals: dict[OfferServiceCategory, Decimal]
+    updated_at: datetime
+
+
+DunningActionType = Literal["reminder_sent", "warning_sent"]
+DunningCaseStatus = Literal["open", "in_progress"]
+
+
+class DunningRule(BaseModel):
+    action_type: DunningActionType
+    min_days_past_due: int = Field(default=1, ge=1)
+    max_days_past_due: int | None = Field(default=None, ge=1)
+    aging_buckets: list[AgingBucket] | None = None
+    case_statuses: list[DunningCaseStatus] = Field(default=["open", "in_progress"], min_length=1)
+    cooldown_days: int = Field(default=7, ge=1, le=365)
+
+    @model_validator(mode="after")
+    def validate_day_window(self) -> "DunningRule":
+        if self.max_days_past_due is not None and self.max_days_past_due < self.min_days_past_due:
+            raise ValueError("max_days_past_due must be greater than or equal to min_days_past_due")
+        return self
+
+
+class DunningRunRequest(BaseModel):
+    rules: list[DunningRule] = Field(min_length=1, max_length=10)
+    as_of: date | None = None
+    dry_run: bool = False
+    note: str | None = Field(default=None, max_length=1200)
+
+
+class DunningRuleResult(BaseModel):
+    action_type: DunningActionType
+    matched_cases: int
+
+
+class DunningRunResult(BaseModel):
+    run_id: str
+    as_of: date
+    dry_run: bool
+    rules: list[DunningRuleResult]
+    actions_created: int
+    cases_moved_to_in_progress: int
+    notifications_queued: int
@@ -1,13 +1,20 @@
+import json
 from datetime import date, datetime
-from typing import Literal
+from typing import Any, Literal
 
-from pydantic import BaseModel, ConfigDict, Field, model_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 
 from app.schemas.customer import ClientType, SubscriberServiceType
 
 ContractStatus = Literal["draft", "active", "suspended", "terminated"]
 ProvisioningIntent = Literal["auto", "upgrade", "new_line"]
 ProvisioningMode = Literal["upgrade_existing_contract", "new_contract"]
+BatchItemStatus = Literal["provisioned", "failed"]
+ScheduledEventType = Literal["terminate", "offer_change"]
+ScheduledEventStatus = Literal["pending", "applied", "failed", "cancelled"]
+
+CONTRACT_PROVISION_BATCH_MAX_ITEMS = 1000
+CONTRACT_BULK_STATUS_MAX_IDS = 10_000
 
 
 class ProvisionClientInput(BaseModel):
@@ -84,6 +91,104 @@ class ContractStatusUpdate(BaseModel):
     status: ContractStatus
 
 
+class ContractBulkStatusFilter(BaseModel):
+    from_statuses: list[ContractStatus] | None = None
+    client_ids: list[str] | None = None
+    delinquent_clients_only: bool = False
+    offer_id: str | None = None
+    end_date_on_or_before: date | None = None
+
+    @model_validator(mode="after")
+    def validate_not_empty(self) -> "ContractBulkStatusFilter":
+        if not (
+            self.client_ids
+            or self.delinquent_clients_only
+            or self.offer_id
+            or self.end_date_on_or_before
+        ):
+            raise ValueError(
+                "Filter needs client_ids, delinquent_clients_only, offer_id "
+                "or end_date_on_or_before",
+            )
+        return self
+
+
+class ContractBulkStatusUpdate(BaseModel):
+    status: ContractStatus
+    contract_ids: list[str] | None = Field(
+        default=None,
+        min_length=1,
+        max_length=CONTRACT_BULK_STATUS_MAX_IDS,
+    )
+    filter: ContractBulkStatusFilter | None = None
+    dry_run: bool = False
+
+    @model_validator(mode="after")
+    def validate_selection(self) -> "ContractBulkStatusUpdate":
+        if (self.contract_ids is None) == (self.filter is None):
+            raise ValueError("Provide either contract_ids or filter, not both")
+        return self
+
+
+class ContractBulkTransitionCount(BaseModel):
+    from_status: ContractStatus
+    count: int
+
+
+class ContractBulkStatusResult(BaseModel):
+    status: ContractStatus
+    dry_run: bool
+    matched: int
+    changed: int
+    unchanged: int
+    rejected: int
+    transitions: list[ContractBulkTransitionCount]
+    rejected_contract_ids: list[str]
+    missing_contract_ids: list[str]
+
+
+class ContractScheduledEventCreate(BaseModel):
+    event_type: ScheduledEventType
+    due_date: date
+    offer_id: str | None = None
+
+    @model_validator(mode="after")
+    def validate_offer(self) -> "ContractScheduledEventCreate":
+        if self.event_type == "offer_change" and not self.offer_id:
+            raise ValueError("offer_change events require offer_id")
+        if self.event_type == "terminate" and self.offer_id:
+            raise ValueError("terminate events do not accept offer_id")
+        return self
+
+
+class ContractScheduledEventRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    contract_id: str
+    event_type: ScheduledEventType
+    due_date: date
+    status: ScheduledEventStatus
+    payload: str
+    attempts: int
+    last_error: str | None
+    created_by_actor: str | None
+    applied_at: datetime | None
+    created_at: datetime
+    updated_at: datetime
+
+    @field_validator("payload", mode="before")
+    @classmethod
+    def serialize_payload(cls, value: object) -> object:
+        # Stored as a JSON document; the API keeps returning the serialized text.
+        return value if isinstance(value, str) else json.dumps(value, sort_keys=True)
+
+
+class ContractScheduleRunResult(BaseModel):
+    applied: int
+    failed: int
+
+
 class ContractOfferUpdate(BaseModel):
     offer_id: str
 
@@ -115,9 +220,42 @@ class ContractAuditEventRead(BaseModel):
     details: str
     created_at: datetime
 
+    @field_validator("details", mode="before")
+    @classmethod
+    def serialize_details(cls, value: object) -> object:
+        # Stored as a JSON document; the API keeps returning the serialized text.
+        return value if isinstance(value, str) else json.dumps(value, sort_keys=True)
+
 
 class ContractProvisionResult(BaseModel):
     contract: ContractRead
     created_client: bool
     created_subscriber: bool
     provisioning_mode: ProvisioningMode
+
+
+class ContractBatchProvisionRequest(BaseModel):
+    items: list[ContractProvisionRequest] = Field(
+        min_length=1,
+        max_length=CONTRACT_PROVISION_BATCH_MAX_ITEMS,
+    )
+
+
+class ContractBatchProvisionError(BaseModel):
+    status_code: int
+    code: str
+    message: str
+    details: dict[str, Any]
+
+
+class ContractBatchProvisionItemResult(BaseModel):
+    index: int
+    status: BatchItemStatus
+    result: ContractProvisionResult | None = None
+    error: ContractBatchProvisionError | None = None
+
+
+class ContractBatchProvisionResult(BaseModel):
+    provisioned_count: int
+    failed_count: int
+    items: list[ContractBatchProvisionItemResult]
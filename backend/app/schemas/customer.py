@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Literal
+from typing import Any, Literal
 
 from pydantic import BaseModel, ConfigDict, Field, field_validator
 
@@ -93,3 +93,46 @@ class SubscriberRead(BaseModel):
     status: SubscriberStatus
     created_at: datetime
     updated_at: datetime
+
+
+ClientSearchField = Literal["full_name", "cin", "phone", "email", "service_identifier"]
+
+
+class ClientSearchHit(BaseModel):
+    client: ClientRead
+    score: float
+    matched_on: list[ClientSearchField]
+
+
+class ClientSearchResult(BaseModel):
+    query: str
+    results: list[ClientSearchHit]
+
+
+CustomerImportFormat = Literal["csv", "ndjson"]
+
+
+class CustomerImportReject(BaseModel):
+    line: int
+    code: str
+    message: str
+    details: dict[str, Any] = Field(default_factory=dict)
+
+
+class CustomerImportResult(BaseModel):
+    rows_read: int
+    clients_created: int
+    clients_matched: int
+    subscribers_created: int
+    rejected_count: int
+    reject_file: str | None
+    rejects_sample: list[CustomerImportReject]
+
+
+class ClientPurgeResult(BaseModel):
+    created_before: datetime
+    dry_run: bool
+    clients_matched: int
+    clients_deleted: int
+    subscribers_deleted: int
+    batches: int
@@ -0,0 +1,34 @@
+from datetime import datetime
+from decimal import Decimal
+
+from pydantic import BaseModel
+
+from app.schemas.billing import InvoiceRead
+from app.schemas.catalog import OfferRead
+from app.schemas.contract import ContractRead
+from app.schemas.customer import ClientRead, SubscriberRead
+
+
+class ClientAccountSummary(BaseModel):
+    outstanding_amount: Decimal
+    overdue_amount: Decimal
+    invoice_count: int
+    open_invoice_count: int
+    overdue_invoice_count: int
+    open_collection_case_count: int
+    is_delinquent: bool
+    delinquent_since: datetime | None
+
+
+class ClientOverviewContract(BaseModel):
+    contract: ContractRead
+    offer: OfferRead
+
+
+class ClientOverviewRead(BaseModel):
+    client: ClientRead
+    subscribers: list[SubscriberRead]
+    open_contracts: list[ClientOverviewContract]
+    recent_invoices: list[InvoiceRead]
+    summary: ClientAccountSummary
+    summary_cached: bool
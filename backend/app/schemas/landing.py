@@ -74,6 +74,26 @@ class LandingDraftUpdate(BaseModel):
         return normalized
 
 
+class LandingDraftPatch(BaseModel):
+    step: str | None = Field(default=None, min_length=2, max_length=64)
+    cin: str | None = Field(default=None, min_length=4, max_length=40)
+    payload: dict[str, Any] | None = Field(
+        default=None,
+        description="JSON merge patch (RFC 7386) applied to the stored draft payload.",
+    )
+    status: LandingDraftStatus | None = None
+
+    @field_validator("cin")
+    @classmethod
+    def normalize_cin(cls, value: str | None) -> str | None:
+        if value is None:
+            return None
+        normalized = value.strip().upper()
+        if len(normalized) < 4:
+            raise ValueError("CIN must have at least 4 non-space characters")
+        return normalized
+
+
 class LandingDraftRead(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -276,3 +296,4 @@ class LandingInvoiceSummary(BaseModel):
 class LandingInvoiceLookupResponse(BaseModel):
     client: LandingClientSummary
     invoices: list[LandingInvoiceSummary]
+    next_cursor: str | None = None
@@ -0,0 +1,54 @@
+from typing import Literal
+
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+IdentifierKind = Literal["mobile", "landline"]
+IdentifierPoolStatus = Literal["available", "allocated", "released"]
+
+IDENTIFIER_RANGE_MAX_SIZE = 100_000
+
+
+class IdentifierRangeImport(BaseModel):
+    kind: IdentifierKind
+    range_start: str = Field(description="First national significant number (9 digits).")
+    range_end: str = Field(description="Last national significant number (9 digits), inclusive.")
+
+    @field_validator("range_start", "range_end")
+    @classmethod
+    def normalize_nsn(cls, value: str) -> str:
+        digits = "".join(char for char in value if char.isdigit())
+        if digits.startswith("212"):
+            digits = digits[3:]
+        elif digits.startswith("0"):
+            digits = digits[1:]
+        if len(digits) != 9:
+            raise ValueError("Number must contain a valid Moroccan national format")
+        return digits
+
+    @model_validator(mode="after")
+    def validate_range(self) -> "IdentifierRangeImport":
+        allowed_prefixes = {"6", "7"} if self.kind == "mobile" else {"5", "8"}
+        if self.range_start[0] not in allowed_prefixes or self.range_end[0] not in allowed_prefixes:
+            raise ValueError(f"{self.kind} numbers must start with {sorted(allowed_prefixes)}")
+        size = int(self.range_end) - int(self.range_start) + 1
+        if size < 1:
+            raise ValueError("range_end must be greater than or equal to range_start")
+        if size > IDENTIFIER_RANGE_MAX_SIZE:
+            raise ValueError(f"A single import cannot exceed {IDENTIFIER_RANGE_MAX_SIZE} numbers")
+        return self
+
+
+class IdentifierRangeImportResult(BaseModel):
+    kind: IdentifierKind
+    requested: int
+    inserted: int
+    skipped_existing: int
+    already_assigned: int
+
+
+class IdentifierPoolStats(BaseModel):
+    kind: IdentifierKind
+    available: int
+    allocated: int
+    released: int
+    total: int
@@ -0,0 +1,30 @@
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict
+
+OutboxEventStatus = Literal["pending", "delivered", "failed"]
+
+
+class OutboxEventRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    event_type: str
+    aggregate_type: str
+    aggregate_id: str
+    payload: str
+    status: OutboxEventStatus
+    attempts: int
+    last_error: str | None
+    available_at: datetime
+    delivered_at: datetime | None
+    created_at: datetime
+
+
+class OutboxDispatchResult(BaseModel):
+    sink: str
+    claimed: int
+    delivered: int
+    retried: int = 0
+    failed: int = 0
@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+
+
+class RateLimitScopeCounters(BaseModel):
+    scope: str
+    allowed: int
+    limited: int
+
+
+class RateLimitStats(BaseModel):
+    enabled: bool
+    backend: str
+    inflight: int
+    max_inflight: int
+    shed: int
+    scopes: list[RateLimitScopeCounters]
@@ -0,0 +1,140 @@
+from collections.abc import Sequence
+from typing import Any
+
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session, SessionTransaction
+
+from app.models.contract import ContractAuditEvent
+from app.services.outbox_service import enqueue_events
+
+AUDIT_BUFFER_KEY = "contract_audit_buffer"
+AUDIT_SAVEPOINT_MARKS_KEY = "contract_audit_savepoint_marks"
+AUDIT_COMMITTING_SAVEPOINT_KEY = "contract_audit_committing_savepoint"
+
+AuditEvent = tuple[str, str, dict[str, object]]
+
+
+def _buffer(db: Session) -> list[dict[str, Any]]:
+    buffer: list[dict[str, Any]] = db.info.setdefault(AUDIT_BUFFER_KEY, [])
+    return buffer
+
+
+def record_contract_audit_events(
+    db: Session,
+    events: Sequence[AuditEvent],
+    actor_id: str | None,
+) -> None:
+    """Queue ``(contract_id, event_type, details)`` audit events until the session commits.
+
+    Nothing is written here: the whole transaction's events are inserted with one multi-row
+    statement (plus one for their outbox rows) right before commit, and dropped on rollback.
+    """
+    if not db.in_transaction():
+        # Tie the events to a transaction so a rollback before any other statement drops them.
+        db.begin()
+    _buffer(db).extend(
+        {
+            "contract_id": contract_id,
+            "event_type": event_type,
+            "actor_id": actor_id,
+            "details": details,
+        }
+        for contract_id, event_type, details in events
+    )
+
+
+def record_contract_audit_event(
+    db: Session,
+    contract_id: str,
+    event_type: str,
+    actor_id: str | None,
+    details: dict[str, object] | None = None,
+) -> None:
+    record_contract_audit_events(db, [(contract_id, event_type, details or {})], actor_id)
+
+
+def pending_contract_audit_events(db: Session) -> int:
+    return len(db.info.get(AUDIT_BUFFER_KEY, []))
+
+
+def flush_contract_audit_events(db: Session) -> int:
+    events: list[dict[str, Any]] = db.info.pop(AUDIT_BUFFER_KEY, [])
+    if not events:
+        return 0
+    # Audit rows reference contracts that may still be pending in the unit of work.
+    db.flush()
+    db.execute(
+        insert(ContractAuditEvent),
+        [
+            {
+                "contract_id": audit["contract_id"],
+                "event_type": audit["event_type"],
+                "actor_id": audit["actor_id"],
+                "details": audit["details"],
+            }
+            for audit in events
+        ],
+    )
+    enqueue_events(
+        db,
+        [
+            {
+                "event_type": f"contract.{audit['event_type']}",
+                "aggregate_type": "contract",
+                "aggregate_id": audit["contract_id"],
+                "payload": {
+                    "contract_id": audit["contract_id"],
+                    "actor_id": audit["actor_id"],
+                    "details": audit["details"],
+                },
+            }
+            for audit in events
+        ],
+    )
+    return len(events)
+
+
+@event.listens_for(Session, "after_transaction_create")
+def _mark_audit_savepoint(session: Session, transaction: SessionTransaction) -> None:
+    if transaction.nested:
+        marks = session.info.setdefault(AUDIT_SAVEPOINT_MARKS_KEY, {})
+        marks[transaction] = pending_contract_audit_events(session)
+
+
+@event.listens_for(Session, "before_commit")
+def _write_audit_events_before_commit(session: Session) -> None:
+    nested = session.get_nested_transaction()
+    if nested is None:
+        flush_contract_audit_events(session)
+        return
+    # Releasing a savepoint fires this once and keeps its events queued for the outer commit.
+    # A root commit with that savepoint still open fires it for the root and then again while
+    # committing the same savepoint, so seeing the same transaction twice means the root is
+    # committing and the events must be written now.
+    if session.info.get(AUDIT_COMMITTING_SAVEPOINT_KEY) is nested:
+        flush_contract_audit_events(session)
+    else:
+        session.info[AUDIT_COMMITTING_SAVEPOINT_KEY] = nested
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_savepoint_audit_events(
+    session: Session,
+    previous_transaction: SessionTransaction,
+) -> None:
+    if not previous_transaction.nested:
+        return
+    mark = session.info.get(AUDIT_SAVEPOINT_MARKS_KEY, {}).pop(previous_transaction, None)
+    if mark is not None:
+        del _buffer(session)[mark:]
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_audit_events(session: Session, transaction: SessionTransaction) -> None:
+    # Savepoint marks live until the savepoint rolls back or the root transaction ends;
+    # whatever the root transaction did not commit (rollback, close) is discarded.
+    if session.info.get(AUDIT_COMMITTING_SAVEPOINT_KEY) is transaction:
+        session.info.pop(AUDIT_COMMITTING_SAVEPOINT_KEY)
+    if transaction.parent is None:
+        session.info.pop(AUDIT_BUFFER_KEY, None)
+        session.info.pop(AUDIT_SAVEPOINT_MARKS_KEY, None)
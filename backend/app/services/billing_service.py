@@ -29,6 +29,13 @@ from app.models.catalog import Offer
 from app.models.contract import Contract
 from app.models.customer import Client
 from app.schemas.billing import BillingRunRequest, BillingRunResult
+from app.services.idempotency_service import (
+    normalize_idempotency_key,
+    raise_idempotency_payload_conflict,
+    request_hash,
+    run_idempotent,
+)
+from app.services.outbox_service import enqueue_event
 
 logger = logging.getLogger("mt_facturation.billing")
 MONEY_QUANT = Decimal("0.01")
@@ -42,11 +49,6 @@ def _money(value: Decimal) -> Decimal:
     return value.quantize(MONEY_QUANT, rounding=ROUND_HALF_UP)
 
 
-def _request_hash(payload: dict[str, Any]) -> str:
-    serialized = json.dumps(payload, sort_keys=True, default=str)
-    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
-
-
 def _invoice_documents_root() -> Path:
     configured = get_settings().invoice_documents_dir.strip()
     base = Path(configured)
@@ -279,24 +281,38 @@ def run_billing_cycle(
     payload: BillingRunRequest,
     idempotency_key: str,
 ) -> BillingRunResult:
-    normalized_key = idempotency_key.strip()
-    if len(normalized_key) < 8:
-        raise ApiException(
-            status_code=400,
-            code="idempotency_key_invalid",
-            message="Idempotency-Key header must contain at least 8 characters",
-        )
-
+    normalized_key = normalize_idempotency_key(idempotency_key)
     request_payload = payload.model_dump(mode="json")
-    payload_hash = _request_hash(request_payload)
-    existing = db.scalar(select(BillingRun).where(BillingRun.idempotency_key == normalized_key))
+    result, replayed = run_idempotent(
+        db,
+        operation="billing_run",
+        idempotency_key=normalized_key,
+        request_payload=request_payload,
+        response_model=BillingRunResult,
+        execute=lambda: _execute_billing_cycle(
+            db,
+            payload=payload,
+            idempotency_key=normalized_key,
+            payload_hash=request_hash(request_payload),
+        ),
+    )
+    if replayed:
+        return result.model_copy(update={"idempotency_replayed": True})
+    return result
+
+
+def _execute_billing_cycle(
+    db: Session,
+    *,
+    payload: BillingRunRequest,
+    idempotency_key: str,
+    payload_hash: str,
+) -> BillingRunResult:
+    # Runs recorded before the shared idempotency store only carry the key on the run row.
+    existing = db.scalar(select(BillingRun).where(BillingRun.idempotency_key == idempotency_key))
     if existing:
         if existing.request_hash != payload_hash:
-            raise ApiException(
-                status_code=409,
-                code="idempotency_key_payload_conflict",
-                message="Idempotency-Key was already used with a different payload",
-            )
+            raise_idempotency_payload_conflict()
         return _build_run_result(existing).model_copy(update={"idempotency_replayed": True})
 
     contracts = list(
@@ -318,7 +334,7 @@ def run_billing_cycle(
         period_start=payload.period_start,
         period_end=payload.period_end,
         status="completed",
-        idempotency_key=normalized_key,
+        idempotency_key=idempotency_key,
         request_hash=payload_hash,
         summary_payload="{}",
     )
@@ -422,6 +438,20 @@ def run_billing_cycle(
         sort_keys=True,
     )
     db.add(run)
+    enqueue_event(
+        db,
+        event_type="billing.run_completed",
+        aggregate_type="billing_run",
+        aggregate_id=run.id,
+        payload={
+            "run_id": run.id,
+            "period_start": run.period_start.isoformat(),
+            "period_end": run.period_end.isoformat(),
+            "invoice_count": run.invoice_count,
+            "invoice_ids": all_invoice_ids,
+            "total_amount": str(run.total_amount),
+        },
+    )
     db.commit()
     db.refresh(run)
 
@@ -0,0 +1,447 @@
+import bisect
+import logging
+import re
+import threading
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Protocol
+
+from sqlalchemy import (
+    CompoundSelect,
+    Select,
+    exists,
+    func,
+    intersect,
+    literal_column,
+    or_,
+    select,
+    text,
+    union,
+)
+from sqlalchemy.orm import Session
+
+from app.models.customer import Client, Subscriber
+from app.schemas.customer import ClientRead, ClientSearchField, ClientSearchHit, ClientSearchResult
+
+logger = logging.getLogger("mt_facturation.customer")
+
+CLIENT_SEARCH_MIN_QUERY_LENGTH = 3
+CLIENT_SEARCH_MAX_TERMS = 4
+CLIENT_SEARCH_LIMIT = 10
+CLIENT_SEARCH_LIMIT_MAX = 50
+
+_TOKEN_SPLIT = re.compile(r"[\W_]+")
+# Re-read rows stamped just before the watermark: timestamp precision differs between
+# server defaults and bound parameters, and re-indexing a row is idempotent.
+_REFRESH_OVERLAP = timedelta(seconds=1)
+
+
+def _tokenize(value: str | None) -> list[str]:
+    if not value:
+        return []
+    return [token for token in _TOKEN_SPLIT.split(value.casefold()) if token]
+
+
+def _query_terms(query: str) -> list[str]:
+    terms = _tokenize(query)
+    if terms and all(term.isdigit() for term in terms):
+        # "216 55 123 456" and "+21655123456" are the same MSISDN.
+        return ["".join(terms)]
+    return terms[:CLIENT_SEARCH_MAX_TERMS]
+
+
+class ClientSearchBackend(Protocol):
+    name: str
+
+    def search(self, db: Session, terms: list[str], *, limit: int) -> list[ClientSearchHit]: ...
+
+
+def _digits_only(column: Any) -> Any:
+    # Literal arguments keep the expression identical to the ``*_digits_trgm`` index
+    # definitions, which the planner needs to match the index.
+    return func.regexp_replace(
+        column,
+        literal_column("'\\D'"),
+        literal_column("''"),
+        literal_column("'g'"),
+    )
+
+
+class TrigramClientSearch:
+    """Postgres search over ``pg_trgm`` GIN indexes on the client and identifier columns.
+
+    Every term must appear somewhere in the client (infix ``ILIKE``). Candidates come from one
+    index scan per column and term, combined with ``UNION``/``INTERSECT``, so no OR forces a
+    sequential scan; they rank by the best trigram similarity between the query and any column.
+    A digits-only term also matches the digits of the phone and service identifier columns.
+    """
+
+    name = "trigram"
+
+    def statement(self, terms: list[str], *, limit: int) -> Select[Any]:
+        query = " ".join(terms)
+        columns: dict[ClientSearchField, Any] = {
+            "full_name": Client.full_name,
+            "cin": Client.cin,
+            "phone": Client.phone,
+            "email": Client.email,
+        }
+        numeric = len(terms) == 1 and terms[0].isdigit()
+
+        def column_matches(field: ClientSearchField, column: Any, term: str) -> Any:
+            if numeric and field in {"phone", "service_identifier"}:
+                return or_(
+                    column.icontains(term, autoescape=True),
+                    _digits_only(column).contains(term, autoescape=True),
+                )
+            return column.icontains(term, autoescape=True)
+
+        def term_candidates(term: str) -> CompoundSelect:
+            selects = [
+                select(Client.id).where(column.icontains(term, autoescape=True))
+                for column in columns.values()
+            ]
+            selects.append(
+                select(Subscriber.client_id).where(
+                    Subscriber.service_identifier.icontains(term, autoescape=True),
+                ),
+            )
+            if numeric:
+                # Separate branches keep each one on its own index.
+                selects.append(
+                    select(Client.id).where(
+                        _digits_only(Client.phone).contains(term, autoescape=True),
+                    ),
+                )
+                selects.append(
+                    select(Subscriber.client_id).where(
+                        _digits_only(Subscriber.service_identifier).contains(
+                            term,
+                            autoescape=True,
+                        ),
+                    ),
+                )
+            return union(*selects)
+
+        term_subqueries = [term_candidates(term).subquery() for term in terms]
+        candidates = (
+            intersect(*(select(subquery.c.id) for subquery in term_subqueries))
+            if len(term_subqueries) > 1
+            else select(term_subqueries[0].c.id)
+        ).subquery()
+        identifier_text = (
+            _digits_only(Subscriber.service_identifier)
+            if numeric
+            else func.lower(Subscriber.service_identifier)
+        )
+        identifier_similarity = (
+            select(func.max(func.similarity(identifier_text, query)))
+            .where(Subscriber.client_id == Client.id)
+            .scalar_subquery()
+        )
+        identifier_matched = exists().where(
+            Subscriber.client_id == Client.id,
+            or_(
+                *(
+                    column_matches("service_identifier", Subscriber.service_identifier, term)
+                    for term in terms
+                ),
+            ),
+        )
+        similarities = [
+            func.similarity(func.lower(func.coalesce(column, "")), query)
+            for column in columns.values()
+        ]
+        if numeric:
+            similarities.append(
+                func.similarity(func.coalesce(_digits_only(Client.phone), ""), query),
+            )
+        score = func.greatest(*similarities, func.coalesce(identifier_similarity, 0))
+        return (
+            select(
+                Client,
+                score.label("score"),
+                *(
+                    or_(*(column_matches(field, column, term) for term in terms)).label(field)
+                    for field, column in columns.items()
+                ),
+                identifier_matched.label("service_identifier"),
+            )
+            .join(candidates, candidates.c.id == Client.id)
+            .order_by(score.desc(), Client.full_name.asc(), Client.id.asc())
+            .limit(limit)
+        )
+
+    def search(self, db: Session, terms: list[str], *, limit: int) -> list[ClientSearchHit]:
+        rows = db.execute(self.statement(terms, limit=limit)).all()
+        fields: list[ClientSearchField] = [
+            "full_name",
+            "cin",
+            "phone",
+            "email",
+            "service_identifier",
+        ]
+        return [
+            ClientSearchHit(
+                client=ClientRead.model_validate(row[0]),
+                score=round(float(row.score or 0), 4),
+                matched_on=[field for field in fields if getattr(row, field)],
+            )
+            for row in rows
+        ]
+
+
+class MemoryClientSearchIndex:
+    """Process-local prefix index for SQLite and single-node development setups.
+
+    The index catches up on clients and subscribers whose ``updated_at`` moved since the last
+    search; deleted clients are dropped when a hit no longer loads. Terms match token prefixes.
+    """
+
+    name = "memory"
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tokens: list[str] = []
+            self._postings: dict[str, set[tuple[str, str]]] = {}
+            self._documents: dict[tuple[str, str], tuple[str, dict[str, ClientSearchField]]] = {}
+            self._client_documents: dict[str, set[tuple[str, str]]] = {}
+            self._client_watermark: datetime | None = None
+            self._subscriber_watermark: datetime | None = None
+
+    def _remove_document(self, key: tuple[str, str]) -> None:
+        document = self._documents.pop(key, None)
+        if document is None:
+            return
+        client_id, tokens = document
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.discard(key)
+            if not postings:
+                del self._postings[token]
+                position = bisect.bisect_left(self._tokens, token)
+                if position < len(self._tokens) and self._tokens[position] == token:
+                    del self._tokens[position]
+        keys = self._client_documents.get(client_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._client_documents[client_id]
+
+    def _add_document(
+        self,
+        key: tuple[str, str],
+        client_id: str,
+        values: Iterable[tuple[ClientSearchField, str | None]],
+    ) -> None:
+        self._remove_document(key)
+        tokens: dict[str, ClientSearchField] = {}
+        for field, value in values:
+            field_tokens = _tokenize(value)
+            if field in {"phone", "service_identifier"} and len(field_tokens) > 1:
+                field_tokens.append("".join(field_tokens))
+            for token in field_tokens:
+                tokens.setdefault(token, field)
+        self._documents[key] = (client_id, tokens)
+        self._client_documents.setdefault(client_id, set()).add(key)
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = set()
+                bisect.insort(self._tokens, token)
+            postings.add(key)
+
+    def _remove_client(self, client_id: str) -> None:
+        for key in list(self._client_documents.get(client_id, ())):
+            self._remove_document(key)
+
+    def _refresh(self, db: Session) -> None:
+        client_query = select(
+            Client.id,
+            Client.full_name,
+            Client.cin,
+            Client.phone,
+            Client.email,
+            Client.updated_at,
+        )
+        if self._client_watermark is not None:
+            client_query = client_query.where(
+                Client.updated_at >= self._client_watermark - _REFRESH_OVERLAP,
+            )
+        subscriber_query = select(
+            Subscriber.id,
+            Subscriber.client_id,
+            Subscriber.service_identifier,
+            Subscriber.updated_at,
+        )
+        if self._subscriber_watermark is not None:
+            subscriber_query = subscriber_query.where(
+                Subscriber.updated_at >= self._subscriber_watermark - _REFRESH_OVERLAP,
+            )
+
+        for client in db.execute(client_query):
+            self._add_document(
+                ("client", client.id),
+                client.id,
+                (
+                    ("full_name", client.full_name),
+                    ("cin", client.cin),
+                    ("phone", client.phone),
+                    ("email", client.email),
+                ),
+            )
+            if self._client_watermark is None or client.updated_at > self._client_watermark:
+                self._client_watermark = client.updated_at
+        for subscriber in db.execute(subscriber_query):
+            self._add_document(
+                ("subscriber", subscriber.id),
+                subscriber.client_id,
+                (("service_identifier", subscriber.service_identifier),),
+            )
+            if (
+                self._subscriber_watermark is None
+                or subscriber.updated_at > self._subscriber_watermark
+            ):
+                self._subscriber_watermark = subscriber.updated_at
+
+    def _rank(self, terms: list[str]) -> list[tuple[float, str, list[ClientSearchField], set[str]]]:
+        """Rank clients matching every term; each entry carries the subscriber ids it matched on."""
+        scores: dict[str, float] = {}
+        matched: dict[str, set[ClientSearchField]] = {}
+        subscriber_ids: dict[str, set[str]] = {}
+        for position, term in enumerate(terms):
+            term_scores: dict[str, float] = {}
+            start = bisect.bisect_left(self._tokens, term)
+            for token in self._tokens[start:]:
+                if not token.startswith(term):
+                    break
+                closeness = len(term) / len(token)
+                for key in self._postings[token]:
+                    client_id, tokens = self._documents[key]
+                    if closeness > term_scores.get(client_id, 0.0):
+                        term_scores[client_id] = closeness
+                    matched.setdefault(client_id, set()).add(tokens[token])
+                    if key[0] == "subscriber":
+                        subscriber_ids.setdefault(client_id, set()).add(key[1])
+            if position == 0:
+                scores = term_scores
+            else:
+                scores = {
+                    client_id: scores[client_id] + closeness
+                    for client_id, closeness in term_scores.items()
+                    if client_id in scores
+                }
+        return sorted(
+            (
+                (
+                    round(total / len(terms), 4),
+                    client_id,
+                    sorted(matched[client_id]),
+                    subscriber_ids.get(client_id, set()),
+                )
+                for client_id, total in scores.items()
+            ),
+            key=lambda entry: -entry[0],
+        )
+
+    def search(self, db: Session, terms: list[str], *, limit: int) -> list[ClientSearchHit]:
+        with self._lock:
+            self._refresh(db)
+            ranked = self._rank(terms)
+
+        hits: list[ClientSearchHit] = []
+        while ranked and len(hits) < limit:
+            window, ranked = ranked[: limit - len(hits)], ranked[limit - len(hits) :]
+            window_ids = [client_id for _, client_id, _, _ in window]
+            clients = {
+                client.id: client
+                for client in db.scalars(select(Client).where(Client.id.in_(window_ids)))
+            }
+            # Deletes leave no updated_at behind, so hits are checked against the database.
+            matched_subscriber_ids = set().union(*(ids for _, _, _, ids in window))
+            live_subscriber_ids = (
+                set(
+                    db.scalars(
+                        select(Subscriber.id).where(Subscriber.id.in_(matched_subscriber_ids)),
+                    ),
+                )
+                if matched_subscriber_ids
+                else set()
+            )
+            missing_clients = [client_id for client_id in window_ids if client_id not in clients]
+            stale_subscribers = matched_subscriber_ids - live_subscriber_ids
+            if missing_clients or stale_subscribers:
+                with self._lock:
+                    for client_id in missing_clients:
+                        self._remove_client(client_id)
+                    for subscriber_id in stale_subscribers:
+                        self._remove_document(("subscriber", subscriber_id))
+                    if stale_subscribers:
+                        # Scores and matches of the affected clients changed; rank again.
+                        seen = {hit.client.id for hit in hits}
+                        ranked = [
+                            entry for entry in self._rank(terms) if entry[1] not in seen
+                        ]
+                        continue
+            hits.extend(
+                ClientSearchHit(
+                    client=ClientRead.model_validate(clients[client_id]),
+                    score=score,
+                    matched_on=matched_on,
+                )
+                for score, client_id, matched_on, _ in window
+                if client_id in clients
+            )
+        # Equal scores keep a stable, readable order.
+        return sorted(hits, key=lambda hit: (-hit.score, hit.client.full_name, hit.client.id))
+
+
+@lru_cache(maxsize=1)
+def get_client_search_index() -> MemoryClientSearchIndex:
+    return MemoryClientSearchIndex()
+
+
+_trigram_available: dict[str, bool] = {}
+
+
+def _has_trigram_extension(db: Session) -> bool:
+    # Startup tolerates a role that cannot create pg_trgm; search then uses the memory index.
+    url = str(db.get_bind().engine.url)
+    if url not in _trigram_available:
+        _trigram_available[url] = (
+            db.scalar(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")) is not None
+        )
+    return _trigram_available[url]
+
+
+def _search_backend(db: Session) -> ClientSearchBackend:
+    if db.get_bind().dialect.name == "postgresql" and _has_trigram_extension(db):
+        return TrigramClientSearch()
+    return get_client_search_index()
+
+
+def search_clients(
+    db: Session,
+    *,
+    query: str,
+    limit: int = CLIENT_SEARCH_LIMIT,
+) -> ClientSearchResult:
+    terms = _query_terms(query)
+    if not terms:
+        return ClientSearchResult(query=query, results=[])
+    backend = _search_backend(db)
+    results = backend.search(db, terms, limit=limit)
+    logger.debug(
+        "customer.search backend=%s terms=%s hits=%s",
+        backend.name,
+        len(terms),
+        len(results),
+    )
+    return ClientSearchResult(query=query, results=results)
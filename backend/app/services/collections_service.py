@@ -1,33 +1,62 @@
-import hashlib
-import json
 import logging
-from datetime import UTC, date, datetime
+import uuid
+from datetime import UTC, date, datetime, time, timedelta
 from decimal import ROUND_HALF_UP, Decimal
 from typing import Any, cast
 
-from sqlalchemy import func, select
+from sqlalchemy import ColumnElement, Row, Select, and_, func, insert, or_, select, true, update
+from sqlalchemy import case as sql_case
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.common.errors import ApiException
-from app.models.billing import Invoice
-from app.models.collections import CollectionCase, CollectionCaseAction, Payment
+from app.models.billing import Invoice, InvoiceLine
+from app.models.catalog import Offer
+from app.models.collections import (
+    CollectionAgingSnapshot,
+    CollectionCase,
+    CollectionCaseAction,
+    Payment,
+)
+from app.models.contract import Contract
 from app.models.customer import Client
+from app.schemas.catalog import OfferServiceCategory
 from app.schemas.collections import (
     AgingBucket,
     AllocationState,
+    ClientPaymentAllocationResult,
+    ClientPaymentCreate,
+    CollectionAgingSnapshotRead,
     CollectionCaseActionCreate,
     CollectionCaseStatus,
     CollectionCaseStatusUpdate,
     CollectionOverviewRead,
+    DunningRule,
+    DunningRuleResult,
+    DunningRunRequest,
+    DunningRunResult,
     InvoicePaymentApprovalRequest,
     InvoiceStatus,
     PaymentAllocationResult,
     PaymentCreate,
     PaymentRead,
 )
+from app.services.idempotency_service import (
+    normalize_idempotency_key,
+    raise_idempotency_payload_conflict,
+    request_hash,
+    run_idempotent,
+)
+from app.services.outbox_service import enqueue_event, enqueue_events
 
 logger = logging.getLogger("mt_facturation.collections")
 MONEY_QUANT = Decimal("0.01")
+DELINQUENCY_BATCH_SIZE = 500
+DUNNING_BATCH_SIZE = 1000
+DUNNING_ACTION_TYPES = ("reminder_sent", "warning_sent")
+ACTIVE_CASE_STATUSES = ("open", "in_progress")
+AGING_HISTORY_DEFAULT_DAYS = 90
+AGING_HISTORY_MAX_DAYS = 366
 
 
 def _now_utc() -> datetime:
@@ -38,11 +67,6 @@ def _money(value: Decimal) -> Decimal:
     return value.quantize(MONEY_QUANT, rounding=ROUND_HALF_UP)
 
 
-def _request_hash(payload: dict[str, Any]) -> str:
-    serialized = json.dumps(payload, sort_keys=True, default=str)
-    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
-
-
 def _sum_posted_payments(db: Session, invoice_id: str) -> Decimal:
     total = db.scalar(
         select(func.coalesce(func.sum(Payment.amount), 0))
@@ -74,6 +98,24 @@ def _get_invoice(db: Session, invoice_id: str) -> Invoice:
     return invoice
 
 
+def _lock_invoice(db: Session, invoice_id: str) -> Invoice:
+    # Row-level lock scoped to one invoice: postings on the same invoice serialize here,
+    # postings on other invoices proceed in parallel.
+    invoice = db.scalar(
+        select(Invoice)
+        .where(Invoice.id == invoice_id)
+        .with_for_update()
+        .execution_options(populate_existing=True),
+    )
+    if invoice is None:
+        raise ApiException(
+            status_code=404,
+            code="invoice_not_found",
+            message="Invoice was not found",
+        )
+    return invoice
+
+
 def _append_case_action(
     db: Session,
     *,
@@ -88,7 +130,7 @@ def _append_case_action(
         action_type=action_type,
         actor_id=actor_id,
         note=note,
-        payload=json.dumps(payload or {}, sort_keys=True),
+        payload=payload or {},
     )
     collection_case.last_action_at = _now_utc()
     db.add(collection_case)
@@ -97,19 +139,68 @@ def _append_case_action(
     return action
 
 
-def _set_client_delinquency(db: Session, *, client_id: str, is_delinquent: bool) -> None:
-    client = db.get(Client, client_id)
-    if client is None:
+def _recompute_client_delinquency(db: Session, client_ids: set[str]) -> None:
+    # One UPDATE ... FROM per batch of clients; only rows whose flag actually flips are
+    # touched, so delinquent_since is stamped on the false->true transition only.
+    ordered_ids = sorted(client_ids)
+    for offset in range(0, len(ordered_ids), DELINQUENCY_BATCH_SIZE):
+        batch_ids = ordered_ids[offset : offset + DELINQUENCY_BATCH_SIZE]
+        flags = (
+            select(
+                Invoice.client_id.label("client_id"),
+                func.max(sql_case((Invoice.status == "overdue", 1), else_=0)).label("has_overdue"),
+            )
+            .where(Invoice.client_id.in_(batch_ids))
+            .group_by(Invoice.client_id)
+            .subquery()
+        )
+        has_overdue = flags.c.has_overdue == 1
+        db.execute(
+            update(Client)
+            .where(Client.id == flags.c.client_id, Client.is_delinquent != has_overdue)
+            .values(
+                is_delinquent=has_overdue,
+                delinquent_since=sql_case((has_overdue, _now_utc()), else_=None),
+            )
+            .execution_options(synchronize_session="fetch"),
+        )
+
+
+def _mark_delinquency_dirty(
+    db: Session,
+    client_id: str,
+    delinquency_client_ids: set[str] | None,
+) -> None:
+    # Batch callers collect client ids and recompute once; single-invoice callers recompute now.
+    if delinquency_client_ids is not None:
+        delinquency_client_ids.add(client_id)
         return
-    if is_delinquent:
-        if not client.is_delinquent:
-            client.is_delinquent = True
-            client.delinquent_since = _now_utc()
-    else:
-        client.is_delinquent = False
-        client.delinquent_since = None
-    db.add(client)
-    db.flush()
+    _recompute_client_delinquency(db, {client_id})
+
+
+def _apply_posted_payment(
+    db: Session,
+    *,
+    invoice: Invoice,
+    payment: Payment,
+    actor_id: str,
+    paid_total: Decimal | None = None,
+    delinquency_client_ids: set[str] | None = None,
+) -> CollectionCase | None:
+    outstanding_after, case = _sync_invoice_collection_state(
+        db,
+        invoice=invoice,
+        actor_id=actor_id,
+        add_payment_action=True,
+        payment_amount=payment.amount,
+        delinquency_client_ids=delinquency_client_ids,
+        paid_total=paid_total,
+    )
+    payment.outstanding_after = _money(outstanding_after)
+    payment.invoice_status_after = invoice.status
+    payment.allocation_state = "full" if outstanding_after == Decimal("0.00") else "partial"
+    db.add(payment)
+    return case
 
 
 def _sync_invoice_collection_state(
@@ -119,11 +210,14 @@ def _sync_invoice_collection_state(
     actor_id: str,
     add_payment_action: bool = False,
     payment_amount: Decimal | None = None,
+    delinquency_client_ids: set[str] | None = None,
+    paid_total: Decimal | None = None,
 ) -> tuple[Decimal, CollectionCase | None]:
     if invoice.status == "void":
         return Decimal("0.00"), None
 
-    paid_total = _sum_posted_payments(db, invoice.id)
+    if paid_total is None:
+        paid_total = _sum_posted_payments(db, invoice.id)
     outstanding = _money(Decimal(str(invoice.total_amount)) - paid_total)
     if outstanding < Decimal("0.00"):
         outstanding = Decimal("0.00")
@@ -197,7 +291,7 @@ def _sync_invoice_collection_state(
                         "outstanding_amount": str(outstanding),
                     },
                 )
-        _set_client_delinquency(db, client_id=invoice.client_id, is_delinquent=True)
+        _mark_delinquency_dirty(db, invoice.client_id, delinquency_client_ids)
         return outstanding, case
 
     if case is not None:
@@ -229,16 +323,7 @@ def _sync_invoice_collection_state(
             db.add(case)
             db.flush()
 
-    has_overdue = (
-        db.scalar(
-            select(Invoice.id).where(
-                Invoice.client_id == invoice.client_id,
-                Invoice.status == "overdue",
-            ).limit(1),
-        )
-        is not None
-    )
-    _set_client_delinquency(db, client_id=invoice.client_id, is_delinquent=has_overdue)
+    _mark_delinquency_dirty(db, invoice.client_id, delinquency_client_ids)
     return outstanding, case
 
 
@@ -248,8 +333,16 @@ def _sync_all_overdue_states(db: Session, *, actor_id: str = "collections-sync")
             select(Invoice).where(Invoice.status.in_(["issued", "overdue", "paid"])),
         ).all(),
     )
+    affected_client_ids: set[str] = set()
     for invoice in invoices:
-        _sync_invoice_collection_state(db, invoice=invoice, actor_id=actor_id)
+        _sync_invoice_collection_state(
+            db,
+            invoice=invoice,
+            actor_id=actor_id,
+            delinquency_client_ids=affected_client_ids,
+        )
+    _recompute_client_delinquency(db, affected_client_ids)
+    _record_aging_snapshot(db)
     db.commit()
 
 
@@ -269,6 +362,27 @@ def _build_payment_result(
     )
 
 
+def _replay_payment(
+    db: Session,
+    *,
+    idempotency_key: str,
+    payload_hash: str,
+) -> PaymentAllocationResult | None:
+    existing = db.scalar(select(Payment).where(Payment.idempotency_key == idempotency_key))
+    if existing is None:
+        return None
+    if existing.request_hash != payload_hash:
+        raise_idempotency_payload_conflict()
+    case = db.scalar(
+        select(CollectionCase).where(CollectionCase.invoice_id == existing.invoice_id),
+    )
+    return _build_payment_result(
+        existing,
+        replayed=True,
+        collection_case_status=cast(CollectionCaseStatus | None, case.status if case else None),
+    )
+
+
 def record_payment(
     db: Session,
     *,
@@ -276,33 +390,47 @@ def record_payment(
     idempotency_key: str,
     actor_id: str,
 ) -> PaymentAllocationResult:
-    normalized_key = idempotency_key.strip()
-    if len(normalized_key) < 8:
-        raise ApiException(
-            status_code=400,
-            code="idempotency_key_invalid",
-            message="Idempotency-Key header must contain at least 8 characters",
-        )
+    normalized_key = normalize_idempotency_key(idempotency_key)
+    request_payload = payload.model_dump(mode="json")
+    result, replayed = run_idempotent(
+        db,
+        operation="collections_payment",
+        idempotency_key=normalized_key,
+        request_payload=request_payload,
+        response_model=PaymentAllocationResult,
+        execute=lambda: _post_invoice_payment(
+            db,
+            payload=payload,
+            idempotency_key=normalized_key,
+            payload_hash=request_hash(request_payload),
+            actor_id=actor_id,
+        ),
+    )
+    if replayed:
+        return result.model_copy(update={"idempotency_replayed": True})
+    return result
 
-    payload_hash = _request_hash(payload.model_dump(mode="json"))
-    existing = db.scalar(select(Payment).where(Payment.idempotency_key == normalized_key))
-    if existing is not None:
-        if existing.request_hash != payload_hash:
-            raise ApiException(
-                status_code=409,
-                code="idempotency_key_payload_conflict",
-                message="Idempotency-Key was already used with a different payload",
-            )
-        case = db.scalar(
-            select(CollectionCase).where(CollectionCase.invoice_id == existing.invoice_id),
-        )
-        return _build_payment_result(
-            existing,
-            replayed=True,
-            collection_case_status=cast(CollectionCaseStatus | None, case.status if case else None),
-        )
 
-    invoice = _get_invoice(db, payload.invoice_id)
+def _post_invoice_payment(
+    db: Session,
+    *,
+    payload: PaymentCreate,
+    idempotency_key: str,
+    payload_hash: str,
+    actor_id: str,
+) -> PaymentAllocationResult:
+    # Payments posted before the shared idempotency store only carry the key on the payment.
+    replayed = _replay_payment(db, idempotency_key=idempotency_key, payload_hash=payload_hash)
+    if replayed is not None:
+        return replayed
+
+    invoice = _lock_invoice(db, payload.invoice_id)
+    # A concurrent duplicate may have committed while this request waited for the lock.
+    replayed = _replay_payment(db, idempotency_key=idempotency_key, payload_hash=payload_hash)
+    if replayed is not None:
+        db.rollback()
+        return replayed
+
     if invoice.status == "void":
         raise ApiException(
             status_code=409,
@@ -346,24 +474,21 @@ def record_payment(
         reference=payload.reference,
         note=payload.note,
         status="posted",
-        idempotency_key=normalized_key,
+        idempotency_key=idempotency_key,
         request_hash=payload_hash,
     )
     db.add(payment)
-    db.flush()
-
-    outstanding_after, case = _sync_invoice_collection_state(
-        db,
-        invoice=invoice,
-        actor_id=actor_id,
-        add_payment_action=True,
-        payment_amount=payment.amount,
-    )
-
-    payment.outstanding_after = _money(outstanding_after)
-    payment.invoice_status_after = invoice.status
-    payment.allocation_state = "full" if outstanding_after == Decimal("0.00") else "partial"
-    db.add(payment)
+    try:
+        db.flush()
+    except IntegrityError:
+        # Same key posted concurrently against another invoice; the unique key decides.
+        db.rollback()
+        replayed = _replay_payment(db, idempotency_key=idempotency_key, payload_hash=payload_hash)
+        if replayed is None:
+            raise
+        return replayed
+
+    case = _apply_posted_payment(db, invoice=invoice, payment=payment, actor_id=actor_id)
     db.commit()
     db.refresh(payment)
 
@@ -381,6 +506,161 @@ def record_payment(
     )
 
 
+def record_client_payment(
+    db: Session,
+    *,
+    client_id: str,
+    payload: ClientPaymentCreate,
+    idempotency_key: str,
+    actor_id: str,
+) -> ClientPaymentAllocationResult:
+    normalized_key = normalize_idempotency_key(idempotency_key)
+    request_payload = {"client_id": client_id, **payload.model_dump(mode="json")}
+    result, replayed = run_idempotent(
+        db,
+        operation="collections_client_payment",
+        idempotency_key=normalized_key,
+        request_payload=request_payload,
+        response_model=ClientPaymentAllocationResult,
+        execute=lambda: _post_client_payment(
+            db,
+            client_id=client_id,
+            payload=payload,
+            payload_hash=request_hash(request_payload),
+            actor_id=actor_id,
+        ),
+    )
+    if not replayed:
+        return result
+    return result.model_copy(
+        update={
+            "idempotency_replayed": True,
+            "allocations": [
+                allocation.model_copy(update={"idempotency_replayed": True})
+                for allocation in result.allocations
+            ],
+        },
+    )
+
+
+def _post_client_payment(
+    db: Session,
+    *,
+    client_id: str,
+    payload: ClientPaymentCreate,
+    payload_hash: str,
+    actor_id: str,
+) -> ClientPaymentAllocationResult:
+    if db.get(Client, client_id) is None:
+        raise ApiException(status_code=404, code="client_not_found", message="Client was not found")
+
+    # One query loads and locks every open invoice of the client with its posted total.
+    paid_subquery = (
+        select(func.coalesce(func.sum(Payment.amount), 0))
+        .where(Payment.invoice_id == Invoice.id, Payment.status == "posted")
+        .correlate(Invoice)
+        .scalar_subquery()
+    )
+    due_order = (
+        (Invoice.due_date.asc(), Invoice.issued_at.asc())
+        if payload.allocation_order == "oldest_due_first"
+        else (Invoice.due_date.desc(), Invoice.issued_at.desc())
+    )
+    rows = db.execute(
+        select(Invoice, paid_subquery)
+        .where(Invoice.client_id == client_id, Invoice.status.in_(["issued", "overdue"]))
+        .order_by(*due_order, Invoice.id.asc())
+        .with_for_update(of=Invoice)
+        .execution_options(populate_existing=True),
+    ).all()
+
+    open_invoices: list[tuple[Invoice, Decimal, Decimal]] = []
+    for invoice, paid in rows:
+        paid_total = _money(Decimal(str(paid)))
+        outstanding = _money(Decimal(str(invoice.total_amount)) - paid_total)
+        if outstanding > Decimal("0.00"):
+            open_invoices.append((invoice, paid_total, outstanding))
+
+    total_outstanding = _money(sum((entry[2] for entry in open_invoices), Decimal("0.00")))
+    if not open_invoices:
+        raise ApiException(
+            status_code=409,
+            code="client_no_outstanding_invoices",
+            message="Client has no open invoice to allocate the payment to",
+        )
+    if payload.amount > total_outstanding:
+        raise ApiException(
+            status_code=422,
+            code="payment_exceeds_outstanding",
+            message="Payment amount cannot exceed client outstanding balance",
+            details={
+                "outstanding_amount": str(total_outstanding),
+                "payment_amount": str(payload.amount),
+            },
+        )
+
+    remaining = _money(payload.amount)
+    affected_client_ids: set[str] = set()
+    posted: list[tuple[Payment, CollectionCase | None]] = []
+    for invoice, paid_total, outstanding in open_invoices:
+        if remaining <= Decimal("0.00"):
+            break
+        portion = min(remaining, outstanding)
+        remaining = _money(remaining - portion)
+        payment = Payment(
+            invoice_id=invoice.id,
+            client_id=client_id,
+            amount=portion,
+            currency=invoice.currency,
+            payment_date=payload.payment_date,
+            method=payload.method,
+            reference=payload.reference,
+            note=payload.note,
+            status="posted",
+            # The idempotency record reserved by run_idempotent owns the key, so allocations
+            # leave the per-payment key (and its unique index) to single-invoice payments.
+            idempotency_key=None,
+            request_hash=payload_hash,
+        )
+        db.add(payment)
+        db.flush()
+        case = _apply_posted_payment(
+            db,
+            invoice=invoice,
+            payment=payment,
+            actor_id=actor_id,
+            paid_total=_money(paid_total + portion),
+            delinquency_client_ids=affected_client_ids,
+        )
+        posted.append((payment, case))
+
+    _recompute_client_delinquency(db, affected_client_ids)
+    db.commit()
+
+    logger.info(
+        "collections.client_payment_recorded client_id=%s amount=%s invoice_count=%s",
+        client_id,
+        payload.amount,
+        len(posted),
+    )
+    return ClientPaymentAllocationResult(
+        client_id=client_id,
+        amount=_money(payload.amount),
+        allocation_order=payload.allocation_order,
+        allocations=[
+            _build_payment_result(
+                payment,
+                replayed=False,
+                collection_case_status=cast(
+                    CollectionCaseStatus | None,
+                    case.status if case else None,
+                ),
+            )
+            for payment, case in posted
+        ],
+    )
+
+
 def approve_invoice_paid(
     db: Session,
     *,
@@ -389,22 +669,39 @@ def approve_invoice_paid(
     idempotency_key: str,
     actor_id: str,
 ) -> PaymentAllocationResult:
-    normalized_key = idempotency_key.strip()
-    if len(normalized_key) < 8:
-        raise ApiException(
-            status_code=400,
-            code="idempotency_key_invalid",
-            message="Idempotency-Key header must contain at least 8 characters",
-        )
+    normalized_key = normalize_idempotency_key(idempotency_key)
+    # Approval computes the amount server-side, so only the target invoice identifies a replay.
+    result, replayed = run_idempotent(
+        db,
+        operation="collections_approve_paid",
+        idempotency_key=normalized_key,
+        request_payload={"invoice_id": invoice_id},
+        response_model=PaymentAllocationResult,
+        execute=lambda: _approve_invoice_paid(
+            db,
+            invoice_id=invoice_id,
+            payload=payload,
+            idempotency_key=normalized_key,
+            actor_id=actor_id,
+        ),
+    )
+    if replayed:
+        return result.model_copy(update={"idempotency_replayed": True})
+    return result
 
-    existing = db.scalar(select(Payment).where(Payment.idempotency_key == normalized_key))
+
+def _approve_invoice_paid(
+    db: Session,
+    *,
+    invoice_id: str,
+    payload: InvoicePaymentApprovalRequest,
+    idempotency_key: str,
+    actor_id: str,
+) -> PaymentAllocationResult:
+    existing = db.scalar(select(Payment).where(Payment.idempotency_key == idempotency_key))
     if existing is not None:
         if existing.invoice_id != invoice_id:
-            raise ApiException(
-                status_code=409,
-                code="idempotency_key_payload_conflict",
-                message="Idempotency-Key was already used with a different payload",
-            )
+            raise_idempotency_payload_conflict()
         case = db.scalar(select(CollectionCase).where(CollectionCase.invoice_id == invoice_id))
         return _build_payment_result(
             existing,
@@ -440,10 +737,11 @@ def approve_invoice_paid(
         reference=payload.reference,
         note=approval_note,
     )
-    return record_payment(
+    return _post_invoice_payment(
         db,
         payload=payment_payload,
-        idempotency_key=normalized_key,
+        idempotency_key=idempotency_key,
+        payload_hash=request_hash(payment_payload.model_dump(mode="json")),
         actor_id=actor_id,
     )
 
@@ -551,7 +849,7 @@ def create_collection_case_action(
     actor_id: str,
 ) -> CollectionCaseAction:
     case = get_collection_case(db, case_id)
-    if payload.action_type in {"reminder_sent", "warning_sent"} and case.status == "open":
+    if payload.action_type in DUNNING_ACTION_TYPES and case.status == "open":
         case.status = "in_progress"
         db.add(case)
         db.flush()
@@ -564,10 +862,24 @@ def create_collection_case_action(
         note=payload.note,
         payload={"case_id": case.id, "invoice_id": case.invoice_id},
     )
+    if payload.action_type in DUNNING_ACTION_TYPES:
+        enqueue_event(
+            db,
+            event_type=f"collections.{payload.action_type}",
+            aggregate_type="collection_case",
+            aggregate_id=case.id,
+            payload={
+                "case_id": case.id,
+                "invoice_id": case.invoice_id,
+                "client_id": case.client_id,
+                "action_type": payload.action_type,
+                "action_id": action.id,
+            },
+        )
     db.commit()
     db.refresh(action)
 
-    if payload.action_type in {"reminder_sent", "warning_sent"}:
+    if payload.action_type in DUNNING_ACTION_TYPES:
         logger.info(
             "collections.event_hook action=%s case_id=%s invoice_id=%s",
             payload.action_type,
@@ -588,42 +900,383 @@ def list_collection_case_actions(db: Session, *, case_id: str) -> list[Collectio
     )
 
 
-def build_collections_overview(db: Session) -> CollectionOverviewRead:
-    _sync_all_overdue_states(db)
-    cases = list(db.scalars(select(CollectionCase)).all())
+_AGING_BUCKET_DAY_RANGES: dict[str, tuple[int | None, int | None]] = {
+    "current": (None, 0),
+    "1_30": (1, 30),
+    "31_60": (31, 60),
+    "61_90": (61, 90),
+    "90_plus": (91, None),
+}
+
+
+def _due_date_window(
+    as_of: date,
+    *,
+    min_days: int | None,
+    max_days: int | None,
+) -> list[ColumnElement[bool]]:
+    # Days past due are derived from the invoice due date so rule matching stays
+    # index-friendly and does not depend on the last aging sweep.
+    conditions: list[ColumnElement[bool]] = []
+    if min_days is not None:
+        conditions.append(Invoice.due_date <= as_of - timedelta(days=min_days))
+    if max_days is not None:
+        conditions.append(Invoice.due_date >= as_of - timedelta(days=max_days))
+    return conditions
+
+
+def _dunning_rule_query(rule: DunningRule, *, as_of: date) -> Select[Any]:
+    # Any reminder or warning inside the cooldown window suppresses further contact,
+    # so a case warned today is not also reminded by a softer rule.
+    cooldown_start = datetime.combine(
+        as_of - timedelta(days=rule.cooldown_days),
+        time.min,
+        tzinfo=UTC,
+    )
+    recent_action = (
+        select(CollectionCaseAction.id)
+        .where(
+            CollectionCaseAction.case_id == CollectionCase.id,
+            CollectionCaseAction.action_type.in_(DUNNING_ACTION_TYPES),
+            CollectionCaseAction.created_at >= cooldown_start,
+        )
+        .exists()
+    )
+    query = (
+        select(
+            CollectionCase.id,
+            CollectionCase.invoice_id,
+            CollectionCase.client_id,
+            CollectionCase.status,
+            CollectionCase.outstanding_amount,
+            Invoice.due_date,
+        )
+        .join(Invoice, Invoice.id == CollectionCase.invoice_id)
+        .where(
+            CollectionCase.status.in_(rule.case_statuses),
+            *_due_date_window(
+                as_of,
+                min_days=rule.min_days_past_due,
+                max_days=rule.max_days_past_due,
+            ),
+            ~recent_action,
+        )
+    )
+    if rule.aging_buckets:
+        query = query.where(
+            or_(
+                *[
+                    and_(
+                        true(),
+                        *_due_date_window(
+                            as_of,
+                            min_days=_AGING_BUCKET_DAY_RANGES[bucket][0],
+                            max_days=_AGING_BUCKET_DAY_RANGES[bucket][1],
+                        ),
+                    )
+                    for bucket in rule.aging_buckets
+                ],
+            ),
+        )
+    return query.order_by(Invoice.due_date.asc(), CollectionCase.id.asc())
 
-    bucket_totals: dict[AgingBucket, Decimal] = {
+
+def run_dunning(
+    db: Session,
+    *,
+    payload: DunningRunRequest,
+    actor_id: str,
+) -> DunningRunResult:
+    as_of = payload.as_of or _now_utc().date()
+    run_id = str(uuid.uuid4())
+
+    # Rules are evaluated in order; a case matched by an earlier rule is not
+    # actioned again by a later rule in the same run.
+    claimed_case_ids: set[str] = set()
+    rule_matches: list[tuple[DunningRule, list[Row[Any]]]] = []
+    for rule in payload.rules:
+        rows = db.execute(
+            _dunning_rule_query(rule, as_of=as_of).with_for_update(
+                of=CollectionCase,
+                skip_locked=True,
+            ),
+        ).all()
+        matched = [row for row in rows if row.id not in claimed_case_ids]
+        claimed_case_ids.update(row.id for row in matched)
+        rule_matches.append((rule, matched))
+
+    rule_results = [
+        DunningRuleResult(action_type=rule.action_type, matched_cases=len(matched))
+        for rule, matched in rule_matches
+    ]
+    if payload.dry_run:
+        db.rollback()
+        return DunningRunResult(
+            run_id=run_id,
+            as_of=as_of,
+            dry_run=True,
+            rules=rule_results,
+            actions_created=0,
+            cases_moved_to_in_progress=0,
+            notifications_queued=0,
+        )
+
+    action_rows: list[dict[str, Any]] = []
+    outbox_rows: list[dict[str, Any]] = []
+    moved_case_ids: list[str] = []
+    for rule, matched in rule_matches:
+        for row in matched:
+            action_payload = {
+                "case_id": row.id,
+                "invoice_id": row.invoice_id,
+                "client_id": row.client_id,
+                "days_past_due": (as_of - row.due_date).days,
+                "outstanding_amount": str(_money(Decimal(str(row.outstanding_amount)))),
+                "dunning_run_id": run_id,
+            }
+            action_rows.append(
+                {
+                    "case_id": row.id,
+                    "action_type": rule.action_type,
+                    "actor_id": actor_id,
+                    "note": payload.note,
+                    "payload": action_payload,
+                },
+            )
+            outbox_rows.append(
+                {
+                    "event_type": f"collections.{rule.action_type}",
+                    "aggregate_type": "collection_case",
+                    "aggregate_id": row.id,
+                    "payload": {**action_payload, "action_type": rule.action_type},
+                },
+            )
+            if row.status == "open":
+                moved_case_ids.append(row.id)
+
+    if action_rows:
+        db.execute(insert(CollectionCaseAction), action_rows)
+    now = _now_utc()
+    ordered_case_ids = sorted(claimed_case_ids)
+    for offset in range(0, len(ordered_case_ids), DUNNING_BATCH_SIZE):
+        batch_ids = ordered_case_ids[offset : offset + DUNNING_BATCH_SIZE]
+        db.execute(
+            update(CollectionCase)
+            .where(CollectionCase.id.in_(batch_ids))
+            .values(
+                status=sql_case(
+                    (CollectionCase.status == "open", "in_progress"),
+                    else_=CollectionCase.status,
+                ),
+                last_action_at=now,
+                updated_at=now,
+            )
+            .execution_options(synchronize_session=False),
+        )
+    queued = enqueue_events(db, outbox_rows)
+    db.commit()
+
+    logger.info(
+        "collections.dunning_run_completed run_id=%s actions=%s moved_to_in_progress=%s",
+        run_id,
+        len(action_rows),
+        len(moved_case_ids),
+    )
+    return DunningRunResult(
+        run_id=run_id,
+        as_of=as_of,
+        dry_run=False,
+        rules=rule_results,
+        actions_created=len(action_rows),
+        cases_moved_to_in_progress=len(moved_case_ids),
+        notifications_queued=queued,
+    )
+
+
+def _empty_bucket_totals() -> dict[AgingBucket, Decimal]:
+    return {
         "current": Decimal("0.00"),
         "1_30": Decimal("0.00"),
         "31_60": Decimal("0.00"),
         "61_90": Decimal("0.00"),
         "90_plus": Decimal("0.00"),
     }
+
+
+def _aggregate_active_cases(db: Session) -> CollectionOverviewRead:
+    rows = db.execute(
+        select(
+            CollectionCase.status,
+            CollectionCase.aging_bucket,
+            func.count(CollectionCase.id),
+            func.coalesce(func.sum(CollectionCase.outstanding_amount), 0),
+        )
+        .where(CollectionCase.status.in_(ACTIVE_CASE_STATUSES))
+        .group_by(CollectionCase.status, CollectionCase.aging_bucket),
+    ).all()
+
+    bucket_totals = _empty_bucket_totals()
     open_cases = 0
     in_progress_cases = 0
-    overdue_invoices = 0
     total_outstanding = Decimal("0.00")
-
-    for case in cases:
-        if case.status == "open":
-            open_cases += 1
-        if case.status == "in_progress":
-            in_progress_cases += 1
-        if case.status in {"open", "in_progress"}:
-            overdue_invoices += 1
-            outstanding = _money(Decimal(str(case.outstanding_amount)))
-            total_outstanding += outstanding
-            bucket = (
-                cast(AgingBucket, case.aging_bucket)
-                if case.aging_bucket in bucket_totals
-                else "90_plus"
-            )
-            bucket_totals[bucket] = _money(bucket_totals[bucket] + outstanding)
+    for status, aging_bucket, case_count, outstanding_sum in rows:
+        if status == "open":
+            open_cases += int(case_count)
+        else:
+            in_progress_cases += int(case_count)
+        outstanding = _money(Decimal(str(outstanding_sum)))
+        total_outstanding += outstanding
+        bucket = cast(AgingBucket, aging_bucket) if aging_bucket in bucket_totals else "90_plus"
+        bucket_totals[bucket] = _money(bucket_totals[bucket] + outstanding)
 
     return CollectionOverviewRead(
         open_cases=open_cases,
         in_progress_cases=in_progress_cases,
-        overdue_invoices=overdue_invoices,
+        overdue_invoices=open_cases + in_progress_cases,
         total_outstanding_amount=_money(total_outstanding),
-        bucket_totals={key: _money(value) for key, value in bucket_totals.items()},
+        bucket_totals=bucket_totals,
+    )
+
+
+def _aggregate_active_category_totals(db: Session) -> dict[OfferServiceCategory, Decimal]:
+    # Outstanding is tracked per invoice, so it is split across service categories
+    # in proportion to each category's share of the invoice line totals.
+    rows = db.execute(
+        select(
+            CollectionCase.invoice_id,
+            CollectionCase.outstanding_amount,
+            Offer.service_category,
+            func.sum(InvoiceLine.line_total),
+        )
+        .join(InvoiceLine, InvoiceLine.invoice_id == CollectionCase.invoice_id)
+        .join(Contract, Contract.id == InvoiceLine.contract_id)
+        .join(Offer, Offer.id == Contract.offer_id)
+        .where(CollectionCase.status.in_(ACTIVE_CASE_STATUSES))
+        .group_by(
+            CollectionCase.invoice_id,
+            CollectionCase.outstanding_amount,
+            Offer.service_category,
+        ),
+    ).all()
+
+    invoice_shares: dict[str, tuple[Decimal, dict[str, Decimal]]] = {}
+    for invoice_id, outstanding_amount, service_category, line_sum in rows:
+        _, shares = invoice_shares.setdefault(
+            invoice_id,
+            (_money(Decimal(str(outstanding_amount))), {}),
+        )
+        shares[service_category] = Decimal(str(line_sum or 0))
+
+    category_totals: dict[OfferServiceCategory, Decimal] = {
+        "mobile": Decimal("0.00"),
+        "internet": Decimal("0.00"),
+        "landline": Decimal("0.00"),
+    }
+    for outstanding, shares in invoice_shares.values():
+        lines_total = sum(shares.values(), Decimal("0"))
+        if lines_total <= 0:
+            continue
+        for service_category, line_sum in shares.items():
+            if service_category not in category_totals:
+                continue
+            category = cast(OfferServiceCategory, service_category)
+            category_totals[category] = _money(
+                category_totals[category] + outstanding * line_sum / lines_total,
+            )
+    return category_totals
+
+
+def _record_aging_snapshot(db: Session) -> None:
+    overview = _aggregate_active_cases(db)
+    category_totals = _aggregate_active_category_totals(db)
+    snapshot_date = _now_utc().date()
+    values = {
+        "open_cases": overview.open_cases,
+        "in_progress_cases": overview.in_progress_cases,
+        "overdue_invoices": overview.overdue_invoices,
+        "total_outstanding_amount": overview.total_outstanding_amount,
+        # Amounts stay strings inside the document so they round-trip exactly.
+        "bucket_totals": {key: str(value) for key, value in overview.bucket_totals.items()},
+        "category_totals": {key: str(value) for key, value in category_totals.items()},
+    }
+
+    snapshot = db.scalar(
+        select(CollectionAgingSnapshot).where(
+            CollectionAgingSnapshot.snapshot_date == snapshot_date,
+        ),
     )
+    if snapshot is None:
+        try:
+            with db.begin_nested():
+                db.add(CollectionAgingSnapshot(snapshot_date=snapshot_date, **values))
+            return
+        except IntegrityError:
+            # A concurrent sweep created today's row first; fall through and refresh it.
+            snapshot = db.scalar(
+                select(CollectionAgingSnapshot).where(
+                    CollectionAgingSnapshot.snapshot_date == snapshot_date,
+                ),
+            )
+            if snapshot is None:
+                raise
+    for field_name, value in values.items():
+        setattr(snapshot, field_name, value)
+    snapshot.updated_at = _now_utc()
+    db.add(snapshot)
+    db.flush()
+
+
+def build_collections_overview(db: Session) -> CollectionOverviewRead:
+    _sync_all_overdue_states(db)
+    return _aggregate_active_cases(db)
+
+
+def list_aging_snapshots(
+    db: Session,
+    *,
+    date_from: date | None = None,
+    date_to: date | None = None,
+) -> list[CollectionAgingSnapshotRead]:
+    resolved_to = date_to or _now_utc().date()
+    resolved_from = date_from or resolved_to - timedelta(days=AGING_HISTORY_DEFAULT_DAYS - 1)
+    if resolved_from > resolved_to:
+        raise ApiException(
+            status_code=422,
+            code="invalid_snapshot_range",
+            message="date_from must be on or before date_to",
+            details={"date_from": resolved_from.isoformat(), "date_to": resolved_to.isoformat()},
+        )
+    if (resolved_to - resolved_from).days >= AGING_HISTORY_MAX_DAYS:
+        raise ApiException(
+            status_code=422,
+            code="invalid_snapshot_range",
+            message=f"Snapshot range cannot exceed {AGING_HISTORY_MAX_DAYS} days",
+            details={"date_from": resolved_from.isoformat(), "date_to": resolved_to.isoformat()},
+        )
+
+    snapshots = db.scalars(
+        select(CollectionAgingSnapshot)
+        .where(
+            CollectionAgingSnapshot.snapshot_date >= resolved_from,
+            CollectionAgingSnapshot.snapshot_date <= resolved_to,
+        )
+        .order_by(CollectionAgingSnapshot.snapshot_date.asc()),
+    ).all()
+    return [
+        CollectionAgingSnapshotRead.model_validate(
+            {
+                "snapshot_date": snapshot.snapshot_date,
+                "open_cases": snapshot.open_cases,
+                "in_progress_cases": snapshot.in_progress_cases,
+                "overdue_invoices": snapshot.overdue_invoices,
+                "total_outstanding_amount": _money(
+                    Decimal(str(snapshot.total_outstanding_amount)),
+                ),
+                # Stored amounts are decimal strings; the schema parses them back to Decimal.
+                "bucket_totals": snapshot.bucket_totals,
+                "category_totals": snapshot.category_totals,
+                "updated_at": snapshot.updated_at,
+            },
+        )
+        for snapshot in snapshots
+    ]
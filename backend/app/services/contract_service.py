@@ -1,26 +1,58 @@
-import json
+import logging
 import uuid
-from datetime import UTC, date, datetime
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from datetime import UTC, date, datetime, timedelta
+from typing import cast
 
-from sqlalchemy import func, select
+from sqlalchemy import ColumnElement, Select, and_, false, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.common.errors import ApiException
+from app.core.settings import get_settings
+from app.db.types import json_document_contains
 from app.models.catalog import Offer
-from app.models.contract import Contract, ContractAuditEvent
+from app.models.contract import Contract, ContractAuditEvent, ContractScheduledEvent
 from app.models.customer import Client, Subscriber
 from app.schemas.contract import (
+    ContractBatchProvisionError,
+    ContractBatchProvisionItemResult,
+    ContractBatchProvisionRequest,
+    ContractBatchProvisionResult,
+    ContractBulkStatusResult,
+    ContractBulkStatusUpdate,
+    ContractBulkTransitionCount,
     ContractCreate,
     ContractOfferUpdate,
     ContractProvisionRequest,
+    ContractProvisionResult,
+    ContractRead,
+    ContractScheduledEventCreate,
+    ContractScheduleRunResult,
+    ContractStatus,
     ContractStatusUpdate,
     ProvisionClientInput,
     ProvisioningMode,
     ProvisionSubscriberInput,
 )
+from app.services.audit_service import (
+    record_contract_audit_event,
+    record_contract_audit_events,
+)
+from app.services.numbering_service import (
+    claim_identifier,
+    quarantined_identifiers,
+    release_identifier,
+    release_identifiers,
+)
+
+logger = logging.getLogger("mt_facturation.contract")
 
 OPEN_CONTRACT_STATUSES = {"draft", "active", "suspended"}
 UPGRADE_CONTRACT_STATUSES = {"active"}
+BULK_STATUS_REPORTED_IDS_LIMIT = 100
+SCHEDULER_ACTOR_ID = "system:contract-scheduler"
 STATUS_TRANSITIONS: dict[str, set[str]] = {
     "draft": {"active", "terminated"},
     "active": {"suspended", "terminated"},
@@ -112,20 +144,51 @@ def _ensure_offer_valid_for_contract(offer: Offer, contract_start_date: date) ->
         )
 
 
-def _record_audit_event(
-    db: Session,
-    contract_id: str,
-    event_type: str,
-    actor_id: str | None,
-    details: dict[str, object] | None = None,
-) -> None:
-    event = ContractAuditEvent(
-        contract_id=contract_id,
-        event_type=event_type,
-        actor_id=actor_id,
-        details=json.dumps(details or {}, sort_keys=True),
+def _termination_due_date(end_date: date) -> date:
+    # A contract is in force through its end_date; the grace days leave room for a late
+    # billing run over the final period to still see the contract active.
+    return end_date + timedelta(days=1 + get_settings().contract_expiry_grace_days)
+
+
+def _sync_expiry_event(db: Session, contract: Contract, *, is_new: bool = False) -> None:
+    """Keep a single pending terminate event aligned with ``contract.end_date``."""
+    pending = None
+    if not is_new:
+        pending = db.scalar(
+            select(ContractScheduledEvent).where(
+                ContractScheduledEvent.contract_id == contract.id,
+                ContractScheduledEvent.event_type == "terminate",
+                ContractScheduledEvent.status == "pending",
+            ),
+        )
+    if contract.end_date is None or contract.status == "terminated":
+        if pending is not None:
+            pending.status = "cancelled"
+        return
+    due_date = _termination_due_date(contract.end_date)
+    if pending is None:
+        db.add(
+            ContractScheduledEvent(
+                contract_id=contract.id,
+                event_type="terminate",
+                due_date=due_date,
+            ),
+        )
+    else:
+        pending.due_date = due_date
+
+
+def _cancel_pending_scheduled_events(db: Session, contract_ids: Sequence[str]) -> None:
+    if not contract_ids:
+        return
+    db.execute(
+        update(ContractScheduledEvent)
+        .where(
+            ContractScheduledEvent.contract_id.in_(contract_ids),
+            ContractScheduledEvent.status == "pending",
+        )
+        .values(status="cancelled"),
     )
-    db.add(event)
 
 
 def _assert_subscriber_offer_compatibility(subscriber: Subscriber, offer: Offer) -> None:
@@ -168,8 +231,138 @@ def _create_client_from_payload(db: Session, payload: ProvisionClientInput) -> C
     return client
 
 
+@dataclass
+class _ProvisioningContext:
+    """Offers, clients, upgrade candidates and subscribers preloaded for provisioning requests."""
+
+    offers: dict[str, Offer] = field(default_factory=dict)
+    clients: dict[str, Client] = field(default_factory=dict)
+    subscribers: dict[str, Subscriber] = field(default_factory=dict)
+    subscribers_by_identifier: dict[str, Subscriber] = field(default_factory=dict)
+    upgrade_candidates: dict[tuple[str, str], list[Contract]] = field(default_factory=dict)
+    quarantined_identifiers: set[str] = field(default_factory=set)
+
+    def offer(self, offer_id: str) -> Offer:
+        offer = self.offers.get(offer_id)
+        if offer is None:
+            raise ApiException(
+                status_code=404,
+                code="offer_not_found",
+                message="Offer was not found",
+            )
+        return offer
+
+    def client(self, client_id: str) -> Client:
+        client = self.clients.get(client_id)
+        if client is None:
+            raise ApiException(
+                status_code=404,
+                code="client_not_found",
+                message="Client was not found",
+            )
+        return client
+
+    def subscriber(self, subscriber_id: str) -> Subscriber:
+        subscriber = self.subscribers.get(subscriber_id)
+        if subscriber is None:
+            raise ApiException(
+                status_code=404,
+                code="subscriber_not_found",
+                message="Subscriber was not found",
+            )
+        return subscriber
+
+    def candidates(self, client_id: str, service_type: str) -> list[Contract]:
+        return self.upgrade_candidates.get((client_id, service_type), [])
+
+    def register_subscriber(self, subscriber: Subscriber) -> None:
+        self.subscribers[subscriber.id] = subscriber
+        # Terminated subscribers keep their number, but only a live one holds it.
+        if subscriber.status != "terminated":
+            self.subscribers_by_identifier[subscriber.service_identifier] = subscriber
+
+    def register_contract(self, contract: Contract, subscriber: Subscriber) -> None:
+        self.register_subscriber(subscriber)
+        if contract.status not in UPGRADE_CONTRACT_STATUSES:
+            return
+        candidates = self.upgrade_candidates.setdefault(
+            (contract.client_id, subscriber.service_type),
+            [],
+        )
+        if contract not in candidates:
+            candidates.append(contract)
+
+
+def _load_provisioning_context(
+    db: Session,
+    payloads: Sequence[ContractProvisionRequest],
+) -> _ProvisioningContext:
+    context = _ProvisioningContext()
+    offer_ids = {payload.offer_id for payload in payloads}
+    context.offers = {
+        offer.id: offer for offer in db.scalars(select(Offer).where(Offer.id.in_(offer_ids)))
+    }
+
+    client_ids = {payload.client_id for payload in payloads if payload.client_id}
+    if client_ids:
+        context.clients = {
+            client.id: client
+            for client in db.scalars(select(Client).where(Client.id.in_(client_ids)))
+        }
+    # new_line requests never upgrade, so only the other intents need the candidates. They
+    # come with their subscribers in one join, which every later resolution step reuses.
+    candidate_client_ids = {
+        payload.client_id
+        for payload in payloads
+        if payload.client_id and payload.provisioning_intent != "new_line"
+    }
+    if candidate_client_ids:
+        candidate_rows = db.execute(
+            select(Contract, Subscriber)
+            .join(Subscriber, Contract.subscriber_id == Subscriber.id)
+            .where(
+                Contract.client_id.in_(candidate_client_ids),
+                Contract.status.in_(UPGRADE_CONTRACT_STATUSES),
+            )
+            .order_by(Contract.created_at.asc()),
+        ).all()
+        for contract, subscriber in candidate_rows:
+            context.register_contract(contract, subscriber)
+
+    subscriber_ids = {
+        payload.subscriber_id
+        for payload in payloads
+        if payload.subscriber_id and payload.subscriber_id not in context.subscribers
+    }
+    identifiers = {
+        payload.subscriber.service_identifier
+        for payload in payloads
+        if payload.subscriber and payload.subscriber.service_identifier
+    } - context.subscribers_by_identifier.keys()
+    conditions: list[ColumnElement[bool]] = []
+    if subscriber_ids:
+        conditions.append(Subscriber.id.in_(subscriber_ids))
+    if identifiers:
+        conditions.append(
+            and_(
+                Subscriber.service_identifier.in_(identifiers),
+                Subscriber.status != "terminated",
+            ),
+        )
+    if conditions:
+        for subscriber in db.scalars(select(Subscriber).where(or_(*conditions))):
+            context.register_subscriber(subscriber)
+    # Numbers nobody holds will be claimed from the pool; check their quarantine in one read.
+    context.quarantined_identifiers = quarantined_identifiers(
+        db,
+        identifiers=identifiers - context.subscribers_by_identifier.keys(),
+    )
+    return context
+
+
 def _resolve_subscriber_for_provisioning(
     db: Session,
+    context: _ProvisioningContext,
     client: Client,
     offer: Offer,
     payload: ContractProvisionRequest,
@@ -183,7 +376,7 @@ def _resolve_subscriber_for_provisioning(
                 code="provisioning_intent_conflict",
                 message="Subscriber reuse is not allowed for new-contract provisioning",
             )
-        subscriber = _get_subscriber(db, payload.subscriber_id)
+        subscriber = context.subscriber(payload.subscriber_id)
         if subscriber.client_id != client.id:
             raise ApiException(
                 status_code=422,
@@ -197,9 +390,7 @@ def _resolve_subscriber_for_provisioning(
     preferred_identifier = subscriber_payload.service_identifier if subscriber_payload else None
 
     if preferred_identifier:
-        existing = db.scalar(
-            select(Subscriber).where(Subscriber.service_identifier == preferred_identifier),
-        )
+        existing = context.subscribers_by_identifier.get(preferred_identifier)
         if existing:
             if not allow_reuse:
                 raise ApiException(
@@ -232,6 +423,13 @@ def _resolve_subscriber_for_provisioning(
             },
         )
 
+    if preferred_identifier:
+        # A hand-entered pool number must not stay available for automatic allocation.
+        claim_identifier(
+            db,
+            identifier=preferred_identifier,
+            quarantined=context.quarantined_identifiers,
+        )
     subscriber = Subscriber(
         client_id=client.id,
         service_type=service_type,
@@ -243,32 +441,13 @@ def _resolve_subscriber_for_provisioning(
     return subscriber, True
 
 
-def _list_upgrade_candidate_contracts(
-    db: Session,
-    client_id: str,
-    service_type: str,
-) -> list[Contract]:
-    return list(
-        db.scalars(
-            select(Contract)
-            .join(Subscriber, Contract.subscriber_id == Subscriber.id)
-            .where(
-                Contract.client_id == client_id,
-                Contract.status.in_(UPGRADE_CONTRACT_STATUSES),
-                Subscriber.service_type == service_type,
-            )
-            .order_by(Contract.created_at.asc()),
-        ).all(),
-    )
-
-
 def _resolve_upgrade_target_contract(
-    db: Session,
+    context: _ProvisioningContext,
     client_id: str,
     service_type: str,
     target_contract_id: str | None,
 ) -> Contract:
-    candidates = _list_upgrade_candidate_contracts(db, client_id, service_type)
+    candidates = context.candidates(client_id, service_type)
     if not candidates:
         raise ApiException(
             status_code=409,
@@ -299,7 +478,7 @@ def _resolve_upgrade_target_contract(
 
 
 def _resolve_provisioning_mode(
-    db: Session,
+    context: _ProvisioningContext,
     payload: ContractProvisionRequest,
     client: Client,
     offer: Offer,
@@ -309,20 +488,20 @@ def _resolve_provisioning_mode(
 
     if payload.provisioning_intent == "upgrade":
         target_contract = _resolve_upgrade_target_contract(
-            db,
+            context,
             client.id,
             offer.service_type,
             payload.target_contract_id,
         )
         return "upgrade_existing_contract", target_contract
 
-    candidates = _list_upgrade_candidate_contracts(db, client.id, offer.service_type)
+    candidates = context.candidates(client.id, offer.service_type)
     if not candidates:
         return "new_contract", None
 
     if payload.target_contract_id:
         target_contract = _resolve_upgrade_target_contract(
-            db,
+            context,
             client.id,
             offer.service_type,
             payload.target_contract_id,
@@ -336,13 +515,10 @@ def _resolve_provisioning_mode(
         return "new_contract", None
 
     if payload.subscriber and payload.subscriber.service_identifier:
-        existing_subscriber = db.scalar(
-            select(Subscriber).where(
-                Subscriber.service_identifier == payload.subscriber.service_identifier,
-                Subscriber.client_id == client.id,
-            ),
+        existing_subscriber = context.subscribers_by_identifier.get(
+            payload.subscriber.service_identifier,
         )
-        if existing_subscriber:
+        if existing_subscriber and existing_subscriber.client_id == client.id:
             _assert_subscriber_offer_compatibility(existing_subscriber, offer)
             for candidate in candidates:
                 if candidate.subscriber_id == existing_subscriber.id:
@@ -394,6 +570,36 @@ def list_contract_audit_events(db: Session, contract_id: str) -> list[ContractAu
     )
 
 
+def search_contract_audit_events(
+    db: Session,
+    *,
+    page: int,
+    size: int,
+    event_type: str | None = None,
+    actor_id: str | None = None,
+    details: dict[str, str] | None = None,
+) -> tuple[list[ContractAuditEvent], int]:
+    criteria = []
+    if event_type:
+        criteria.append(ContractAuditEvent.event_type == event_type)
+    if actor_id:
+        criteria.append(ContractAuditEvent.actor_id == actor_id)
+    if details:
+        criteria.append(json_document_contains(db, ContractAuditEvent.details, details))
+
+    total = int(
+        db.scalar(select(func.count()).select_from(ContractAuditEvent).where(*criteria)) or 0,
+    )
+    records = db.scalars(
+        select(ContractAuditEvent)
+        .where(*criteria)
+        .order_by(ContractAuditEvent.created_at.desc(), ContractAuditEvent.id.desc())
+        .offset((page - 1) * size)
+        .limit(size),
+    ).all()
+    return list(records), total
+
+
 def create_contract(db: Session, payload: ContractCreate, actor_id: str | None = None) -> Contract:
     client = _get_client(db, payload.client_id)
     subscriber = _get_subscriber(db, payload.subscriber_id)
@@ -426,7 +632,8 @@ def create_contract(db: Session, payload: ContractCreate, actor_id: str | None =
     )
     db.add(contract)
     db.flush()
-    _record_audit_event(
+    _sync_expiry_event(db, contract, is_new=True)
+    record_contract_audit_event(
         db,
         contract.id,
         "contract_created",
@@ -438,23 +645,33 @@ def create_contract(db: Session, payload: ContractCreate, actor_id: str | None =
     return contract
 
 
-def provision_contract(
+@dataclass(frozen=True)
+class _ProvisionOutcome:
+    contract: Contract
+    subscriber: Subscriber
+    created_client: bool
+    created_subscriber: bool
+    provisioning_mode: ProvisioningMode
+
+
+def _provision_from_context(
     db: Session,
+    context: _ProvisioningContext,
     payload: ContractProvisionRequest,
-    actor_id: str | None = None,
-) -> tuple[Contract, bool, bool, ProvisioningMode]:
+    actor_id: str | None,
+) -> _ProvisionOutcome:
     _validate_contract_dates(
         payload.contract_start_date,
         payload.end_date,
         payload.commitment_months,
     )
 
-    offer = _get_offer(db, payload.offer_id)
+    offer = context.offer(payload.offer_id)
     _ensure_offer_valid_for_contract(offer, payload.contract_start_date)
 
     created_client = False
     if payload.client_id:
-        client = _get_client(db, payload.client_id)
+        client = context.client(payload.client_id)
     else:
         if payload.client is None:
             raise ApiException(
@@ -465,7 +682,12 @@ def provision_contract(
         client = _create_client_from_payload(db, payload.client)
         created_client = True
 
-    provisioning_mode, target_contract = _resolve_provisioning_mode(db, payload, client, offer)
+    provisioning_mode, target_contract = _resolve_provisioning_mode(
+        context,
+        payload,
+        client,
+        offer,
+    )
 
     if provisioning_mode == "upgrade_existing_contract":
         if target_contract is None:
@@ -474,7 +696,7 @@ def provision_contract(
                 code="contract_upgrade_target_missing_internal",
                 message="Upgrade mode requires a target contract",
             )
-        subscriber = _get_subscriber(db, target_contract.subscriber_id)
+        subscriber = context.subscriber(target_contract.subscriber_id)
         _assert_subscriber_offer_compatibility(subscriber, offer)
 
         previous_offer_id = target_contract.offer_id
@@ -501,8 +723,9 @@ def provision_contract(
             target_contract.commitment_months = payload.commitment_months
         if payload.end_date is not None:
             target_contract.end_date = payload.end_date
+            _sync_expiry_event(db, target_contract)
         db.add(target_contract)
-        _record_audit_event(
+        record_contract_audit_event(
             db,
             target_contract.id,
             "contract_offer_changed",
@@ -515,18 +738,24 @@ def provision_contract(
                 "source": "provision_upgrade",
             },
         )
-        db.commit()
-        db.refresh(target_contract)
-        return target_contract, False, False, "upgrade_existing_contract"
+        return _ProvisionOutcome(
+            contract=target_contract,
+            subscriber=subscriber,
+            created_client=False,
+            created_subscriber=False,
+            provisioning_mode="upgrade_existing_contract",
+        )
 
+    # New-contract provisioning never reuses a subscriber, so the subscriber created here
+    # cannot already hold an open contract.
     subscriber, created_subscriber = _resolve_subscriber_for_provisioning(
         db,
+        context,
         client,
         offer,
         payload,
         allow_reuse=False,
     )
-    _assert_subscriber_available(db, subscriber.id)
 
     contract = Contract(
         client_id=client.id,
@@ -540,7 +769,8 @@ def provision_contract(
     )
     db.add(contract)
     db.flush()
-    _record_audit_event(
+    _sync_expiry_event(db, contract, is_new=True)
+    record_contract_audit_event(
         db,
         contract.id,
         "contract_provisioned",
@@ -553,9 +783,136 @@ def provision_contract(
             "provisioning_intent": payload.provisioning_intent,
         },
     )
+    return _ProvisionOutcome(
+        contract=contract,
+        subscriber=subscriber,
+        created_client=created_client,
+        created_subscriber=created_subscriber,
+        provisioning_mode="new_contract",
+    )
+
+
+def provision_contract(
+    db: Session,
+    payload: ContractProvisionRequest,
+    actor_id: str | None = None,
+) -> tuple[Contract, bool, bool, ProvisioningMode]:
+    context = _load_provisioning_context(db, [payload])
+    outcome = _provision_from_context(db, context, payload, actor_id)
     db.commit()
-    db.refresh(contract)
-    return contract, created_client, created_subscriber, "new_contract"
+    db.refresh(outcome.contract)
+    return (
+        outcome.contract,
+        outcome.created_client,
+        outcome.created_subscriber,
+        outcome.provisioning_mode,
+    )
+
+
+def _batch_item_failure(index: int, exc: ApiException) -> ContractBatchProvisionItemResult:
+    return ContractBatchProvisionItemResult(
+        index=index,
+        status="failed",
+        error=ContractBatchProvisionError(
+            status_code=exc.status_code,
+            code=exc.code,
+            message=exc.message,
+            details=exc.details,
+        ),
+    )
+
+
+def provision_contracts_batch(
+    db: Session,
+    payload: ContractBatchProvisionRequest,
+    actor_id: str | None = None,
+) -> ContractBatchProvisionResult:
+    """Provision many contracts against one preloaded context, committing per chunk.
+
+    Each item runs in its own savepoint, so a rejected item is reported without undoing the
+    rest of its chunk. Items are applied in order and later items see earlier ones, exactly
+    as the same requests sent one by one would.
+    """
+    context = _load_provisioning_context(db, payload.items)
+    chunk_size = max(1, get_settings().contract_provision_chunk_size)
+    results: list[ContractBatchProvisionItemResult] = []
+
+    for chunk_start in range(0, len(payload.items), chunk_size):
+        chunk = payload.items[chunk_start : chunk_start + chunk_size]
+        outcomes: list[tuple[int, _ProvisionOutcome]] = []
+        chunk_results: list[ContractBatchProvisionItemResult] = []
+        for index, item in enumerate(chunk, start=chunk_start):
+            try:
+                with db.begin_nested():
+                    outcome = _provision_from_context(db, context, item, actor_id)
+            except ApiException as exc:
+                chunk_results.append(_batch_item_failure(index, exc))
+                continue
+            except IntegrityError:
+                chunk_results.append(
+                    _batch_item_failure(
+                        index,
+                        ApiException(
+                            status_code=409,
+                            code="provisioning_conflict",
+                            message="Item conflicts with existing client or subscriber data",
+                        ),
+                    ),
+                )
+                continue
+            context.register_contract(outcome.contract, outcome.subscriber)
+            outcomes.append((index, outcome))
+        db.commit()
+
+        # Server-generated timestamps load for the whole chunk in one query, not one
+        # refresh per contract.
+        contract_ids = [outcome.contract.id for _, outcome in outcomes]
+        if contract_ids:
+            list(db.scalars(select(Contract).where(Contract.id.in_(contract_ids))))
+        for index, outcome in outcomes:
+            chunk_results.append(
+                ContractBatchProvisionItemResult(
+                    index=index,
+                    status="provisioned",
+                    result=ContractProvisionResult(
+                        contract=ContractRead.model_validate(outcome.contract),
+                        created_client=outcome.created_client,
+                        created_subscriber=outcome.created_subscriber,
+                        provisioning_mode=outcome.provisioning_mode,
+                    ),
+                ),
+            )
+        results.extend(sorted(chunk_results, key=lambda result: result.index))
+
+    provisioned_count = sum(1 for result in results if result.status == "provisioned")
+    logger.info(
+        "contract.batch_provisioned items=%s provisioned=%s failed=%s",
+        len(results),
+        provisioned_count,
+        len(results) - provisioned_count,
+    )
+    return ContractBatchProvisionResult(
+        provisioned_count=provisioned_count,
+        failed_count=len(results) - provisioned_count,
+        items=results,
+    )
+
+
+def _release_subscriber_identifier_if_unused(db: Session, contract: Contract) -> None:
+    still_in_use = db.scalar(
+        select(Contract.id)
+        .where(
+            Contract.subscriber_id == contract.subscriber_id,
+            Contract.id != contract.id,
+            Contract.status != "terminated",
+        )
+        .limit(1),
+    )
+    if still_in_use is not None:
+        return
+    subscriber = db.get(Subscriber, contract.subscriber_id)
+    if subscriber is not None:
+        release_identifier(db, identifier=subscriber.service_identifier)
 
 
 def update_contract_status(
@@ -586,9 +943,11 @@ def update_contract_status(
     if to_status == "terminated":
         contract.terminated_at = now
         contract.end_date = contract.end_date or now.date()
+        _release_subscriber_identifier_if_unused(db, contract)
+        _cancel_pending_scheduled_events(db, [contract.id])
 
     db.add(contract)
-    _record_audit_event(
+    record_contract_audit_event(
         db,
         contract.id,
         "contract_status_changed",
@@ -600,6 +959,209 @@ def update_contract_status(
     return contract
 
 
+def _release_unused_subscriber_identifiers(db: Session, subscriber_ids: set[str]) -> None:
+    if not subscriber_ids:
+        return
+    still_in_use = (
+        select(Contract.id)
+        .where(Contract.subscriber_id == Subscriber.id, Contract.status != "terminated")
+        .exists()
+    )
+    identifiers = list(
+        db.scalars(
+            select(Subscriber.service_identifier).where(
+                Subscriber.id.in_(subscriber_ids),
+                ~still_in_use,
+            ),
+        ),
+    )
+    released = release_identifiers(db, identifiers=identifiers)
+    if released:
+        logger.info("contract.identifiers_released count=%s", released)
+
+
+def _bulk_status_selection(payload: ContractBulkStatusUpdate) -> Select[tuple[str, str]]:
+    query = select(Contract.id, Contract.status)
+    if payload.contract_ids is not None:
+        return query.where(Contract.id.in_(payload.contract_ids))
+    criteria = payload.filter
+    if criteria is None:
+        return query.where(false())
+    if criteria.from_statuses:
+        query = query.where(Contract.status.in_(criteria.from_statuses))
+    if criteria.client_ids:
+        query = query.where(Contract.client_id.in_(criteria.client_ids))
+    if criteria.delinquent_clients_only:
+        query = query.join(Client, Contract.client_id == Client.id).where(
+            Client.is_delinquent.is_(True),
+        )
+    if criteria.offer_id:
+        query = query.where(Contract.offer_id == criteria.offer_id)
+    if criteria.end_date_on_or_before:
+        query = query.where(
+            Contract.end_date.is_not(None),
+            Contract.end_date <= criteria.end_date_on_or_before,
+        )
+    return query
+
+
+def _apply_status_transition(
+    db: Session,
+    contract_ids: list[str],
+    *,
+    from_status: str,
+    to_status: str,
+    now: datetime,
+) -> list[tuple[str, str]]:
+    values: dict[str, object] = {"status": to_status}
+    if to_status == "active":
+        values["activated_at"] = func.coalesce(Contract.activated_at, now)
+    if to_status == "terminated":
+        values["terminated_at"] = now
+        values["end_date"] = func.coalesce(Contract.end_date, now.date())
+    # The status guard skips rows another writer moved since they were read; RETURNING
+    # reports exactly the rows this statement changed.
+    rows = db.execute(
+        update(Contract)
+        .where(Contract.id.in_(contract_ids), Contract.status == from_status)
+        .values(values)
+        .returning(Contract.id, Contract.subscriber_id),
+    ).all()
+    return [(contract_id, subscriber_id) for contract_id, subscriber_id in rows]
+
+
+def _transition_contracts(
+    db: Session,
+    ids_by_status: dict[str, list[str]],
+    *,
+    to_status: str,
+    actor_id: str | None,
+    audit_source: str,
+) -> dict[str, list[str]]:
+    """Apply already-validated transitions without committing; returns changed ids by source."""
+    now = _utc_now()
+    changed_by_status: dict[str, list[str]] = {}
+    audit_events: list[tuple[str, str, dict[str, object]]] = []
+    terminated_subscriber_ids: set[str] = set()
+    for from_status, contract_ids in ids_by_status.items():
+        changed_rows = _apply_status_transition(
+            db,
+            contract_ids,
+            from_status=from_status,
+            to_status=to_status,
+            now=now,
+        )
+        changed_by_status[from_status] = [contract_id for contract_id, _ in changed_rows]
+        audit_events.extend(
+            (
+                contract_id,
+                "contract_status_changed",
+                {"from": from_status, "to": to_status, "source": audit_source},
+            )
+            for contract_id, _ in changed_rows
+        )
+        terminated_subscriber_ids.update(subscriber_id for _, subscriber_id in changed_rows)
+    record_contract_audit_events(db, audit_events, actor_id)
+    if to_status == "terminated":
+        _release_unused_subscriber_identifiers(db, terminated_subscriber_ids)
+        _cancel_pending_scheduled_events(
+            db,
+            [contract_id for contract_id, _, _ in audit_events],
+        )
+    return changed_by_status
+
+
+def bulk_update_contract_status(
+    db: Session,
+    payload: ContractBulkStatusUpdate,
+    actor_id: str | None = None,
+) -> ContractBulkStatusResult:
+    """Move every selected contract to ``payload.status`` with one UPDATE per transition.
+
+    Contracts are read in id order in batches of ``CONTRACT_BULK_STATUS_BATCH_SIZE`` and
+    each batch commits on its own, so large selections never hold one long transaction.
+    """
+    to_status = payload.status
+    batch_size = max(1, get_settings().contract_bulk_status_batch_size)
+    selection = _bulk_status_selection(payload)
+    transition_counts: dict[str, int] = {}
+    seen_ids: set[str] = set()
+    rejected_ids: list[str] = []
+    matched = unchanged = rejected = 0
+    last_id = ""
+
+    while True:
+        rows = db.execute(
+            selection.where(Contract.id > last_id).order_by(Contract.id.asc()).limit(batch_size),
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        matched += len(rows)
+        if payload.contract_ids is not None:
+            seen_ids.update(contract_id for contract_id, _ in rows)
+
+        ids_by_status: dict[str, list[str]] = {}
+        for contract_id, from_status in rows:
+            if from_status == to_status:
+                unchanged += 1
+            elif to_status in STATUS_TRANSITIONS.get(from_status, set()):
+                ids_by_status.setdefault(from_status, []).append(contract_id)
+            else:
+                rejected += 1
+                if len(rejected_ids) < BULK_STATUS_REPORTED_IDS_LIMIT:
+                    rejected_ids.append(contract_id)
+
+        if payload.dry_run:
+            for from_status, contract_ids in ids_by_status.items():
+                transition_counts[from_status] = (
+                    transition_counts.get(from_status, 0) + len(contract_ids)
+                )
+            continue
+
+        changed_by_status = _transition_contracts(
+            db,
+            ids_by_status,
+            to_status=to_status,
+            actor_id=actor_id,
+            audit_source="bulk",
+        )
+        for from_status, changed_ids in changed_by_status.items():
+            transition_counts[from_status] = (
+                transition_counts.get(from_status, 0) + len(changed_ids)
+            )
+        db.commit()
+
+    changed = sum(transition_counts.values())
+    missing_ids = (
+        sorted(set(payload.contract_ids) - seen_ids)[:BULK_STATUS_REPORTED_IDS_LIMIT]
+        if payload.contract_ids is not None
+        else []
+    )
+    if not payload.dry_run:
+        logger.info(
+            "contract.bulk_status_changed to=%s matched=%s changed=%s rejected=%s",
+            to_status,
+            matched,
+            changed,
+            rejected,
+        )
+    return ContractBulkStatusResult(
+        status=to_status,
+        dry_run=payload.dry_run,
+        matched=matched,
+        changed=changed,
+        unchanged=unchanged,
+        rejected=rejected,
+        transitions=[
+            ContractBulkTransitionCount(from_status=cast(ContractStatus, from_status), count=count)
+            for from_status, count in sorted(transition_counts.items())
+        ],
+        rejected_contract_ids=rejected_ids,
+        missing_contract_ids=missing_ids,
+    )
+
+
 def update_contract_offer(
     db: Session,
     contract_id: str,
@@ -614,7 +1176,7 @@ def update_contract_offer(
     previous_offer_id = contract.offer_id
     contract.offer_id = offer.id
     db.add(contract)
-    _record_audit_event(
+    record_contract_audit_event(
         db,
         contract.id,
         "contract_offer_changed",
@@ -624,3 +1186,267 @@ def update_contract_offer(
     db.commit()
     db.refresh(contract)
     return contract
+
+
+def list_contract_scheduled_events(db: Session, contract_id: str) -> list[ContractScheduledEvent]:
+    get_contract(db, contract_id)
+    return list(
+        db.scalars(
+            select(ContractScheduledEvent)
+            .where(ContractScheduledEvent.contract_id == contract_id)
+            .order_by(ContractScheduledEvent.due_date.asc(), ContractScheduledEvent.id.asc()),
+        ).all(),
+    )
+
+
+def schedule_contract_event(
+    db: Session,
+    contract_id: str,
+    payload: ContractScheduledEventCreate,
+    actor_id: str | None = None,
+) -> ContractScheduledEvent:
+    contract = get_contract(db, contract_id)
+    if contract.status == "terminated":
+        raise ApiException(
+            status_code=409,
+            code="contract_terminated",
+            message="Terminated contracts cannot receive scheduled events",
+        )
+    if payload.due_date < _utc_now().date():
+        raise ApiException(
+            status_code=422,
+            code="scheduled_event_date_invalid",
+            message="due_date cannot be in the past",
+        )
+    details: dict[str, object] = {}
+    if payload.event_type == "offer_change" and payload.offer_id:
+        offer = _get_offer(db, payload.offer_id)
+        _ensure_offer_valid_for_contract(offer, payload.due_date)
+        _assert_subscriber_offer_compatibility(_get_subscriber(db, contract.subscriber_id), offer)
+        details["offer_id"] = offer.id
+
+    # One pending event per contract and type: rescheduling replaces the previous one.
+    event = db.scalar(
+        select(ContractScheduledEvent).where(
+            ContractScheduledEvent.contract_id == contract.id,
+            ContractScheduledEvent.event_type == payload.event_type,
+            ContractScheduledEvent.status == "pending",
+        ),
+    )
+    if event is None:
+        event = ContractScheduledEvent(contract_id=contract.id, event_type=payload.event_type)
+    event.due_date = payload.due_date
+    event.payload = details
+    event.created_by_actor = actor_id
+    db.add(event)
+    db.flush()
+    record_contract_audit_event(
+        db,
+        contract.id,
+        "contract_event_scheduled",
+        actor_id,
+        {"event_type": payload.event_type, "due_date": payload.due_date.isoformat(), **details},
+    )
+    db.commit()
+    db.refresh(event)
+    return event
+
+
+def cancel_contract_scheduled_event(
+    db: Session,
+    contract_id: str,
+    event_id: str,
+    actor_id: str | None = None,
+) -> ContractScheduledEvent:
+    event = db.get(ContractScheduledEvent, event_id)
+    if event is None or event.contract_id != contract_id:
+        raise ApiException(
+            status_code=404,
+            code="scheduled_event_not_found",
+            message="Scheduled contract event was not found",
+        )
+    if event.status != "pending":
+        raise ApiException(
+            status_code=409,
+            code="scheduled_event_not_pending",
+            message="Only pending scheduled events can be cancelled",
+            details={"status": event.status},
+        )
+    event.status = "cancelled"
+    record_contract_audit_event(
+        db,
+        contract_id,
+        "contract_event_cancelled",
+        actor_id,
+        {"event_id": event.id, "event_type": event.event_type},
+    )
+    db.commit()
+    db.refresh(event)
+    return event
+
+
+def backfill_contract_expiry_events(db: Session) -> int:
+    """Create terminate events for open contracts with an end_date but no pending event."""
+    has_pending_terminate = (
+        select(ContractScheduledEvent.id)
+        .where(
+            ContractScheduledEvent.contract_id == Contract.id,
+            ContractScheduledEvent.event_type == "terminate",
+            ContractScheduledEvent.status == "pending",
+        )
+        .exists()
+    )
+    rows = db.execute(
+        select(Contract.id, Contract.end_date).where(
+            Contract.status.in_(OPEN_CONTRACT_STATUSES),
+            Contract.end_date.is_not(None),
+            ~has_pending_terminate,
+        ),
+    ).all()
+    if rows:
+        db.execute(
+            insert(ContractScheduledEvent),
+            [
+                {
+                    "contract_id": contract_id,
+                    "event_type": "terminate",
+                    "due_date": _termination_due_date(end_date),
+                    "payload": {},
+                }
+                for contract_id, end_date in rows
+            ],
+        )
+        db.commit()
+        logger.info("contract.expiry_events_backfilled count=%s", len(rows))
+    return len(rows)
+
+
+def _apply_scheduled_terminations(
+    db: Session,
+    events: list[ContractScheduledEvent],
+) -> dict[str, str]:
+    rows = db.execute(
+        select(Contract.id, Contract.status).where(
+            Contract.id.in_({event.contract_id for event in events}),
+        ),
+    ).all()
+    ids_by_status: dict[str, list[str]] = {}
+    for contract_id, from_status in rows:
+        if "terminated" in STATUS_TRANSITIONS.get(from_status, set()):
+            ids_by_status.setdefault(from_status, []).append(contract_id)
+    changed_by_status = _transition_contracts(
+        db,
+        ids_by_status,
+        to_status="terminated",
+        actor_id=SCHEDULER_ACTOR_ID,
+        audit_source="schedule",
+    )
+    terminated_ids = {
+        contract_id for changed_ids in changed_by_status.values() for contract_id in changed_ids
+    }
+    return {
+        event.id: "contract_status_transition_invalid"
+        for event in events
+        if event.contract_id not in terminated_ids
+    }
+
+
+def _apply_scheduled_offer_changes(
+    db: Session,
+    events: list[ContractScheduledEvent],
+) -> dict[str, str]:
+    payloads = {event.id: event.payload for event in events}
+    rows = db.execute(
+        select(Contract, Subscriber)
+        .join(Subscriber, Contract.subscriber_id == Subscriber.id)
+        .where(Contract.id.in_({event.contract_id for event in events})),
+    ).all()
+    contracts = {contract.id: (contract, subscriber) for contract, subscriber in rows}
+    offer_ids = {str(payload.get("offer_id")) for payload in payloads.values()}
+    offers = {offer.id: offer for offer in db.scalars(select(Offer).where(Offer.id.in_(offer_ids)))}
+
+    failures: dict[str, str] = {}
+    audit_events: list[tuple[str, str, dict[str, object]]] = []
+    for event in events:
+        loaded = contracts.get(event.contract_id)
+        offer = offers.get(str(payloads[event.id].get("offer_id")))
+        if loaded is None or loaded[0].status == "terminated":
+            failures[event.id] = "contract_terminated"
+            continue
+        contract, subscriber = loaded
+        if offer is None or offer.status != "active":
+            failures[event.id] = "offer_not_active"
+            continue
+        if subscriber.service_type != offer.service_type:
+            failures[event.id] = "subscriber_offer_mismatch"
+            continue
+        audit_events.append(
+            (
+                contract.id,
+                "contract_offer_changed",
+                {
+                    "from_offer_id": contract.offer_id,
+                    "to_offer_id": offer.id,
+                    "source": "schedule",
+                    "scheduled_event_id": event.id,
+                },
+            ),
+        )
+        contract.offer_id = offer.id
+    db.flush()
+    record_contract_audit_events(db, audit_events, SCHEDULER_ACTOR_ID)
+    return failures
+
+
+def apply_due_contract_events(
+    db: Session,
+    *,
+    today: date | None = None,
+    batch_size: int | None = None,
+) -> ContractScheduleRunResult:
+    """Apply pending scheduled events due on or before ``today``, one batch per transaction."""
+    due_on = today or _utc_now().date()
+    limit = batch_size or get_settings().contract_scheduler_batch_size
+    applied = failed = 0
+    while True:
+        events = list(
+            db.scalars(
+                select(ContractScheduledEvent)
+                .where(
+                    ContractScheduledEvent.status == "pending",
+                    ContractScheduledEvent.due_date <= due_on,
+                )
+                .order_by(ContractScheduledEvent.due_date.asc(), ContractScheduledEvent.id.asc())
+                .limit(limit)
+                .with_for_update(skip_locked=True),
+            ),
+        )
+        if not events:
+            break
+        offer_changes = [event for event in events if event.event_type == "offer_change"]
+        terminations = [event for event in events if event.event_type == "terminate"]
+        failures: dict[str, str] = {}
+        # Offer changes go first so a contract due for both still ends on its new offer.
+        if offer_changes:
+            failures.update(_apply_scheduled_offer_changes(db, offer_changes))
+        if terminations:
+            failures.update(_apply_scheduled_terminations(db, terminations))
+
+        now = _utc_now()
+        for event in events:
+            event.attempts += 1
+            if event.id in failures:
+                event.status = "failed"
+                event.last_error = failures[event.id]
+            else:
+                event.status = "applied"
+                event.applied_at = now
+        db.commit()
+        applied += len(events) - len(failures)
+        failed += len(failures)
+        if len(events) < limit:
+            break
+
+    if applied or failed:
+        logger.info("contract.scheduled_events_applied applied=%s failed=%s", applied, failed)
+    return ContractScheduleRunResult(applied=applied, failed=failed)
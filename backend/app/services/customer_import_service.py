@@ -0,0 +1,388 @@
+import csv
+import json
+import logging
+import os
+import uuid
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.settings import get_settings
+from app.models.customer import Client, Subscriber
+from app.schemas.customer import (
+    ClientCreate,
+    CustomerImportFormat,
+    CustomerImportReject,
+    CustomerImportResult,
+    SubscriberCreate,
+)
+from app.services.numbering_service import claim_identifiers
+
+logger = logging.getLogger("mt_facturation.customer")
+
+CUSTOMER_IMPORT_REJECT_SAMPLE_SIZE = 20
+# Decode input with this error handler: bytes that are not UTF-8 then only reject their own row
+# instead of aborting an import whose earlier batches are already committed.
+CUSTOMER_IMPORT_DECODE_ERRORS = "surrogateescape"
+SUBSCRIBER_FIELDS = {"service_type", "service_identifier", "subscriber_status"}
+INVALID_ENCODING_MESSAGE = "Row is not valid UTF-8"
+
+
+@dataclass
+class _ImportRow:
+    line: int
+    record: dict[str, Any]
+    client: ClientCreate
+    subscriber: SubscriberCreate | None
+
+
+@dataclass
+class _BatchPlan:
+    rows: list[_ImportRow] = field(default_factory=list)
+    clients: list[dict[str, Any]] = field(default_factory=list)
+    subscribers: list[dict[str, Any]] = field(default_factory=list)
+    clients_matched: int = 0
+
+
+@dataclass
+class _ImportStats:
+    rows_read: int = 0
+    clients_created: int = 0
+    clients_matched: int = 0
+    subscribers_created: int = 0
+    rejected_count: int = 0
+    rejects_sample: list[CustomerImportReject] = field(default_factory=list)
+
+
+def _import_rejects_root() -> Path:
+    configured = get_settings().customer_import_rejects_dir.strip()
+    base = Path(configured)
+    if base.is_absolute():
+        return base
+    return Path(os.getcwd()) / base
+
+
+def default_rejects_path() -> Path:
+    return _import_rejects_root() / f"rejects-{uuid.uuid4()}.ndjson"
+
+
+class _RejectWriter:
+    """Streams rejected rows as NDJSON and keeps a short sample for the response.
+
+    The file is only created once the first row is rejected.
+    """
+
+    def __init__(self, stats: _ImportStats, path: Path) -> None:
+        self._stats = stats
+        self.path = path
+        self._handle: IO[str] | None = None
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def reject(
+        self,
+        line: int,
+        record: dict[str, Any] | None,
+        *,
+        code: str,
+        message: str,
+        details: dict[str, Any] | None = None,
+    ) -> None:
+        entry = CustomerImportReject(line=line, code=code, message=message, details=details or {})
+        self._stats.rejected_count += 1
+        if len(self._stats.rejects_sample) < CUSTOMER_IMPORT_REJECT_SAMPLE_SIZE:
+            self._stats.rejects_sample.append(entry)
+        if self._handle is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._handle = self.path.open("w", encoding="utf-8")
+        payload = {**entry.model_dump(), "record": record}
+        self._handle.write(json.dumps(payload, sort_keys=True, default=str) + "\n")
+
+
+def _is_undecodable(text: str) -> bool:
+    # surrogateescape maps each undecodable byte to a lone surrogate in U+DC80..U+DCFF.
+    return any("\udc80" <= char <= "\udcff" for char in text)
+
+
+def iter_import_records(
+    lines: Iterable[str],
+    *,
+    source_format: CustomerImportFormat,
+) -> Iterator[tuple[int, dict[str, Any] | None, str | None]]:
+    """Yield ``(line, record, parse_error)`` one row at a time without reading ahead."""
+    if source_format == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            if any(
+                _is_undecodable(text)
+                for key, value in row.items()
+                for text in (key, value)
+                if isinstance(text, str)
+            ):
+                yield reader.line_num, None, INVALID_ENCODING_MESSAGE
+                continue
+            record = {
+                key.strip(): (value.strip() or None) if isinstance(value, str) else value
+                for key, value in row.items()
+                if key
+            }
+            yield reader.line_num, record, None
+        return
+
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        if _is_undecodable(line):
+            yield line_number, None, INVALID_ENCODING_MESSAGE
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield line_number, None, str(exc)
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, "Each NDJSON line must be a JSON object"
+            continue
+        yield line_number, record, None
+
+
+def _parse_row(line: int, record: dict[str, Any]) -> _ImportRow:
+    client = ClientCreate.model_validate(
+        {key: value for key, value in record.items() if key not in SUBSCRIBER_FIELDS},
+    )
+    subscriber = None
+    if record.get("service_identifier") is not None:
+        subscriber = SubscriberCreate.model_validate(
+            {
+                "service_type": record.get("service_type"),
+                "service_identifier": record.get("service_identifier"),
+                "status": record.get("subscriber_status") or "active",
+            },
+        )
+    return _ImportRow(line=line, record=record, client=client, subscriber=subscriber)
+
+
+def _plan_batch(
+    db: Session,
+    rows: list[_ImportRow],
+    rejects: _RejectWriter,
+) -> _BatchPlan:
+    """Resolve a batch against the database with one lookup per unique column."""
+    cins = {row.client.cin for row in rows if row.client.cin}
+    identifiers = {row.subscriber.service_identifier for row in rows if row.subscriber}
+    client_ids_by_cin: dict[str, str] = (
+        {
+            cin: client_id
+            for client_id, cin in db.execute(
+                select(Client.id, Client.cin).where(Client.cin.in_(cins)),
+            )
+            if cin
+        }
+        if cins
+        else {}
+    )
+    taken_identifiers = (
+        set(
+            db.scalars(
+                select(Subscriber.service_identifier).where(
+                    Subscriber.service_identifier.in_(identifiers),
+                    Subscriber.status != "terminated",
+                ),
+            ),
+        )
+        if identifiers
+        else set()
+    )
+
+    plan = _BatchPlan()
+    for row in rows:
+        cin = row.client.cin
+        existing_client_id = client_ids_by_cin.get(cin) if cin else None
+        if existing_client_id is not None and row.subscriber is None:
+            rejects.reject(
+                row.line,
+                row.record,
+                code="client_cin_conflict",
+                message="Client CIN already exists",
+                details={"client_id": existing_client_id},
+            )
+            continue
+        if row.subscriber is not None and row.subscriber.service_identifier in taken_identifiers:
+            rejects.reject(
+                row.line,
+                row.record,
+                code="subscriber_identifier_conflict",
+                message="Subscriber service identifier already exists",
+            )
+            continue
+
+        # A known CIN only adds another subscriber to that client, so legacy exports with one
+        # row per line import cleanly across batches.
+        plan.rows.append(row)
+        if existing_client_id is not None:
+            client_id = existing_client_id
+            plan.clients_matched += 1
+        else:
+            client_id = str(uuid.uuid4())
+            plan.clients.append({"id": client_id, **row.client.model_dump()})
+            if cin:
+                client_ids_by_cin[cin] = client_id
+        if row.subscriber is not None:
+            plan.subscribers.append(
+                {
+                    "id": str(uuid.uuid4()),
+                    "client_id": client_id,
+                    **row.subscriber.model_dump(),
+                },
+            )
+            taken_identifiers.add(row.subscriber.service_identifier)
+    return plan
+
+
+def _write_batch(db: Session, plan: _BatchPlan) -> None:
+    if plan.clients:
+        db.execute(insert(Client), plan.clients)
+    if plan.subscribers:
+        db.execute(insert(Subscriber), plan.subscribers)
+        claim_identifiers(
+            db,
+            identifiers=[row["service_identifier"] for row in plan.subscribers],
+        )
+
+
+def _count_batch(stats: _ImportStats, plan: _BatchPlan) -> None:
+    stats.clients_created += len(plan.clients)
+    stats.clients_matched += plan.clients_matched
+    stats.subscribers_created += len(plan.subscribers)
+
+
+def _import_batch(
+    db: Session,
+    rows: list[_ImportRow],
+    stats: _ImportStats,
+    rejects: _RejectWriter,
+) -> None:
+    plan = _plan_batch(db, rows, rejects)
+    try:
+        _write_batch(db, plan)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+    else:
+        _count_batch(stats, plan)
+        return
+
+    # A concurrent writer took a CIN or identifier after the pre-check; retry the accepted
+    # rows one savepoint at a time so only the conflicting ones are rejected.
+    for row in plan.rows:
+        try:
+            with db.begin_nested():
+                row_plan = _plan_batch(db, [row], rejects)
+                _write_batch(db, row_plan)
+        except IntegrityError:
+            rejects.reject(
+                row.line,
+                row.record,
+                code="import_conflict",
+                message="Row conflicts with data written during the import",
+            )
+        else:
+            _count_batch(stats, row_plan)
+    db.commit()
+
+
+def _import_rows(
+    db: Session,
+    lines: Iterable[str],
+    *,
+    source_format: CustomerImportFormat,
+    batch_size: int,
+    stats: _ImportStats,
+    rejects: _RejectWriter,
+) -> None:
+    batch: list[_ImportRow] = []
+    for line, record, parse_error in iter_import_records(lines, source_format=source_format):
+        stats.rows_read += 1
+        if record is None:
+            rejects.reject(line, None, code="parse_error", message=parse_error or "Invalid row")
+            continue
+        try:
+            batch.append(_parse_row(line, record))
+        except ValidationError as exc:
+            rejects.reject(
+                line,
+                record,
+                code="validation_error",
+                message="Row failed validation",
+                details={
+                    "errors": [
+                        {"loc": list(error["loc"]), "message": error["msg"]}
+                        for error in exc.errors()
+                    ],
+                },
+            )
+            continue
+        if len(batch) >= batch_size:
+            _import_batch(db, batch, stats, rejects)
+            batch = []
+    if batch:
+        _import_batch(db, batch, stats, rejects)
+
+
+def import_customers(
+    db: Session,
+    lines: Iterable[str],
+    *,
+    source_format: CustomerImportFormat,
+    rejects_path: Path | None = None,
+    batch_size: int | None = None,
+) -> CustomerImportResult:
+    """Stream clients (and optionally one subscriber per row) from CSV or NDJSON lines.
+
+    Rows are validated with the same schemas as the API, checked for CIN and service identifier
+    conflicts with one query per column per batch, and inserted with multi-row statements.
+    Each batch commits on its own, so memory stays bounded by the batch size. Rejected rows
+    are written with their reason to ``rejects_path``, by default a new file under
+    ``customer_import_rejects_dir``.
+    """
+    stats = _ImportStats()
+    rejects = _RejectWriter(stats, rejects_path or default_rejects_path())
+    try:
+        _import_rows(
+            db,
+            lines,
+            source_format=source_format,
+            batch_size=max(1, batch_size or get_settings().customer_import_batch_size),
+            stats=stats,
+            rejects=rejects,
+        )
+    finally:
+        rejects.close()
+
+    logger.info(
+        "customer.import_completed rows=%s clients_created=%s clients_matched=%s "
+        "subscribers_created=%s rejected=%s",
+        stats.rows_read,
+        stats.clients_created,
+        stats.clients_matched,
+        stats.subscribers_created,
+        stats.rejected_count,
+    )
+    return CustomerImportResult(
+        rows_read=stats.rows_read,
+        clients_created=stats.clients_created,
+        clients_matched=stats.clients_matched,
+        subscribers_created=stats.subscribers_created,
+        rejected_count=stats.rejected_count,
+        reject_file=str(rejects.path) if stats.rejected_count else None,
+        rejects_sample=stats.rejects_sample,
+    )
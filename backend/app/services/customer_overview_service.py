@@ -0,0 +1,248 @@
+import threading
+from collections.abc import Iterable
+from dataclasses import dataclass
+from decimal import Decimal
+from functools import lru_cache
+
+from sqlalchemy import case, event, func, select
+from sqlalchemy.orm import ORMExecuteState, Session, SessionTransaction, UOWTransaction
+
+from app.common.cache import TTLCache
+from app.core.settings import get_settings
+from app.models.billing import Invoice
+from app.models.catalog import Offer
+from app.models.collections import CollectionCase, Payment
+from app.models.contract import Contract
+from app.models.customer import Client, Subscriber
+from app.schemas.billing import InvoiceRead
+from app.schemas.catalog import OfferRead
+from app.schemas.contract import ContractRead
+from app.schemas.customer import ClientRead, SubscriberRead
+from app.schemas.customer_overview import (
+    ClientAccountSummary,
+    ClientOverviewContract,
+    ClientOverviewRead,
+)
+from app.services.collections_service import ACTIVE_CASE_STATUSES
+from app.services.contract_service import OPEN_CONTRACT_STATUSES
+from app.services.customer_service import get_client
+
+CUSTOMER_OVERVIEW_INVOICE_LIMIT = 5
+CUSTOMER_OVERVIEW_INVOICE_LIMIT_MAX = 50
+OPEN_INVOICE_STATUSES = ("issued", "overdue")
+
+TOUCHED_CLIENTS_KEY = "customer_overview_touched_clients"
+BULK_WRITE_KEY = "customer_overview_bulk_write"
+
+# Rows whose writes change a client's balance, counts or overview lists.
+_CLIENT_SCOPED_MODELS = (Subscriber, Contract, Invoice, Payment, CollectionCase)
+
+
+@dataclass(frozen=True)
+class AccountTotals:
+    outstanding_amount: Decimal
+    overdue_amount: Decimal
+    invoice_count: int
+    open_invoice_count: int
+    overdue_invoice_count: int
+    open_collection_case_count: int
+
+
+class CustomerSummaryCache:
+    """Per-client account totals, dropped whenever a committed write touches the client.
+
+    The generation counter keeps a reader that computed totals before a concurrent
+    invalidation from caching them afterwards.
+    """
+
+    def __init__(self, *, max_entries: int, ttl_seconds: float) -> None:
+        self._entries: TTLCache[str, AccountTotals] = TTLCache(
+            max_entries=max_entries,
+            ttl_seconds=ttl_seconds,
+        )
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def get(self, client_id: str) -> AccountTotals | None:
+        return self._entries.get(client_id)
+
+    def set(self, client_id: str, totals: AccountTotals, *, generation: int) -> None:
+        with self._lock:
+            if generation == self._generation:
+                self._entries.set(client_id, totals)
+
+    def invalidate(self, client_ids: Iterable[str]) -> None:
+        with self._lock:
+            self._generation += 1
+            for client_id in client_ids:
+                self._entries.pop(client_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+@lru_cache(maxsize=1)
+def get_customer_summary_cache() -> CustomerSummaryCache:
+    settings = get_settings()
+    return CustomerSummaryCache(
+        max_entries=settings.customer_overview_cache_max_entries,
+        ttl_seconds=settings.customer_overview_cache_ttl_seconds,
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_touched_clients(session: Session, flush_context: UOWTransaction) -> None:
+    touched: set[str] = session.info.setdefault(TOUCHED_CLIENTS_KEY, set())
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, Client):
+            touched.add(instance.id)
+        elif isinstance(instance, _CLIENT_SCOPED_MODELS):
+            touched.add(instance.client_id)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_writes(orm_execute_state: ORMExecuteState) -> None:
+    # Bulk UPDATE/DELETE/INSERT statements do not say which clients they hit.
+    if not (
+        orm_execute_state.is_update
+        or orm_execute_state.is_delete
+        or orm_execute_state.is_insert
+    ):
+        return
+    if any(
+        issubclass(mapper.class_, (Client, *_CLIENT_SCOPED_MODELS))
+        for mapper in orm_execute_state.all_mappers
+    ):
+        orm_execute_state.session.info[BULK_WRITE_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_clients(session: Session) -> None:
+    touched = session.info.pop(TOUCHED_CLIENTS_KEY, None)
+    if session.info.pop(BULK_WRITE_KEY, False):
+        get_customer_summary_cache().clear()
+    elif touched:
+        get_customer_summary_cache().invalidate(touched)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_uncommitted_clients(session: Session, transaction: SessionTransaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(TOUCHED_CLIENTS_KEY, None)
+        session.info.pop(BULK_WRITE_KEY, None)
+
+
+def _money(value: object) -> Decimal:
+    return Decimal(str(value)).quantize(Decimal("0.01"))
+
+
+def load_account_totals(db: Session, client_id: str) -> AccountTotals:
+    """Read balance and counts for one client in a single statement."""
+    paid = (
+        select(func.coalesce(func.sum(Payment.amount), 0))
+        .where(Payment.invoice_id == Invoice.id, Payment.status == "posted")
+        .correlate(Invoice)
+        .scalar_subquery()
+    )
+    open_balance = Invoice.total_amount - paid
+    is_open = Invoice.status.in_(OPEN_INVOICE_STATUSES)
+    is_overdue = Invoice.status == "overdue"
+    invoice_totals = (
+        select(
+            func.count(Invoice.id).label("invoice_count"),
+            func.count(case((is_open, Invoice.id))).label("open_invoice_count"),
+            func.count(case((is_overdue, Invoice.id))).label("overdue_invoice_count"),
+            func.coalesce(func.sum(case((is_open, open_balance), else_=0)), 0).label(
+                "outstanding_amount",
+            ),
+            func.coalesce(func.sum(case((is_overdue, open_balance), else_=0)), 0).label(
+                "overdue_amount",
+            ),
+        )
+        .where(Invoice.client_id == client_id)
+        .subquery()
+    )
+    open_case_count = (
+        select(func.count(CollectionCase.id))
+        .where(
+            CollectionCase.client_id == client_id,
+            CollectionCase.status.in_(ACTIVE_CASE_STATUSES),
+        )
+        .scalar_subquery()
+    )
+    row = db.execute(select(invoice_totals, open_case_count.label("open_case_count"))).one()
+    return AccountTotals(
+        outstanding_amount=_money(row.outstanding_amount),
+        overdue_amount=_money(row.overdue_amount),
+        invoice_count=int(row.invoice_count),
+        open_invoice_count=int(row.open_invoice_count),
+        overdue_invoice_count=int(row.overdue_invoice_count),
+        open_collection_case_count=int(row.open_case_count),
+    )
+
+
+def get_client_overview(
+    db: Session,
+    client_id: str,
+    *,
+    invoice_limit: int = CUSTOMER_OVERVIEW_INVOICE_LIMIT,
+) -> ClientOverviewRead:
+    client = get_client(db, client_id)
+    subscribers = db.scalars(
+        select(Subscriber)
+        .where(Subscriber.client_id == client_id)
+        .order_by(Subscriber.created_at.asc(), Subscriber.id.asc()),
+    ).all()
+    contract_rows = db.execute(
+        select(Contract, Offer)
+        .join(Offer, Offer.id == Contract.offer_id)
+        .where(
+            Contract.client_id == client_id,
+            Contract.status.in_(OPEN_CONTRACT_STATUSES),
+        )
+        .order_by(Contract.start_date.desc(), Contract.id.asc()),
+    ).all()
+    invoices = db.scalars(
+        select(Invoice)
+        .where(Invoice.client_id == client_id)
+        .order_by(Invoice.issued_at.desc(), Invoice.id.desc())
+        .limit(invoice_limit),
+    ).all()
+
+    cache = get_customer_summary_cache()
+    totals = cache.get(client_id)
+    summary_cached = totals is not None
+    if totals is None:
+        generation = cache.generation()
+        totals = load_account_totals(db, client_id)
+        cache.set(client_id, totals, generation=generation)
+
+    return ClientOverviewRead(
+        client=ClientRead.model_validate(client),
+        subscribers=[SubscriberRead.model_validate(subscriber) for subscriber in subscribers],
+        open_contracts=[
+            ClientOverviewContract(
+                contract=ContractRead.model_validate(contract),
+                offer=OfferRead.model_validate(offer),
+            )
+            for contract, offer in contract_rows
+        ],
+        recent_invoices=[InvoiceRead.model_validate(invoice) for invoice in invoices],
+        summary=ClientAccountSummary(
+            outstanding_amount=totals.outstanding_amount,
+            overdue_amount=totals.overdue_amount,
+            invoice_count=totals.invoice_count,
+            open_invoice_count=totals.open_invoice_count,
+            overdue_invoice_count=totals.overdue_invoice_count,
+            open_collection_case_count=totals.open_collection_case_count,
+            is_delinquent=client.is_delinquent,
+            delinquent_since=client.delinquent_since,
+        ),
+        summary_cached=summary_cached,
+    )
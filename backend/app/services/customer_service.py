@@ -1,12 +1,25 @@
-from sqlalchemy import func, select
-from sqlalchemy.orm import Session
+import logging
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import ColumnElement, delete, exists, func, or_, select
+from sqlalchemy.orm import InstrumentedAttribute, Session
 
 from app.common.errors import ApiException
+from app.core.settings import get_settings
 from app.models.billing import Invoice
 from app.models.collections import CollectionCase, Payment
 from app.models.contract import Contract
 from app.models.customer import Client, Subscriber
-from app.schemas.customer import ClientCreate, ClientUpdate, SubscriberCreate, SubscriberUpdate
+from app.schemas.customer import (
+    ClientCreate,
+    ClientPurgeResult,
+    ClientUpdate,
+    SubscriberCreate,
+    SubscriberUpdate,
+)
+from app.services.numbering_service import claim_identifier, release_identifiers
+
+logger = logging.getLogger("mt_facturation.customer")
 
 
 def _get_client_by_cin(db: Session, cin: str) -> Client | None:
@@ -75,22 +88,30 @@ def update_client(db: Session, client_id: str, payload: ClientUpdate) -> Client:
     return client
 
 
-def delete_client(db: Session, client_id: str) -> None:
-    client = get_client(db, client_id)
-    has_contracts = (
-        db.scalar(select(Contract.id).where(Contract.client_id == client_id).limit(1)) is not None
-    )
-    has_invoices = (
-        db.scalar(select(Invoice.id).where(Invoice.client_id == client_id).limit(1)) is not None
+def _client_has_history(client_id: InstrumentedAttribute[str]) -> ColumnElement[bool]:
+    """True when any contract, invoice, payment or collection case references the client."""
+    return or_(
+        exists().where(Contract.client_id == client_id),
+        exists().where(Invoice.client_id == client_id),
+        exists().where(Payment.client_id == client_id),
+        exists().where(CollectionCase.client_id == client_id),
     )
-    has_payments = (
-        db.scalar(select(Payment.id).where(Payment.client_id == client_id).limit(1)) is not None
-    )
-    has_collection_cases = (
-        db.scalar(select(CollectionCase.id).where(CollectionCase.client_id == client_id).limit(1))
-        is not None
-    )
-    if has_contracts or has_invoices or has_payments or has_collection_cases:
+
+
+def delete_client(db: Session, client_id: str) -> None:
+    row = db.execute(
+        select(Client, _client_has_history(Client.id).label("has_history")).where(
+            Client.id == client_id,
+        ),
+    ).one_or_none()
+    if row is None:
+        raise ApiException(
+            status_code=404,
+            code="client_not_found",
+            message="Client was not found",
+        )
+    client, has_history = row
+    if has_history:
         raise ApiException(
             status_code=409,
             code="client_delete_blocked",
@@ -104,21 +125,124 @@ def delete_client(db: Session, client_id: str) -> None:
     db.commit()
 
 
-def create_subscriber(db: Session, client_id: str, payload: SubscriberCreate) -> Subscriber:
-    get_client(db, client_id)
+def purge_prospect_clients(
+    db: Session,
+    *,
+    created_before: datetime | None = None,
+    batch_size: int | None = None,
+    dry_run: bool = False,
+) -> ClientPurgeResult:
+    """Delete clients without any history, and their subscribers, in committed batches.
+
+    Only clients created before ``created_before`` are considered; it defaults to
+    ``customer_purge_retention_days`` ago so prospects still being onboarded are never hit.
+    Each batch is found with one anti-join and removed with two bulk deletes that repeat the
+    history check, so a client that gained a contract since it was selected is kept.
+    """
+    settings = get_settings()
+    resolved_batch_size = batch_size or settings.customer_purge_batch_size
+    cutoff = created_before or datetime.now(UTC) - timedelta(
+        days=settings.customer_purge_retention_days,
+    )
+    prospects = select(Client.id).where(
+        Client.created_at < cutoff,
+        ~_client_has_history(Client.id),
+    )
+
+    if dry_run:
+        matched = db.scalar(select(func.count()).select_from(prospects.subquery())) or 0
+        return ClientPurgeResult(
+            created_before=cutoff,
+            dry_run=True,
+            clients_matched=int(matched),
+            clients_deleted=0,
+            subscribers_deleted=0,
+            batches=0,
+        )
+
+    result = ClientPurgeResult(
+        created_before=cutoff,
+        dry_run=False,
+        clients_matched=0,
+        clients_deleted=0,
+        subscribers_deleted=0,
+        batches=0,
+    )
+    while True:
+        client_ids = list(
+            db.scalars(
+                prospects.order_by(Client.created_at.asc(), Client.id.asc()).limit(
+                    resolved_batch_size,
+                ),
+            ),
+        )
+        if not client_ids:
+            break
+        identifiers = list(
+            db.scalars(
+                delete(Subscriber)
+                .where(
+                    Subscriber.client_id.in_(client_ids),
+                    ~_client_has_history(Subscriber.client_id),
+                )
+                .returning(Subscriber.service_identifier)
+                .execution_options(synchronize_session=False),
+            ),
+        )
+        release_identifiers(db, identifiers=identifiers)
+        clients = db.execute(
+            delete(Client)
+            .where(Client.id.in_(client_ids), ~_client_has_history(Client.id))
+            .execution_options(synchronize_session=False),
+        )
+        db.commit()
+        result.clients_matched += len(client_ids)
+        result.clients_deleted += int(getattr(clients, "rowcount", 0) or 0)
+        result.subscribers_deleted += len(identifiers)
+        result.batches += 1
+        if len(client_ids) < resolved_batch_size:
+            break
 
-    existing = db.scalar(
-        select(Subscriber).where(Subscriber.service_identifier == payload.service_identifier),
+    if result.clients_deleted:
+        logger.info(
+            "customer.prospects_purged clients=%s subscribers=%s batches=%s",
+            result.clients_deleted,
+            result.subscribers_deleted,
+            result.batches,
+        )
+    return result
+
+
+def _ensure_identifier_not_live(
+    db: Session,
+    identifier: str,
+    *,
+    exclude_subscriber_id: str | None = None,
+) -> None:
+    # Terminated subscribers keep their number for history and do not block reuse.
+    statement = select(Subscriber.id).where(
+        Subscriber.service_identifier == identifier,
+        Subscriber.status != "terminated",
     )
-    if existing:
+    if exclude_subscriber_id is not None:
+        statement = statement.where(Subscriber.id != exclude_subscriber_id)
+    if db.scalar(statement.limit(1)) is not None:
         raise ApiException(
             status_code=409,
             code="subscriber_identifier_conflict",
             message="Subscriber service identifier already exists",
         )
 
+
+def create_subscriber(db: Session, client_id: str, payload: SubscriberCreate) -> Subscriber:
+    get_client(db, client_id)
+
+    _ensure_identifier_not_live(db, payload.service_identifier)
+
     subscriber = Subscriber(client_id=client_id, **payload.model_dump())
     db.add(subscriber)
+    # A hand-entered pool number must not stay available for automatic allocation.
+    claim_identifier(db, identifier=payload.service_identifier)
     db.commit()
     db.refresh(subscriber)
     return subscriber
@@ -157,6 +281,13 @@ def get_subscriber(db: Session, subscriber_id: str) -> Subscriber:
 
 def update_subscriber(db: Session, subscriber_id: str, payload: SubscriberUpdate) -> Subscriber:
     subscriber = get_subscriber(db, subscriber_id)
+    if subscriber.status == "terminated" and payload.status not in (None, "terminated"):
+        # The number may have been handed to another subscriber since the termination.
+        _ensure_identifier_not_live(
+            db,
+            subscriber.service_identifier,
+            exclude_subscriber_id=subscriber.id,
+        )
     for field, value in payload.model_dump(exclude_unset=True).items():
         setattr(subscriber, field, value)
     db.add(subscriber)
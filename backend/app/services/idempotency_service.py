@@ -0,0 +1,402 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime, timedelta
+from functools import lru_cache
+from typing import Any, TypeVar
+
+from pydantic import BaseModel
+from sqlalchemy import Connection, Engine, and_, delete, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.common.background import PeriodicWorker
+from app.common.cache import TTLCache
+from app.common.errors import ApiException
+from app.core.settings import get_settings
+from app.models.idempotency import IdempotencyRecord
+
+logger = logging.getLogger("mt_facturation.idempotency")
+
+IDEMPOTENCY_KEY_MIN_LENGTH = 8
+ResponseT = TypeVar("ResponseT", bound=BaseModel)
+
+
+def _utc_now() -> datetime:
+    return datetime.now(UTC)
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value
+
+
+def request_hash(payload: dict[str, Any]) -> str:
+    serialized = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def normalize_idempotency_key(idempotency_key: str) -> str:
+    normalized_key = idempotency_key.strip()
+    if len(normalized_key) < IDEMPOTENCY_KEY_MIN_LENGTH:
+        raise ApiException(
+            status_code=400,
+            code="idempotency_key_invalid",
+            message="Idempotency-Key header must contain at least 8 characters",
+        )
+    return normalized_key
+
+
+def raise_idempotency_payload_conflict() -> None:
+    raise ApiException(
+        status_code=409,
+        code="idempotency_key_payload_conflict",
+        message="Idempotency-Key was already used with a different payload",
+    )
+
+
+@lru_cache(maxsize=1)
+def get_idempotency_cache() -> TTLCache[tuple[str, str], tuple[str, BaseModel]]:
+    settings = get_settings()
+    # Cached replays must never outlive the stored record they mirror.
+    ttl_seconds = min(
+        settings.idempotency_cache_ttl_seconds,
+        settings.idempotency_retention_hours * 3600,
+    )
+    return TTLCache(
+        max_entries=settings.idempotency_cache_max_entries,
+        ttl_seconds=ttl_seconds,
+    )
+
+
+def _idempotency_cutoff(now: datetime | None = None) -> datetime:
+    retention = timedelta(hours=get_settings().idempotency_retention_hours)
+    return (now or _utc_now()) - retention
+
+
+def _get_record(db: Session, *, operation: str, idempotency_key: str) -> IdempotencyRecord | None:
+    return db.scalar(
+        select(IdempotencyRecord)
+        .where(
+            IdempotencyRecord.operation == operation,
+            IdempotencyRecord.idempotency_key == idempotency_key,
+        )
+        .execution_options(populate_existing=True),
+    )
+
+
+def _decode_response(record: IdempotencyRecord, response_model: type[ResponseT]) -> ResponseT:
+    if record.response_payload is None:
+        raise ApiException(
+            status_code=500,
+            code="idempotency_record_invalid",
+            message="Stored idempotency response payload is invalid",
+            details={"reason": "response payload is missing"},
+        )
+    return response_model.model_validate(record.response_payload)
+
+
+def _try_reserve(
+    db: Session,
+    *,
+    operation: str,
+    idempotency_key: str,
+    payload_hash: str,
+) -> IdempotencyRecord | None:
+    """Insert the in-progress row; returns None when reserved, else the row that won the key."""
+    reservation = IdempotencyRecord(
+        operation=operation,
+        idempotency_key=idempotency_key,
+        request_hash=payload_hash,
+        status="in_progress",
+    )
+    db.add(reservation)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return _get_record(db, operation=operation, idempotency_key=idempotency_key)
+    return None
+
+
+def _take_over_stale_reservation(db: Session, record: IdempotencyRecord) -> bool:
+    """Claim an in-progress row whose heartbeat stopped, e.g. because its worker crashed."""
+    result = db.execute(
+        update(IdempotencyRecord)
+        .where(
+            IdempotencyRecord.id == record.id,
+            IdempotencyRecord.status == "in_progress",
+            IdempotencyRecord.updated_at == record.updated_at,
+        )
+        .values(updated_at=_utc_now()),
+    )
+    db.commit()
+    return bool(getattr(result, "rowcount", 0))
+
+
+def _reserve_or_replay(
+    db: Session,
+    *,
+    operation: str,
+    idempotency_key: str,
+    payload_hash: str,
+    response_model: type[ResponseT],
+) -> ResponseT | None:
+    settings = get_settings()
+    deadline = time.monotonic() + settings.idempotency_wait_timeout_seconds
+    stale_after = timedelta(seconds=settings.idempotency_in_progress_timeout_seconds)
+
+    while True:
+        existing = _try_reserve(
+            db,
+            operation=operation,
+            idempotency_key=idempotency_key,
+            payload_hash=payload_hash,
+        )
+        if existing is None:
+            return None
+        if _as_utc(existing.created_at) <= _idempotency_cutoff():
+            # Expired but not yet purged: the key is free again, as it will be after the purge.
+            db.execute(delete(IdempotencyRecord).where(IdempotencyRecord.id == existing.id))
+            db.commit()
+            continue
+        if existing.request_hash != payload_hash:
+            raise_idempotency_payload_conflict()
+        if existing.status == "completed":
+            result = _decode_response(existing, response_model)
+            get_idempotency_cache().set((operation, idempotency_key), (payload_hash, result))
+            return result
+        if _utc_now() - _as_utc(existing.updated_at) > stale_after:
+            if _take_over_stale_reservation(db, existing):
+                logger.warning(
+                    "idempotency.stale_reservation_taken_over operation=%s key=%s",
+                    operation,
+                    idempotency_key,
+                )
+                return None
+            continue
+        if time.monotonic() >= deadline:
+            raise ApiException(
+                status_code=409,
+                code="idempotency_request_in_progress",
+                message="A request with this Idempotency-Key is still being processed",
+                details={"retry_after_seconds": settings.idempotency_wait_poll_seconds},
+            )
+        # Concurrent duplicates wait for the first request instead of repeating its work.
+        db.rollback()
+        time.sleep(settings.idempotency_wait_poll_seconds)
+
+
+def _release_reservation(db: Session, *, operation: str, idempotency_key: str) -> None:
+    db.rollback()
+    db.execute(
+        delete(IdempotencyRecord).where(
+            IdempotencyRecord.operation == operation,
+            IdempotencyRecord.idempotency_key == idempotency_key,
+            IdempotencyRecord.status == "in_progress",
+        ),
+    )
+    db.commit()
+
+
+class ReservationHeartbeat:
+    """Keeps ``updated_at`` fresh on in-progress reservations so only abandoned ones go stale.
+
+    One shared worker, started on first use, refreshes the reservations that have been running
+    in this process for at least one interval with one update per database, in its own
+    session: the request sessions are busy with their operations. Most requests finish before
+    that and cost no write.
+    """
+
+    def __init__(self, *, interval_seconds: float) -> None:
+        self._interval_seconds = interval_seconds
+        self._lock = threading.Lock()
+        self._in_flight: dict[Engine | Connection, dict[tuple[str, str], float]] = {}
+        self._worker: PeriodicWorker | None = None
+
+    @contextmanager
+    def track(self, db: Session, *, operation: str, idempotency_key: str) -> Iterator[None]:
+        bind = db.get_bind()
+        entry = (operation, idempotency_key)
+        with self._lock:
+            self._in_flight.setdefault(bind, {})[entry] = time.monotonic()
+            if self._worker is None:
+                self._worker = PeriodicWorker(
+                    name="idempotency-heartbeat",
+                    interval_seconds=self._interval_seconds,
+                    task=self.refresh,
+                )
+                self._worker.start()
+        try:
+            yield
+        finally:
+            with self._lock:
+                entries = self._in_flight.get(bind)
+                if entries is not None:
+                    entries.pop(entry, None)
+                    if not entries:
+                        del self._in_flight[bind]
+
+    def refresh(self, *, min_age_seconds: float | None = None) -> int:
+        started_before = time.monotonic() - (
+            self._interval_seconds if min_age_seconds is None else min_age_seconds
+        )
+        with self._lock:
+            in_flight = {
+                bind: [entry for entry, started in entries.items() if started <= started_before]
+                for bind, entries in self._in_flight.items()
+            }
+        refreshed = 0
+        for bind, entries in in_flight.items():
+            if not entries:
+                continue
+            with Session(bind=bind) as heartbeat_db:
+                result = heartbeat_db.execute(
+                    update(IdempotencyRecord)
+                    .where(
+                        or_(
+                            *(
+                                and_(
+                                    IdempotencyRecord.operation == operation,
+                                    IdempotencyRecord.idempotency_key == idempotency_key,
+                                )
+                                for operation, idempotency_key in entries
+                            ),
+                        ),
+                        IdempotencyRecord.status == "in_progress",
+                    )
+                    .values(updated_at=_utc_now()),
+                )
+                heartbeat_db.commit()
+            refreshed += int(getattr(result, "rowcount", 0) or 0)
+        return refreshed
+
+    def stop(self) -> None:
+        with self._lock:
+            worker, self._worker = self._worker, None
+        if worker is not None:
+            worker.stop()
+
+
+@lru_cache(maxsize=1)
+def get_reservation_heartbeat() -> ReservationHeartbeat:
+    return ReservationHeartbeat(
+        interval_seconds=get_settings().idempotency_heartbeat_interval_seconds,
+    )
+
+
+def _complete_reservation(
+    db: Session,
+    *,
+    operation: str,
+    idempotency_key: str,
+    response: BaseModel,
+) -> None:
+    db.execute(
+        update(IdempotencyRecord)
+        .where(
+            IdempotencyRecord.operation == operation,
+            IdempotencyRecord.idempotency_key == idempotency_key,
+        )
+        .values(
+            status="completed",
+            response_payload=response.model_dump(mode="json"),
+            updated_at=_utc_now(),
+        ),
+    )
+    db.commit()
+
+
+def run_idempotent(
+    db: Session,
+    *,
+    operation: str,
+    idempotency_key: str,
+    request_payload: dict[str, Any],
+    response_model: type[ResponseT],
+    execute: Callable[[], ResponseT],
+) -> tuple[ResponseT, bool]:
+    """Run ``execute`` at most once per (operation, key) and replay its stored response.
+
+    The key is reserved with an insert before any work starts, so the unique constraint decides
+    which of two concurrent duplicates executes; the other waits for the stored response.
+    Returns the response and whether it was replayed. Failed executions release the key.
+    """
+    normalized_key = normalize_idempotency_key(idempotency_key)
+    payload_hash = request_hash(request_payload)
+
+    cache = get_idempotency_cache()
+    cache_key = (operation, normalized_key)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        cached_hash, cached_response = cached
+        if cached_hash != payload_hash:
+            raise_idempotency_payload_conflict()
+        if isinstance(cached_response, response_model):
+            return cached_response, True
+
+    replayed = _reserve_or_replay(
+        db,
+        operation=operation,
+        idempotency_key=normalized_key,
+        payload_hash=payload_hash,
+        response_model=response_model,
+    )
+    if replayed is not None:
+        return replayed, True
+
+    try:
+        with get_reservation_heartbeat().track(
+            db,
+            operation=operation,
+            idempotency_key=normalized_key,
+        ):
+            response = execute()
+    except BaseException:
+        _release_reservation(db, operation=operation, idempotency_key=normalized_key)
+        raise
+
+    _complete_reservation(
+        db,
+        operation=operation,
+        idempotency_key=normalized_key,
+        response=response,
+    )
+    cache.set(cache_key, (payload_hash, response))
+    return response, False
+
+
+def purge_expired_idempotency_records(
+    db: Session,
+    *,
+    now: datetime | None = None,
+    batch_size: int | None = None,
+) -> int:
+    """Delete idempotency records older than the retention window, one batch per commit."""
+    cutoff = _idempotency_cutoff(now)
+    resolved_batch_size = batch_size or get_settings().idempotency_purge_batch_size
+    purged = 0
+    while True:
+        expired_ids = list(
+            db.scalars(
+                select(IdempotencyRecord.id)
+                .where(IdempotencyRecord.created_at <= cutoff)
+                .limit(resolved_batch_size),
+            ),
+        )
+        if not expired_ids:
+            break
+        db.execute(delete(IdempotencyRecord).where(IdempotencyRecord.id.in_(expired_ids)))
+        db.commit()
+        purged += len(expired_ids)
+        if len(expired_ids) < resolved_batch_size:
+            break
+
+    if purged:
+        logger.info("idempotency.purged count=%s cutoff=%s", purged, cutoff.isoformat())
+    return purged
@@ -0,0 +1,315 @@
+import logging
+import threading
+import time
+import uuid
+from datetime import UTC, datetime, timedelta
+from functools import lru_cache
+from typing import Any, Protocol, cast
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.common.errors import ApiException
+from app.core.settings import get_settings
+from app.models.landing import LandingDraft
+from app.schemas.landing import (
+    LandingDraftCreate,
+    LandingDraftPatch,
+    LandingDraftRead,
+    LandingDraftStatus,
+    LandingDraftUpdate,
+    LandingFlowType,
+)
+
+logger = logging.getLogger("mt_facturation.landing")
+
+TERMINAL_DRAFT_STATUSES = {"submitted", "cancelled"}
+
+
+def _utc_now() -> datetime:
+    return datetime.now(UTC)
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value
+
+
+def _apply_merge_patch(target: Any, patch: Any) -> Any:
+    """Apply an RFC 7386 JSON merge patch: objects merge recursively, null deletes a key."""
+    if not isinstance(patch, dict):
+        return patch
+    merged = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            merged.pop(key, None)
+        else:
+            merged[key] = _apply_merge_patch(merged.get(key), value)
+    return merged
+
+
+class LandingDraftStore(Protocol):
+    name: str
+
+    def get(self, db: Session, draft_id: str) -> LandingDraftRead | None: ...
+
+    def save(self, db: Session, draft: LandingDraftRead) -> LandingDraftRead: ...
+
+    def purge_expired(self, db: Session, *, cutoff: datetime, batch_size: int) -> int: ...
+
+
+class SqlLandingDraftStore:
+    name = "sql"
+
+    @staticmethod
+    def _to_read(record: LandingDraft) -> LandingDraftRead:
+        return LandingDraftRead(
+            id=record.id,
+            flow_type=cast(LandingFlowType, record.flow_type),
+            step=record.step,
+            cin=record.cin,
+            payload=record.payload or {},
+            status=cast(LandingDraftStatus, record.status),
+            created_at=record.created_at,
+            updated_at=record.updated_at,
+        )
+
+    def get(self, db: Session, draft_id: str) -> LandingDraftRead | None:
+        record = db.get(LandingDraft, draft_id)
+        return self._to_read(record) if record is not None else None
+
+    def save(self, db: Session, draft: LandingDraftRead) -> LandingDraftRead:
+        record = db.get(LandingDraft, draft.id)
+        if record is None:
+            record = LandingDraft(
+                id=draft.id,
+                flow_type=draft.flow_type,
+                created_at=draft.created_at,
+            )
+        record.step = draft.step
+        record.cin = draft.cin
+        record.payload = draft.payload
+        record.status = draft.status
+        record.updated_at = draft.updated_at
+        db.add(record)
+        db.commit()
+        db.refresh(record)
+        return self._to_read(record)
+
+    def purge_expired(self, db: Session, *, cutoff: datetime, batch_size: int) -> int:
+        purged = 0
+        while True:
+            expired_ids = list(
+                db.scalars(
+                    select(LandingDraft.id)
+                    .where(LandingDraft.updated_at <= cutoff)
+                    .limit(batch_size),
+                ),
+            )
+            if not expired_ids:
+                break
+            db.execute(delete(LandingDraft).where(LandingDraft.id.in_(expired_ids)))
+            db.commit()
+            purged += len(expired_ids)
+            if len(expired_ids) < batch_size:
+                break
+        return purged
+
+
+class MemoryLandingDraftStore:
+    """Process-local draft store for single-node deployments; drafts are lost on restart."""
+
+    name = "memory"
+
+    def __init__(self) -> None:
+        self._drafts: dict[str, LandingDraftRead] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, draft_id: str) -> LandingDraftRead | None:
+        with self._lock:
+            return self._drafts.get(draft_id)
+
+    def save(self, db: Session, draft: LandingDraftRead) -> LandingDraftRead:
+        with self._lock:
+            self._drafts[draft.id] = draft
+        return draft
+
+    def purge_expired(self, db: Session, *, cutoff: datetime, batch_size: int) -> int:
+        with self._lock:
+            expired_ids = [
+                draft_id
+                for draft_id, draft in self._drafts.items()
+                if _as_utc(draft.updated_at) <= cutoff
+            ]
+            for draft_id in expired_ids:
+                del self._drafts[draft_id]
+        return len(expired_ids)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._drafts.clear()
+
+
+class LandingDraftCoalescer:
+    """Holds rapid successive draft saves in memory and writes each draft once per window."""
+
+    def __init__(self) -> None:
+        self._pending: dict[str, tuple[float, LandingDraftRead]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, draft_id: str) -> LandingDraftRead | None:
+        with self._lock:
+            entry = self._pending.get(draft_id)
+        return entry[1] if entry is not None else None
+
+    def hold(self, draft: LandingDraftRead, *, window_seconds: float) -> None:
+        with self._lock:
+            entry = self._pending.get(draft.id)
+            # The flush deadline is set by the first held write so a busy draft still
+            # reaches the store at least once per window.
+            due_at = entry[0] if entry is not None else time.monotonic() + window_seconds
+            self._pending[draft.id] = (due_at, draft)
+
+    def discard(self, draft_id: str) -> None:
+        with self._lock:
+            self._pending.pop(draft_id, None)
+
+    def take_due(self, *, force: bool = False) -> list[LandingDraftRead]:
+        now = time.monotonic()
+        with self._lock:
+            due_ids = [
+                draft_id
+                for draft_id, (due_at, _) in self._pending.items()
+                if force or due_at <= now
+            ]
+            return [self._pending.pop(draft_id)[1] for draft_id in due_ids]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pending.clear()
+
+
+@lru_cache(maxsize=1)
+def get_landing_draft_store() -> LandingDraftStore:
+    store_name = get_settings().landing_draft_store.strip().lower()
+    if store_name == "memory":
+        return MemoryLandingDraftStore()
+    return SqlLandingDraftStore()
+
+
+@lru_cache(maxsize=1)
+def get_landing_draft_coalescer() -> LandingDraftCoalescer:
+    return LandingDraftCoalescer()
+
+
+def _draft_cutoff(now: datetime | None = None) -> datetime:
+    return (now or _utc_now()) - timedelta(hours=get_settings().landing_draft_ttl_hours)
+
+
+def _load_draft(db: Session, draft_id: str) -> LandingDraftRead:
+    draft = get_landing_draft_coalescer().get(draft_id) or get_landing_draft_store().get(
+        db,
+        draft_id,
+    )
+    # Expired drafts behave as missing even before the purge job removes them.
+    if draft is None or _as_utc(draft.updated_at) <= _draft_cutoff():
+        raise ApiException(
+            status_code=404,
+            code="landing_draft_not_found",
+            message="Landing draft was not found",
+        )
+    return draft
+
+
+def _persist_draft(db: Session, draft: LandingDraftRead) -> LandingDraftRead:
+    coalescer = get_landing_draft_coalescer()
+    window_seconds = get_settings().landing_draft_coalesce_seconds
+    if window_seconds > 0 and draft.status not in TERMINAL_DRAFT_STATUSES:
+        coalescer.hold(draft, window_seconds=window_seconds)
+        return draft
+    coalescer.discard(draft.id)
+    return get_landing_draft_store().save(db, draft)
+
+
+def create_landing_draft(db: Session, payload: LandingDraftCreate) -> LandingDraftRead:
+    now = _utc_now()
+    draft = LandingDraftRead(
+        id=str(uuid.uuid4()),
+        flow_type=payload.flow_type,
+        step=payload.step,
+        cin=payload.cin,
+        payload=payload.payload,
+        status=payload.status,
+        created_at=now,
+        updated_at=now,
+    )
+    return get_landing_draft_store().save(db, draft)
+
+
+def get_landing_draft(db: Session, draft_id: str) -> LandingDraftRead:
+    return _load_draft(db, draft_id)
+
+
+def update_landing_draft(
+    db: Session,
+    draft_id: str,
+    payload: LandingDraftUpdate,
+) -> LandingDraftRead:
+    draft = _load_draft(db, draft_id)
+    patch = payload.model_dump(exclude_unset=True)
+    changes: dict[str, Any] = {"updated_at": _utc_now()}
+    if "step" in patch:
+        changes["step"] = payload.step or draft.step
+    if "cin" in patch:
+        changes["cin"] = payload.cin
+    if "payload" in patch:
+        changes["payload"] = payload.payload or {}
+    if "status" in patch:
+        changes["status"] = payload.status or draft.status
+    return _persist_draft(db, draft.model_copy(update=changes))
+
+
+def patch_landing_draft(
+    db: Session,
+    draft_id: str,
+    payload: LandingDraftPatch,
+) -> LandingDraftRead:
+    draft = _load_draft(db, draft_id)
+    patch = payload.model_dump(exclude_unset=True)
+    changes: dict[str, Any] = {"updated_at": _utc_now()}
+    if "step" in patch:
+        changes["step"] = payload.step or draft.step
+    if "cin" in patch:
+        changes["cin"] = payload.cin
+    if payload.payload is not None:
+        changes["payload"] = _apply_merge_patch(draft.payload, payload.payload)
+    if "status" in patch:
+        changes["status"] = payload.status or draft.status
+    return _persist_draft(db, draft.model_copy(update=changes))
+
+
+def flush_landing_drafts(db: Session, *, force: bool = False) -> int:
+    """Write coalesced drafts whose window elapsed (all of them when ``force``)."""
+    store = get_landing_draft_store()
+    drafts = get_landing_draft_coalescer().take_due(force=force)
+    for draft in drafts:
+        store.save(db, draft)
+    return len(drafts)
+
+
+def purge_expired_landing_drafts(
+    db: Session,
+    *,
+    now: datetime | None = None,
+    batch_size: int | None = None,
+) -> int:
+    cutoff = _draft_cutoff(now)
+    purged = get_landing_draft_store().purge_expired(
+        db,
+        cutoff=cutoff,
+        batch_size=batch_size or get_settings().landing_draft_purge_batch_size,
+    )
+    if purged:
+        logger.info("landing.drafts_purged count=%s cutoff=%s", purged, cutoff.isoformat())
+    return purged
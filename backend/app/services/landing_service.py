@@ -6,7 +6,7 @@ import logging
 import os
 import random
 import re
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
 from decimal import Decimal
 from io import BytesIO
 from pathlib import Path
@@ -23,17 +23,16 @@ from reportlab.platypus import (  # type: ignore[import-untyped]
     Table,
     TableStyle,
 )
-from sqlalchemy import select
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import Connection, Engine, select
 from sqlalchemy.orm import Session
 
 from app.common.errors import ApiException
 from app.core.settings import get_settings
 from app.models.billing import Invoice
 from app.models.catalog import Offer
-from app.models.contract import Contract, ContractAuditEvent, ContractDocument
+from app.models.contract import Contract, ContractDocument
 from app.models.customer import Client, Subscriber
-from app.models.landing import IdempotencyRecord, LandingDraft
+from app.models.numbering import ServiceIdentifierPoolEntry
 from app.schemas.catalog import OfferServiceCategory, OfferServiceType
 from app.schemas.contract import ContractProvisionRequest, ContractRead, ProvisionSubscriberInput
 from app.schemas.landing import (
@@ -44,10 +43,6 @@ from app.schemas.landing import (
     LandingContractDocumentLinkRequest,
     LandingContractDocumentLinkResponse,
     LandingCurrentSubscriptionRead,
-    LandingDraftCreate,
-    LandingDraftRead,
-    LandingDraftStatus,
-    LandingDraftUpdate,
     LandingFlowType,
     LandingInvoiceLookupResponse,
     LandingInvoiceSummary,
@@ -58,8 +53,10 @@ from app.schemas.landing import (
     LandingPlanChangeSubmitRequest,
     LandingSubmitResult,
 )
-from app.services.billing_service import get_invoice_for_download
+from app.services.audit_service import record_contract_audit_event
 from app.services.contract_service import provision_contract
+from app.services.numbering_service import allocate_identifier, claim_identifier
+from app.services.outbox_service import enqueue_event
 
 logger = logging.getLogger("mt_facturation.landing")
 FLOW_OPTIONS: list[LandingFlowType] = [
@@ -71,6 +68,8 @@ SERVICES: list[OfferServiceCategory] = ["mobile", "internet", "landline"]
 NINE_DIGITS_REGEX = re.compile(r"^\d{9}$")
 RANDOM_RETRY_LIMIT = 100
 TOKEN_VERSION = 1
+LANDING_INVOICE_PAGE_SIZE = 20
+LANDING_INVOICE_PAGE_SIZE_MAX = 100
 
 
 def _utc_now() -> datetime:
@@ -204,35 +203,43 @@ def _new_document_token(*, contract_id: str, cin: str) -> tuple[str, datetime]:
     return _sign_landing_token(payload), datetime.fromtimestamp(int(expires_at), tz=UTC)
 
 
-def _new_invoice_document_token(*, invoice_id: str, cin: str) -> tuple[str, datetime]:
+def _new_invoice_document_token(*, cin: str) -> tuple[str, datetime]:
+    # Scoped to the CIN rather than one invoice: a lookup page shares a single token and
+    # the download endpoint checks invoice ownership against it.
     settings = get_settings()
     expires_at = _utc_now().timestamp() + settings.landing_document_token_ttl_seconds
     payload = {
         "v": TOKEN_VERSION,
         "purpose": "landing_invoice_document",
-        "invoice_id": invoice_id,
         "cin": cin,
         "exp": int(expires_at),
     }
     return _sign_landing_token(payload), datetime.fromtimestamp(int(expires_at), tz=UTC)
 
 
-def _record_contract_audit_event(
-    db: Session,
-    *,
-    contract_id: str,
-    event_type: str,
-    actor_id: str | None,
-    details: dict[str, Any],
-) -> None:
-    db.add(
-        ContractAuditEvent(
-            contract_id=contract_id,
-            event_type=event_type,
-            actor_id=actor_id,
-            details=json.dumps(details, sort_keys=True),
-        ),
-    )
+def _encode_invoice_cursor(invoice: Invoice) -> str:
+    payload = {"issued_at": invoice.issued_at.isoformat(), "id": invoice.id}
+    return _urlsafe_b64encode(json.dumps(payload, sort_keys=True).encode("utf-8"))
+
+
+def _decode_invoice_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        payload = json.loads(_urlsafe_b64decode(cursor).decode("utf-8"))
+        issued_at = datetime.fromisoformat(payload["issued_at"])
+        invoice_id = payload["id"]
+    except (ValueError, KeyError, TypeError, UnicodeDecodeError) as exc:
+        raise ApiException(
+            status_code=422,
+            code="landing_invoice_cursor_invalid",
+            message="Invoice cursor is invalid",
+        ) from exc
+    if not isinstance(invoice_id, str):
+        raise ApiException(
+            status_code=422,
+            code="landing_invoice_cursor_invalid",
+            message="Invoice cursor is invalid",
+        )
+    return issued_at, invoice_id
 
 
 def _build_contract_pdf(
@@ -435,7 +442,21 @@ def _contract_documents_root() -> Path:
     return Path(os.getcwd()) / base_path
 
 
-def _issue_contract_document(
+def _contract_document_url(*, contract_id: str, cin: str) -> str:
+    token, _ = _new_document_token(contract_id=contract_id, cin=cin)
+    return f"/api/v1/landing/contracts/{contract_id}/document?token={token}"
+
+
+def _get_contract_document(db: Session, contract_id: str) -> ContractDocument | None:
+    return db.scalar(
+        select(ContractDocument).where(
+            ContractDocument.contract_id == contract_id,
+            ContractDocument.document_type == "contract_pdf",
+        ),
+    )
+
+
+def _write_contract_document(
     db: Session,
     *,
     contract: Contract,
@@ -443,8 +464,7 @@ def _issue_contract_document(
     offer: Offer,
     service_identifier: str,
     actor_id: str,
-) -> str:
-    client_cin = _require_client_cin(client)
+) -> ContractDocument:
     pdf_bytes = _build_contract_pdf(
         contract=contract,
         client=client,
@@ -459,12 +479,7 @@ def _issue_contract_document(
     file_path.write_bytes(pdf_bytes)
     digest = hashlib.sha256(pdf_bytes).hexdigest()
 
-    document = db.scalar(
-        select(ContractDocument).where(
-            ContractDocument.contract_id == contract.id,
-            ContractDocument.document_type == "contract_pdf",
-        ),
-    )
+    document = _get_contract_document(db, contract.id)
     if document is None:
         document = ContractDocument(
             contract_id=contract.id,
@@ -473,6 +488,7 @@ def _issue_contract_document(
             file_path=str(file_path),
             mime_type="application/pdf",
             sha256=digest,
+            status="ready",
             issued_by_actor=actor_id,
         )
     else:
@@ -480,11 +496,12 @@ def _issue_contract_document(
         document.file_path = str(file_path)
         document.mime_type = "application/pdf"
         document.sha256 = digest
+        document.status = "ready"
         document.issued_by_actor = actor_id
     db.add(document)
     db.flush()
 
-    _record_contract_audit_event(
+    record_contract_audit_event(
         db,
         contract_id=contract.id,
         event_type="contract_document_issued",
@@ -495,9 +512,95 @@ def _issue_contract_document(
             "sha256": digest,
         },
     )
+    return document
 
-    token, _ = _new_document_token(contract_id=contract.id, cin=client_cin)
-    return f"/api/v1/landing/contracts/{contract.id}/document?token={token}"
+
+def _issue_contract_document(
+    db: Session,
+    *,
+    contract: Contract,
+    client: Client,
+    offer: Offer,
+    service_identifier: str,
+    actor_id: str,
+) -> str:
+    client_cin = _require_client_cin(client)
+    _write_contract_document(
+        db,
+        contract=contract,
+        client=client,
+        offer=offer,
+        service_identifier=service_identifier,
+        actor_id=actor_id,
+    )
+    return _contract_document_url(contract_id=contract.id, cin=client_cin)
+
+
+def _queue_contract_document(
+    db: Session,
+    *,
+    contract: Contract,
+    client: Client,
+    actor_id: str,
+) -> str:
+    # Reserves the document row so the download link is valid immediately; the PDF
+    # itself is rendered by render_pending_contract_document after the response.
+    client_cin = _require_client_cin(client)
+    file_name = f"contract-{contract.id}.pdf"
+    document = _get_contract_document(db, contract.id)
+    if document is None:
+        document = ContractDocument(
+            contract_id=contract.id,
+            document_type="contract_pdf",
+            file_name=file_name,
+            file_path=str(_contract_documents_root() / file_name),
+            mime_type="application/pdf",
+            sha256="",
+            issued_by_actor=actor_id,
+        )
+    document.status = "pending"
+    db.add(document)
+    db.flush()
+    return _contract_document_url(contract_id=contract.id, cin=client_cin)
+
+
+def render_pending_contract_document(bind: Engine | Connection, *, contract_id: str) -> None:
+    with Session(bind=bind, autoflush=False, expire_on_commit=False) as db:
+        document = _get_contract_document(db, contract_id)
+        if document is None or document.status == "ready":
+            return
+        try:
+            contract, client, offer, service_identifier = _get_contract_bundle(
+                db,
+                contract_id=contract_id,
+            )
+            _write_contract_document(
+                db,
+                contract=contract,
+                client=client,
+                offer=offer,
+                service_identifier=service_identifier,
+                actor_id=document.issued_by_actor or "landing-flow",
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception("landing.contract_document_render_failed contract_id=%s", contract_id)
+            failed = _get_contract_document(db, contract_id)
+            if failed is not None and failed.status == "pending":
+                failed.status = "failed"
+                db.add(failed)
+                db.commit()
+
+
+def _contract_document_render_overdue(document: ContractDocument) -> bool:
+    if document.status == "failed":
+        return True
+    updated_at = document.updated_at
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=UTC)
+    timeout = get_settings().contract_document_render_timeout_seconds
+    return _utc_now() - updated_at > timedelta(seconds=timeout)
 
 
 def _offer_summary(offer: Offer) -> LandingOfferSummary:
@@ -541,158 +644,6 @@ def list_landing_bootstrap_data(db: Session) -> LandingBootstrapResponse:
     )
 
 
-def _draft_to_read(record: LandingDraft) -> LandingDraftRead:
-    payload_data: dict[str, Any]
-    try:
-        payload_data = json.loads(record.payload)
-    except json.JSONDecodeError:
-        payload_data = {}
-    return LandingDraftRead(
-        id=record.id,
-        flow_type=cast(LandingFlowType, record.flow_type),
-        step=record.step,
-        cin=record.cin,
-        payload=payload_data,
-        status=cast(LandingDraftStatus, record.status),
-        created_at=record.created_at,
-        updated_at=record.updated_at,
-    )
-
-
-def create_landing_draft(db: Session, payload: LandingDraftCreate) -> LandingDraftRead:
-    record = LandingDraft(
-        flow_type=payload.flow_type,
-        step=payload.step,
-        cin=payload.cin,
-        payload=json.dumps(payload.payload, sort_keys=True),
-        status=payload.status,
-    )
-    db.add(record)
-    db.commit()
-    db.refresh(record)
-    return _draft_to_read(record)
-
-
-def get_landing_draft(db: Session, draft_id: str) -> LandingDraftRead:
-    record = db.get(LandingDraft, draft_id)
-    if record is None:
-        raise ApiException(
-            status_code=404,
-            code="landing_draft_not_found",
-            message="Landing draft was not found",
-        )
-    return _draft_to_read(record)
-
-
-def update_landing_draft(
-    db: Session,
-    draft_id: str,
-    payload: LandingDraftUpdate,
-) -> LandingDraftRead:
-    record = db.get(LandingDraft, draft_id)
-    if record is None:
-        raise ApiException(
-            status_code=404,
-            code="landing_draft_not_found",
-            message="Landing draft was not found",
-        )
-
-    patch = payload.model_dump(exclude_unset=True)
-    if "step" in patch:
-        record.step = payload.step or record.step
-    if "cin" in patch:
-        record.cin = payload.cin
-    if "payload" in patch:
-        record.payload = json.dumps(payload.payload or {}, sort_keys=True)
-    if "status" in patch:
-        record.status = payload.status or record.status
-
-    db.add(record)
-    db.commit()
-    db.refresh(record)
-    return _draft_to_read(record)
-
-
-def _request_hash(payload: dict[str, Any]) -> str:
-    serialized = json.dumps(payload, sort_keys=True, default=str)
-    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
-
-
-def get_idempotent_response(
-    db: Session,
-    *,
-    operation: str,
-    idempotency_key: str,
-    request_payload: dict[str, Any],
-) -> tuple[LandingSubmitResult | None, str]:
-    if len(idempotency_key.strip()) < 8:
-        raise ApiException(
-            status_code=400,
-            code="idempotency_key_invalid",
-            message="Idempotency-Key header must contain at least 8 characters",
-        )
-
-    payload_hash = _request_hash(request_payload)
-    record = db.scalar(
-        select(IdempotencyRecord).where(
-            IdempotencyRecord.operation == operation,
-            IdempotencyRecord.idempotency_key == idempotency_key,
-        ),
-    )
-    if record is None:
-        return None, payload_hash
-    if record.request_hash != payload_hash:
-        raise ApiException(
-            status_code=409,
-            code="idempotency_key_payload_conflict",
-            message="Idempotency-Key was already used with a different payload",
-        )
-
-    try:
-        payload = json.loads(record.response_payload)
-    except json.JSONDecodeError as exc:
-        raise ApiException(
-            status_code=500,
-            code="idempotency_record_invalid",
-            message="Stored idempotency response payload is invalid",
-            details={"reason": str(exc)},
-        ) from exc
-    return LandingSubmitResult.model_validate(payload), payload_hash
-
-
-def save_idempotent_response(
-    db: Session,
-    *,
-    operation: str,
-    idempotency_key: str,
-    request_hash: str,
-    response: LandingSubmitResult,
-) -> None:
-    record = IdempotencyRecord(
-        operation=operation,
-        idempotency_key=idempotency_key,
-        request_hash=request_hash,
-        response_payload=json.dumps(response.model_dump(mode="json"), sort_keys=True),
-    )
-    db.add(record)
-    try:
-        db.commit()
-    except IntegrityError:
-        db.rollback()
-        existing = db.scalar(
-            select(IdempotencyRecord).where(
-                IdempotencyRecord.operation == operation,
-                IdempotencyRecord.idempotency_key == idempotency_key,
-            ),
-        )
-        if existing is None or existing.request_hash != request_hash:
-            raise ApiException(
-                status_code=409,
-                code="idempotency_key_payload_conflict",
-                message="Idempotency-Key was already used with a different payload",
-            )
-
-
 def _get_client_by_cin(db: Session, cin: str) -> Client | None:
     return db.scalar(select(Client).where(Client.cin == cin))
 
@@ -774,13 +725,10 @@ def issue_contract_document_link(
         )
 
     verified_reference = _mask_cin(client_cin)
-    document = db.scalar(
-        select(ContractDocument).where(
-            ContractDocument.contract_id == contract.id,
-            ContractDocument.document_type == "contract_pdf",
-        ),
-    )
-    if document is None or not Path(document.file_path).exists():
+    document = _get_contract_document(db, contract.id)
+    if document is None or (
+        document.status != "pending" and not Path(document.file_path).exists()
+    ):
         url = _issue_contract_document(
             db,
             contract=contract,
@@ -791,8 +739,7 @@ def issue_contract_document_link(
         )
         db.commit()
     else:
-        token, _ = _new_document_token(contract_id=contract.id, cin=client_cin)
-        url = f"/api/v1/landing/contracts/{contract.id}/document?token={token}"
+        url = _contract_document_url(contract_id=contract.id, cin=client_cin)
 
     logger.info(
         "landing.contract_document_link cin=%s contract_id=%s verified=%s",
@@ -846,18 +793,33 @@ def resolve_contract_document_for_download(
             message="Document token does not match contract ownership",
         )
 
-    document = db.scalar(
-        select(ContractDocument).where(
-            ContractDocument.contract_id == contract.id,
-            ContractDocument.document_type == "contract_pdf",
-        ),
-    )
+    document = _get_contract_document(db, contract.id)
     if document is None:
         raise ApiException(
             status_code=404,
             code="contract_document_not_found",
             message="Contract PDF is not available",
         )
+    if document.status != "ready":
+        if not _contract_document_render_overdue(document):
+            return document
+        # The background render died or failed; render inline rather than leave the
+        # customer polling forever.
+        _, client, offer, service_identifier = _get_contract_bundle(db, contract_id=contract.id)
+        document = _write_contract_document(
+            db,
+            contract=contract,
+            client=client,
+            offer=offer,
+            service_identifier=service_identifier,
+            actor_id=document.issued_by_actor or "landing-flow",
+        )
+        db.commit()
+    return document
+
+
+def ensure_contract_document_file(document: ContractDocument) -> ContractDocument:
+    # Kept apart from the lookup so a conditional request answers 304 without touching disk.
     if not Path(document.file_path).exists():
         raise ApiException(
             status_code=404,
@@ -876,7 +838,8 @@ def resolve_invoice_document_for_download(
     token_payload = _verify_landing_token(access_token, purpose="landing_invoice_document")
     token_invoice_id = token_payload.get("invoice_id")
     token_cin = token_payload.get("cin")
-    if not isinstance(token_invoice_id, str) or token_invoice_id != invoice_id:
+    # Tokens issued before CIN-scoped links carry an invoice_id and stay bound to it.
+    if token_invoice_id is not None and token_invoice_id != invoice_id:
         raise ApiException(
             status_code=403,
             code="landing_invoice_token_mismatch",
@@ -898,8 +861,8 @@ def resolve_invoice_document_for_download(
             code="landing_invoice_token_mismatch",
             message="Invoice token does not match invoice ownership",
         )
-
-    return get_invoice_for_download(db, invoice_id)
+    # The caller answers conditional requests from pdf_sha256 before touching the file.
+    return invoice
 
 
 def _normalize_to_moroccan_nsn(raw_value: str, *, kind: str) -> str:
@@ -966,13 +929,25 @@ def _generate_moroccan_nsn(*, kind: str) -> str:
 
 
 def _generate_unique_identifier(db: Session, *, kind: str) -> str:
+    pooled = allocate_identifier(db, kind=kind)
+    if pooled is not None:
+        return pooled
+
+    # Random probing only remains as a fallback for deployments without an imported pool.
     for _ in range(RANDOM_RETRY_LIMIT):
         nsn = _generate_moroccan_nsn(kind=kind)
         candidate = f"+212{nsn}"
+        # Terminated holders and pooled numbers count as taken: a random pick must never skip
+        # a release quarantine.
         existing = db.scalar(
             select(Subscriber.id).where(Subscriber.service_identifier == candidate).limit(1),
         )
-        if existing is None:
+        pooled_entry = db.scalar(
+            select(ServiceIdentifierPoolEntry.id)
+            .where(ServiceIdentifierPoolEntry.identifier == candidate)
+            .limit(1),
+        )
+        if existing is None and pooled_entry is None:
             return candidate
     raise ApiException(
         status_code=500,
@@ -983,7 +958,9 @@ def _generate_unique_identifier(db: Session, *, kind: str) -> str:
 
 def _ensure_identifier_available(db: Session, identifier: str) -> None:
     existing = db.scalar(
-        select(Subscriber.id).where(Subscriber.service_identifier == identifier).limit(1),
+        select(Subscriber.id)
+        .where(Subscriber.service_identifier == identifier, Subscriber.status != "terminated")
+        .limit(1),
     )
     if existing is not None:
         raise ApiException(
@@ -1009,12 +986,14 @@ def _resolve_service_identifier(
         if payload.requested_mobile_local_number:
             identifier = _build_mobile_identifier(payload.requested_mobile_local_number)
             _ensure_identifier_available(db, identifier)
+            claim_identifier(db, identifier=identifier)
             return identifier
         return _generate_unique_identifier(db, kind="mobile")
 
     if payload.home_landline_local_number:
         identifier = _build_landline_identifier(payload.home_landline_local_number)
         _ensure_identifier_available(db, identifier)
+        claim_identifier(db, identifier=identifier)
         return identifier
     return _generate_unique_identifier(db, kind="landline")
 
@@ -1097,7 +1076,7 @@ def submit_new_subscription(
     elif payload.home_landline_local_number:
         allocation_mode = "provided_home_landline"
 
-    _record_contract_audit_event(
+    record_contract_audit_event(
         db,
         contract_id=contract.id,
         event_type="landing_service_identifier_allocated",
@@ -1108,14 +1087,26 @@ def submit_new_subscription(
             "service_identifier_masked": _mask_phone(service_identifier),
         },
     )
-    download_url = _issue_contract_document(
+    download_url = _queue_contract_document(
         db,
         contract=contract,
         client=client,
-        offer=offer,
-        service_identifier=service_identifier,
         actor_id="landing-flow",
     )
+    enqueue_event(
+        db,
+        event_type="landing.submit_new",
+        aggregate_type="contract",
+        aggregate_id=contract.id,
+        payload={
+            "contract_id": contract.id,
+            "client_id": client.id,
+            "service_category": payload.service_category,
+            "provisioning_mode": provisioning_mode,
+            "created_client": created_client,
+            "created_subscriber": created_subscriber,
+        },
+    )
     db.commit()
     logger.info(
         "landing.submit_new cin=%s contract_id=%s mode=%s",
@@ -1136,27 +1127,30 @@ def submit_new_subscription(
     )
 
 
-def _service_category_eligible_offers(
+def _eligible_offers_by_category(
     db: Session,
     *,
-    service_category: str,
-    exclude_offer_id: str,
-) -> list[LandingOfferSummary]:
+    service_categories: set[str],
+) -> dict[str, list[Offer]]:
+    # One catalog read for every category the client holds; per-contract exclusion of
+    # the current offer happens in memory.
+    if not service_categories:
+        return {}
     today = _utc_now().date()
-    offers = list(
-        db.scalars(
-            select(Offer)
-            .where(
-                Offer.service_category == service_category,
-                Offer.status == "active",
-                Offer.id != exclude_offer_id,
-                Offer.valid_from <= today,
-                (Offer.valid_to.is_(None) | (Offer.valid_to >= today)),
-            )
-            .order_by(Offer.monthly_fee.asc(), Offer.name.asc()),
-        ).all(),
-    )
-    return [_offer_summary(offer) for offer in offers]
+    offers = db.scalars(
+        select(Offer)
+        .where(
+            Offer.service_category.in_(sorted(service_categories)),
+            Offer.status == "active",
+            Offer.valid_from <= today,
+            (Offer.valid_to.is_(None) | (Offer.valid_to >= today)),
+        )
+        .order_by(Offer.monthly_fee.asc(), Offer.name.asc()),
+    ).all()
+    grouped: dict[str, list[Offer]] = {category: [] for category in service_categories}
+    for offer in offers:
+        grouped[offer.service_category].append(offer)
+    return grouped
 
 
 def lookup_client_subscriptions(
@@ -1174,20 +1168,26 @@ def lookup_client_subscriptions(
             message="No client found for the provided CIN",
         )
 
-    contracts = list(
-        db.scalars(
-            select(Contract)
-            .where(Contract.client_id == client.id, Contract.status == "active")
-            .order_by(Contract.created_at.desc()),
-        ).all(),
+    rows = db.execute(
+        select(Contract, Subscriber, Offer)
+        .join(Subscriber, Subscriber.id == Contract.subscriber_id)
+        .join(Offer, Offer.id == Contract.offer_id)
+        .where(Contract.client_id == client.id, Contract.status == "active")
+        .order_by(Contract.created_at.desc()),
+    ).all()
+    eligible_offers = _eligible_offers_by_category(
+        db,
+        service_categories={offer.service_category for _, _, offer in rows},
     )
+    offer_summaries: dict[str, LandingOfferSummary] = {}
+
+    def summary(offer: Offer) -> LandingOfferSummary:
+        if offer.id not in offer_summaries:
+            offer_summaries[offer.id] = _offer_summary(offer)
+        return offer_summaries[offer.id]
 
     subscriptions: list[LandingCurrentSubscriptionRead] = []
-    for contract in contracts:
-        offer = db.get(Offer, contract.offer_id)
-        subscriber = db.get(Subscriber, contract.subscriber_id)
-        if offer is None or subscriber is None:
-            continue
+    for contract, subscriber, offer in rows:
         subscriptions.append(
             LandingCurrentSubscriptionRead(
                 contract_id=contract.id,
@@ -1195,12 +1195,12 @@ def lookup_client_subscriptions(
                 service_identifier=subscriber.service_identifier,
                 service_category=cast(OfferServiceCategory, offer.service_category),
                 service_type=cast(OfferServiceType, offer.service_type),
-                current_offer=_offer_summary(offer),
-                eligible_offers=_service_category_eligible_offers(
-                    db,
-                    service_category=offer.service_category,
-                    exclude_offer_id=offer.id,
-                ),
+                current_offer=summary(offer),
+                eligible_offers=[
+                    summary(candidate)
+                    for candidate in eligible_offers.get(offer.service_category, [])
+                    if candidate.id != offer.id
+                ],
             ),
         )
 
@@ -1222,6 +1222,8 @@ def lookup_client_invoices(
     *,
     cin: str,
     lookup_token: str,
+    limit: int = LANDING_INVOICE_PAGE_SIZE,
+    cursor: str | None = None,
 ) -> LandingInvoiceLookupResponse:
     _assert_lookup_access(cin, lookup_token)
     client = _get_client_by_cin(db, cin)
@@ -1232,18 +1234,26 @@ def lookup_client_invoices(
             message="No client found for the provided CIN",
         )
 
+    query = select(Invoice).where(Invoice.client_id == client.id)
+    if cursor:
+        cursor_issued_at, cursor_invoice_id = _decode_invoice_cursor(cursor)
+        query = query.where(
+            (Invoice.issued_at < cursor_issued_at)
+            | ((Invoice.issued_at == cursor_issued_at) & (Invoice.id < cursor_invoice_id)),
+        )
     invoices = list(
         db.scalars(
-            select(Invoice)
-            .where(Invoice.client_id == client.id)
-            .order_by(Invoice.issued_at.desc()),
+            query.order_by(Invoice.issued_at.desc(), Invoice.id.desc()).limit(limit + 1),
         ).all(),
     )
+    next_cursor = _encode_invoice_cursor(invoices[limit - 1]) if len(invoices) > limit else None
+    invoices = invoices[:limit]
 
     invoice_payloads: list[LandingInvoiceSummary] = []
-    client_cin = _require_client_cin(client)
+    token = ""
+    if invoices:
+        token, _ = _new_invoice_document_token(cin=_require_client_cin(client))
     for invoice in invoices:
-        token, _ = _new_invoice_document_token(invoice_id=invoice.id, cin=client_cin)
         invoice_payloads.append(
             LandingInvoiceSummary(
                 invoice_id=invoice.id,
@@ -1272,6 +1282,7 @@ def lookup_client_invoices(
             phone=_mask_phone(client.phone) if client.phone else None,
         ),
         invoices=invoice_payloads,
+        next_cursor=next_cursor,
     )
 
 
@@ -1327,14 +1338,24 @@ def submit_plan_change(
 
     subscriber = db.get(Subscriber, source_contract.subscriber_id)
     service_identifier = subscriber.service_identifier if subscriber else ""
-    download_url = _issue_contract_document(
+    download_url = _queue_contract_document(
         db,
         contract=contract,
         client=client,
-        offer=target_offer,
-        service_identifier=service_identifier,
         actor_id="landing-flow",
     )
+    enqueue_event(
+        db,
+        event_type="landing.submit_plan_change",
+        aggregate_type="contract",
+        aggregate_id=contract.id,
+        payload={
+            "contract_id": contract.id,
+            "client_id": client.id,
+            "source_contract_id": source_contract.id,
+            "target_offer_id": target_offer.id,
+        },
+    )
     db.commit()
     logger.info(
         "landing.submit_plan_change cin=%s contract_id=%s",
@@ -0,0 +1,277 @@
+import logging
+from collections.abc import Collection
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.common.errors import ApiException
+from app.core.settings import get_settings
+from app.models.customer import Subscriber
+from app.models.numbering import ServiceIdentifierPoolEntry
+from app.schemas.numbering import (
+    IdentifierKind,
+    IdentifierPoolStats,
+    IdentifierRangeImport,
+    IdentifierRangeImportResult,
+)
+
+logger = logging.getLogger("mt_facturation.numbering")
+
+IDENTIFIER_IMPORT_BATCH_SIZE = 5000
+IDENTIFIER_KINDS: tuple[IdentifierKind, ...] = ("mobile", "landline")
+
+
+def _utc_now() -> datetime:
+    return datetime.now(UTC)
+
+
+def _identifier_from_nsn(nsn: int) -> str:
+    return f"+212{nsn:09d}"
+
+
+def _quarantine_cutoff() -> datetime:
+    return _utc_now() - timedelta(days=get_settings().identifier_release_quarantine_days)
+
+
+def import_identifier_range(
+    db: Session,
+    *,
+    payload: IdentifierRangeImport,
+) -> IdentifierRangeImportResult:
+    start = int(payload.range_start)
+    end = int(payload.range_end)
+    inserted = 0
+    skipped_existing = 0
+    already_assigned = 0
+
+    for batch_start in range(start, end + 1, IDENTIFIER_IMPORT_BATCH_SIZE):
+        batch_end = min(batch_start + IDENTIFIER_IMPORT_BATCH_SIZE - 1, end)
+        candidates = [_identifier_from_nsn(nsn) for nsn in range(batch_start, batch_end + 1)]
+        pooled = set(
+            db.scalars(
+                select(ServiceIdentifierPoolEntry.identifier).where(
+                    ServiceIdentifierPoolEntry.identifier.in_(candidates),
+                ),
+            ),
+        )
+        assigned = set(
+            db.scalars(
+                select(Subscriber.service_identifier).where(
+                    Subscriber.service_identifier.in_(candidates),
+                    Subscriber.status != "terminated",
+                ),
+            ),
+        )
+        now = _utc_now()
+        rows: list[dict[str, object]] = []
+        for identifier in candidates:
+            if identifier in pooled:
+                skipped_existing += 1
+                continue
+            # Numbers already held by a subscriber enter the pool as allocated so they are
+            # released through the normal termination path instead of being handed out twice.
+            is_assigned = identifier in assigned
+            if is_assigned:
+                already_assigned += 1
+            rows.append(
+                {
+                    "kind": payload.kind,
+                    "identifier": identifier,
+                    "status": "allocated" if is_assigned else "available",
+                    "allocated_at": now if is_assigned else None,
+                },
+            )
+        if rows:
+            db.execute(insert(ServiceIdentifierPoolEntry), rows)
+            inserted += len(rows)
+
+    db.commit()
+    logger.info(
+        "numbering.range_imported kind=%s start=%s end=%s inserted=%s skipped=%s assigned=%s",
+        payload.kind,
+        payload.range_start,
+        payload.range_end,
+        inserted,
+        skipped_existing,
+        already_assigned,
+    )
+    return IdentifierRangeImportResult(
+        kind=payload.kind,
+        requested=end - start + 1,
+        inserted=inserted,
+        skipped_existing=skipped_existing,
+        already_assigned=already_assigned,
+    )
+
+
+def _next_pool_entry(
+    db: Session,
+    *,
+    kind: str,
+    status: str,
+    released_before: datetime | None = None,
+) -> ServiceIdentifierPoolEntry | None:
+    # Available and released entries are never held by a live subscriber: imports and explicit
+    # claims mark held numbers allocated, and releases terminate the holder. One index probe.
+    statement = select(ServiceIdentifierPoolEntry).where(
+        ServiceIdentifierPoolEntry.kind == kind,
+        ServiceIdentifierPoolEntry.status == status,
+    )
+    if released_before is not None:
+        statement = statement.where(
+            ServiceIdentifierPoolEntry.released_at <= released_before,
+        ).order_by(ServiceIdentifierPoolEntry.released_at.asc())
+    else:
+        statement = statement.order_by(ServiceIdentifierPoolEntry.identifier.asc())
+    # SKIP LOCKED lets concurrent submissions take different rows instead of queueing on the
+    # same head-of-pool number; SQLite ignores the clause and serializes writers anyway.
+    return db.scalar(statement.limit(1).with_for_update(skip_locked=True))
+
+
+def allocate_identifier(db: Session, *, kind: str) -> str | None:
+    """Take the next free identifier of ``kind`` from the pool, or None when it is empty."""
+    entry = _next_pool_entry(db, kind=kind, status="available")
+    if entry is None:
+        entry = _next_pool_entry(
+            db,
+            kind=kind,
+            status="released",
+            released_before=_quarantine_cutoff(),
+        )
+    if entry is None:
+        return None
+
+    entry.status = "allocated"
+    entry.allocated_at = _utc_now()
+    entry.released_at = None
+    db.add(entry)
+    db.flush()
+    return entry.identifier
+
+
+def quarantined_identifiers(db: Session, *, identifiers: Collection[str]) -> set[str]:
+    """Return the pool numbers among ``identifiers`` that were released too recently to reuse."""
+    if not identifiers:
+        return set()
+    return set(
+        db.scalars(
+            select(ServiceIdentifierPoolEntry.identifier).where(
+                ServiceIdentifierPoolEntry.identifier.in_(identifiers),
+                ServiceIdentifierPoolEntry.status == "released",
+                ServiceIdentifierPoolEntry.released_at > _quarantine_cutoff(),
+            ),
+        ),
+    )
+
+
+def claim_identifiers(
+    db: Session,
+    *,
+    identifiers: Collection[str],
+    quarantined: Collection[str] | None = None,
+) -> None:
+    """Mark explicitly requested identifiers as allocated when they belong to a pool.
+
+    Every path that creates a subscriber with a chosen number calls this, otherwise the number
+    would stay available and the next automatic allocation would hand it out twice. Callers
+    that already looked up ``quarantined_identifiers`` for a batch pass them in.
+    """
+    if not identifiers:
+        return
+    if quarantined is None:
+        quarantined = quarantined_identifiers(db, identifiers=identifiers)
+    blocked = sorted(set(identifiers) & set(quarantined))
+    if blocked:
+        raise ApiException(
+            status_code=409,
+            code="service_identifier_quarantined",
+            message="Service identifier was released recently and is still in quarantine",
+            details={"identifiers": blocked},
+        )
+    db.execute(
+        update(ServiceIdentifierPoolEntry)
+        .where(
+            ServiceIdentifierPoolEntry.identifier.in_(identifiers),
+            ServiceIdentifierPoolEntry.status != "allocated",
+        )
+        .values(status="allocated", allocated_at=_utc_now(), released_at=None),
+    )
+
+
+def claim_identifier(
+    db: Session,
+    *,
+    identifier: str,
+    quarantined: Collection[str] | None = None,
+) -> None:
+    claim_identifiers(db, identifiers=[identifier], quarantined=quarantined)
+
+
+def release_identifiers(db: Session, *, identifiers: Collection[str]) -> int:
+    """Return allocated pool numbers to quarantine and terminate the subscribers holding them.
+
+    The terminated subscriber keeps its number for invoices and history: identifiers are only
+    unique among live subscribers, so the number can be allocated again after the quarantine.
+    """
+    if not identifiers:
+        return 0
+    released = list(
+        db.scalars(
+            select(ServiceIdentifierPoolEntry.identifier).where(
+                ServiceIdentifierPoolEntry.identifier.in_(identifiers),
+                ServiceIdentifierPoolEntry.status == "allocated",
+            ),
+        ),
+    )
+    if not released:
+        return 0
+    db.execute(
+        update(ServiceIdentifierPoolEntry)
+        .where(ServiceIdentifierPoolEntry.identifier.in_(released))
+        .values(status="released", released_at=_utc_now()),
+    )
+    db.execute(
+        update(Subscriber)
+        .where(
+            Subscriber.service_identifier.in_(released),
+            Subscriber.status != "terminated",
+        )
+        .values(status="terminated")
+        .execution_options(synchronize_session="fetch"),
+    )
+    return len(released)
+
+
+def release_identifier(db: Session, *, identifier: str) -> bool:
+    released = release_identifiers(db, identifiers=[identifier]) > 0
+    if released:
+        logger.info("numbering.identifier_released identifier=%s", identifier)
+    return released
+
+
+def get_pool_stats(db: Session) -> list[IdentifierPoolStats]:
+    counts: dict[str, dict[str, int]] = {
+        kind: {"available": 0, "allocated": 0, "released": 0} for kind in IDENTIFIER_KINDS
+    }
+    rows = db.execute(
+        select(
+            ServiceIdentifierPoolEntry.kind,
+            ServiceIdentifierPoolEntry.status,
+            func.count(ServiceIdentifierPoolEntry.id),
+        ).group_by(ServiceIdentifierPoolEntry.kind, ServiceIdentifierPoolEntry.status),
+    ).all()
+    for kind, status, count in rows:
+        if kind in counts and status in counts[kind]:
+            counts[kind][status] = int(count)
+
+    return [
+        IdentifierPoolStats(
+            kind=kind,
+            available=counts[kind]["available"],
+            allocated=counts[kind]["allocated"],
+            released=counts[kind]["released"],
+            total=sum(counts[kind].values()),
+        )
+        for kind in IDENTIFIER_KINDS
+    ]
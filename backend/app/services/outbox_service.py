@@ -0,0 +1,265 @@
+import json
+import logging
+import urllib.request
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any, Protocol
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.settings import get_settings
+from app.models.outbox import OutboxEvent
+from app.schemas.outbox import OutboxDispatchResult
+
+logger = logging.getLogger("mt_facturation.outbox")
+
+
+class OutboxSink(Protocol):
+    name: str
+
+    def deliver(self, messages: list[dict[str, Any]]) -> None: ...
+
+
+class LogOutboxSink:
+    name = "log"
+
+    def deliver(self, messages: list[dict[str, Any]]) -> None:
+        for message in messages:
+            logger.info(
+                "outbox.delivered event_type=%s aggregate_id=%s event_id=%s",
+                message["event_type"],
+                message["aggregate_id"],
+                message["id"],
+            )
+
+
+class FileOutboxSink:
+    name = "file"
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+
+    def deliver(self, messages: list[dict[str, Any]]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as handle:
+            for message in messages:
+                handle.write(json.dumps(message, sort_keys=True) + "\n")
+
+
+class HttpOutboxSink:
+    name = "http"
+
+    def __init__(self, url: str, *, timeout_seconds: float) -> None:
+        self.url = url
+        self.timeout_seconds = timeout_seconds
+
+    def deliver(self, messages: list[dict[str, Any]]) -> None:
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps({"events": messages}, sort_keys=True).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout_seconds) as response:
+            if response.status >= 300:
+                raise RuntimeError(f"Outbox HTTP sink returned status {response.status}")
+
+
+def build_outbox_sink() -> OutboxSink:
+    settings = get_settings()
+    sink_name = settings.outbox_sink.strip().lower()
+    if sink_name == "file":
+        return FileOutboxSink(settings.outbox_file_path)
+    if sink_name == "http":
+        if not settings.outbox_http_url:
+            raise ValueError("outbox_http_url is required when outbox_sink=http")
+        return HttpOutboxSink(
+            settings.outbox_http_url,
+            timeout_seconds=settings.outbox_http_timeout_seconds,
+        )
+    return LogOutboxSink()
+
+
+def _now_utc() -> datetime:
+    return datetime.now(UTC)
+
+
+def _outbox_row(
+    *,
+    event_type: str,
+    aggregate_type: str,
+    aggregate_id: str,
+    payload: dict[str, Any],
+) -> dict[str, Any]:
+    return {
+        "event_type": event_type,
+        "aggregate_type": aggregate_type,
+        "aggregate_id": aggregate_id,
+        "payload": json.dumps(payload, sort_keys=True, default=str),
+        "status": "pending",
+        "attempts": 0,
+    }
+
+
+def enqueue_event(
+    db: Session,
+    *,
+    event_type: str,
+    aggregate_type: str,
+    aggregate_id: str,
+    payload: dict[str, Any],
+) -> None:
+    # Written in the caller's transaction: the event becomes visible only if the
+    # domain change it describes commits.
+    enqueue_events(
+        db,
+        [
+            {
+                "event_type": event_type,
+                "aggregate_type": aggregate_type,
+                "aggregate_id": aggregate_id,
+                "payload": payload,
+            },
+        ],
+    )
+
+
+def enqueue_events(db: Session, events: list[dict[str, Any]]) -> int:
+    if not events:
+        return 0
+    db.execute(insert(OutboxEvent), [_outbox_row(**event) for event in events])
+    return len(events)
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    settings = get_settings()
+    delay_seconds = settings.outbox_retry_base_seconds * (2 ** max(attempts - 1, 0))
+    return timedelta(seconds=min(delay_seconds, settings.outbox_retry_max_seconds))
+
+
+def _outbox_message(event: OutboxEvent) -> dict[str, Any]:
+    return {
+        "id": event.id,
+        "event_type": event.event_type,
+        "aggregate_type": event.aggregate_type,
+        "aggregate_id": event.aggregate_id,
+        "payload": json.loads(event.payload),
+        "created_at": event.created_at.isoformat() if event.created_at else None,
+    }
+
+
+def dispatch_outbox_batch(
+    db: Session,
+    *,
+    sink: OutboxSink | None = None,
+    batch_size: int | None = None,
+    now: datetime | None = None,
+) -> OutboxDispatchResult:
+    settings = get_settings()
+    resolved_sink = sink or build_outbox_sink()
+    resolved_now = now or _now_utc()
+    limit = batch_size or settings.outbox_batch_size
+
+    # SKIP LOCKED lets several dispatchers drain the table without handing the
+    # same row to two of them; the claim is held until this batch commits.
+    events = list(
+        db.scalars(
+            select(OutboxEvent)
+            .where(OutboxEvent.status == "pending", OutboxEvent.available_at <= resolved_now)
+            .order_by(OutboxEvent.created_at.asc(), OutboxEvent.id.asc())
+            .limit(limit)
+            .with_for_update(skip_locked=True),
+        ).all(),
+    )
+    if not events:
+        db.rollback()
+        return OutboxDispatchResult(sink=resolved_sink.name, claimed=0, delivered=0)
+
+    try:
+        resolved_sink.deliver([_outbox_message(event) for event in events])
+    except Exception as exc:
+        error_text = f"{type(exc).__name__}: {exc}"[:1000]
+        retried = 0
+        failed = 0
+        for event in events:
+            event.attempts += 1
+            event.last_error = error_text
+            if event.attempts >= settings.outbox_max_attempts:
+                event.status = "failed"
+                failed += 1
+            else:
+                event.available_at = resolved_now + _retry_delay(event.attempts)
+                retried += 1
+        db.commit()
+        logger.warning(
+            "outbox.delivery_failed sink=%s claimed=%s retried=%s failed=%s error=%s",
+            resolved_sink.name,
+            len(events),
+            retried,
+            failed,
+            error_text,
+        )
+        return OutboxDispatchResult(
+            sink=resolved_sink.name,
+            claimed=len(events),
+            delivered=0,
+            retried=retried,
+            failed=failed,
+        )
+
+    for event in events:
+        event.attempts += 1
+        event.status = "delivered"
+        event.delivered_at = resolved_now
+        event.last_error = None
+    db.commit()
+    return OutboxDispatchResult(
+        sink=resolved_sink.name,
+        claimed=len(events),
+        delivered=len(events),
+    )
+
+
+def drain_outbox(db: Session, *, sink: OutboxSink | None = None) -> OutboxDispatchResult:
+    batch_size = get_settings().outbox_batch_size
+    resolved_sink = sink or build_outbox_sink()
+    total = OutboxDispatchResult(sink=resolved_sink.name, claimed=0, delivered=0)
+    while True:
+        result = dispatch_outbox_batch(db, sink=resolved_sink, batch_size=batch_size)
+        total = OutboxDispatchResult(
+            sink=resolved_sink.name,
+            claimed=total.claimed + result.claimed,
+            delivered=total.delivered + result.delivered,
+            retried=total.retried + result.retried,
+            failed=total.failed + result.failed,
+        )
+        # Stop on a short or failed batch so a broken sink is retried on the next tick.
+        if result.claimed < batch_size or result.delivered == 0:
+            return total
+
+
+def list_outbox_events(
+    db: Session,
+    *,
+    page: int,
+    size: int,
+    status: str | None = None,
+    event_type: str | None = None,
+) -> tuple[list[OutboxEvent], int]:
+    base_query = select(OutboxEvent)
+    count_query = select(func.count()).select_from(OutboxEvent)
+    if status:
+        base_query = base_query.where(OutboxEvent.status == status)
+        count_query = count_query.where(OutboxEvent.status == status)
+    if event_type:
+        base_query = base_query.where(OutboxEvent.event_type == event_type)
+        count_query = count_query.where(OutboxEvent.event_type == event_type)
+
+    total = int(db.scalar(count_query) or 0)
+    records = db.scalars(
+        base_query.order_by(OutboxEvent.created_at.desc(), OutboxEvent.id.desc())
+        .offset((page - 1) * size)
+        .limit(size),
+    ).all()
+    return list(records), total
@@ -1,15 +1,33 @@
 from collections.abc import Generator
+from typing import Any
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import StaticPool
 
+from app.common.rate_limit import get_rate_limiter
 from app.db.base import Base
 from app.db.session import get_db
 from app.main import app
-from app.models import billing, catalog, collections, contract, customer, landing  # noqa: F401
+from app.models import (  # noqa: F401
+    billing,
+    catalog,
+    collections,
+    contract,
+    customer,
+    idempotency,
+    landing,
+    numbering,
+    outbox,
+    rate_limit,
+)
+from app.services.client_search_service import get_client_search_index
+from app.services.customer_overview_service import get_customer_summary_cache
+from app.services.idempotency_service import get_idempotency_cache
+from app.services.landing_draft_service import get_landing_draft_coalescer
+from tests.helpers import QueryCounter
 
 TEST_ENGINE = create_engine(
     "sqlite+pysqlite:///:memory:",
@@ -37,6 +55,11 @@ def client() -> Generator[TestClient, None, None]:
             db.close()
 
     app.dependency_overrides[get_db] = override_get_db
+    get_client_search_index().clear()
+    get_customer_summary_cache().clear()
+    get_idempotency_cache().clear()
+    get_landing_draft_coalescer().clear()
+    get_rate_limiter().reset()
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
@@ -50,3 +73,17 @@ def auth_headers_user() -> dict[str, str]:
 @pytest.fixture
 def auth_headers_admin() -> dict[str, str]:
     return {"X-Actor-Id": "admin-1", "X-Actor-Roles": "admin,billing"}
+
+
+@pytest.fixture
+def query_counter() -> Generator[QueryCounter, None, None]:
+    counter = QueryCounter()
+
+    def record(*args: Any) -> None:
+        counter.statements.append(args[2])
+
+    event.listen(TEST_ENGINE, "before_cursor_execute", record)
+    try:
+        yield counter
+    finally:
+        event.remove(TEST_ENGINE, "before_cursor_execute", record)
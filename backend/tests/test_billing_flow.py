@@ -151,6 +151,24 @@ def test_billing_run_generates_invoice_and_pdf(
     assert pdf_response.status_code == 200
     assert "application/pdf" in (pdf_response.headers.get("content-type") or "")
     assert pdf_response.content.startswith(b"%PDF")
+    etag = pdf_response.headers["etag"]
+    assert etag.startswith('"') and len(etag) == 66
+
+    not_modified = client.get(
+        f"/api/v1/invoices/{invoice_id}/pdf",
+        headers={**auth_headers_admin, "If-None-Match": f"W/{etag}"},
+    )
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+    assert not_modified.content == b""
+
+    partial = client.get(
+        f"/api/v1/invoices/{invoice_id}/pdf",
+        headers={**auth_headers_admin, "Range": "bytes=0-9"},
+    )
+    assert partial.status_code == 206
+    assert partial.headers["content-range"] == f"bytes 0-9/{len(pdf_response.content)}"
+    assert partial.content == pdf_response.content[:10]
 
 
 def test_billing_run_idempotency_replay_and_conflict(
@@ -1,7 +1,26 @@
-from datetime import date
+import threading
+from collections.abc import Generator
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
 from decimal import Decimal
+from pathlib import Path
+from typing import Any
 
+import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import ORMExecuteState, Session, sessionmaker
+
+from app.common.errors import ApiException
+from app.db.base import Base
+from app.models.billing import BillingRun, Invoice
+from app.models.collections import Payment
+from app.models.customer import Client
+from app.schemas.collections import PaymentCreate
+from app.services.collections_service import record_payment
+from tests.helpers import QueryCounter
 
 
 def _create_offer(
@@ -340,3 +359,399 @@ def test_collections_invoice_approve_paid_marks_invoice_settled(
     client_after_response = client.get(f"/api/v1/customers/{client_id}", headers=auth_headers_admin)
     assert client_after_response.status_code == 200
     assert client_after_response.json()["is_delinquent"] is False
+
+
+def test_collections_sweep_flags_delinquency_once_per_client(
+    client: TestClient,
+    auth_headers_admin: dict[str, str],
+) -> None:
+    client_id, _ = _setup_overdue_invoice(client, auth_headers_admin, cin="COLL1005")
+    _run_billing(
+        client,
+        auth_headers_admin,
+        key="billing-COLL1005-dec",
+        period_start="2025-12-01",
+        period_end="2025-12-31",
+    )
+
+    first_sweep = client.get("/api/v1/collections/cases?page=1&size=20", headers=auth_headers_admin)
+    assert first_sweep.status_code == 200
+    assert first_sweep.json()["meta"]["total"] == 2
+    flagged = client.get(f"/api/v1/customers/{client_id}", headers=auth_headers_admin).json()
+    assert flagged["is_delinquent"] is True
+    assert flagged["delinquent_since"] is not None
+
+    second_sweep = client.get("/api/v1/collections/overview", headers=auth_headers_admin)
+    assert second_sweep.status_code == 200
+    unchanged = client.get(f"/api/v1/customers/{client_id}", headers=auth_headers_admin).json()
+    assert unchanged["delinquent_since"] == flagged["delinquent_since"]
+
+
+def test_collections_client_payment_allocates_oldest_due_first_and_replays(
+    client: TestClient,
+    auth_headers_admin: dict[str, str],
+) -> None:
+    client_id, november_invoice_id = _setup_overdue_invoice(
+        client,
+        auth_headers_admin,
+        cin="COLL1006",
+    )
+    december_invoice_id = _run_billing(
+        client,
+        auth_headers_admin,
+        key="billing-COLL1006-dec",
+        period_start="2025-12-01",
+        period_end="2025-12-31",
+    )
+
+    endpoint = f"/api/v1/collections/clients/{client_id}/payments"
+    headers = {**auth_headers_admin, "Idempotency-Key": "client-payment-1006"}
+    payload = {"amount": "200.00", "payment_date": date.today().isoformat(), "method": "cash"}
+
+    first = client.post(endpoint, headers=headers, json=payload)
+    assert first.status_code == 200
+    first_payload = first.json()
+    assert first_payload["idempotency_replayed"] is False
+    allocations = first_payload["allocations"]
+    assert [entry["payment"]["invoice_id"] for entry in allocations] == [
+        november_invoice_id,
+        december_invoice_id,
+    ]
+    assert allocations[0]["allocation_state"] == "full"
+    assert allocations[0]["invoice_status"] == "paid"
+    assert allocations[1]["allocation_state"] == "partial"
+    assert Decimal(allocations[0]["payment"]["amount"]) + Decimal(
+        allocations[1]["payment"]["amount"],
+    ) == Decimal("200.00")
+
+    replay = client.post(endpoint, headers=headers, json=payload)
+    assert replay.status_code == 200
+    assert replay.json()["idempotency_replayed"] is True
+    assert [entry["payment"]["id"] for entry in replay.json()["allocations"]] == [
+        entry["payment"]["id"] for entry in allocations
+    ]
+
+    conflict = client.post(endpoint, headers=headers, json={**payload, "amount": "10.00"})
+    assert conflict.status_code == 409
+    assert conflict.json()["error"]["code"] == "idempotency_key_payload_conflict"
+
+    overpay = client.post(
+        endpoint,
+        headers={**auth_headers_admin, "Idempotency-Key": "client-payment-1006-b"},
+        json={**payload, "amount": "5000.00"},
+    )
+    assert overpay.status_code == 422
+    assert overpay.json()["error"]["code"] == "payment_exceeds_outstanding"
+
+    # Client payment keys share nothing with single-invoice payment keys.
+    single = client.post(
+        "/api/v1/collections/payments",
+        headers={**auth_headers_admin, "Idempotency-Key": "client-payment-1006#000"},
+        json={
+            "invoice_id": december_invoice_id,
+            "amount": "1.00",
+            "payment_date": date.today().isoformat(),
+            "method": "cash",
+        },
+    )
+    assert single.status_code == 200, single.json()
+    assert single.json()["idempotency_replayed"] is False
+
+    payments = client.get(
+        f"/api/v1/collections/payments?page=1&size=20&client_id={client_id}",
+        headers=auth_headers_admin,
+    )
+    assert payments.json()["meta"]["total"] == 3
+
+
+def test_collections_sweep_records_daily_aging_snapshot(
+    client: TestClient,
+    auth_headers_admin: dict[str, str],
+) -> None:
+    _, invoice_id = _setup_overdue_invoice(client, auth_headers_admin, cin="COLL1007")
+    partial = client.post(
+        "/api/v1/collections/payments",
+        headers={**auth_headers_admin, "Idempotency-Key": "payment-COLL1007-partial"},
+        json={
+            "invoice_id": invoice_id,
+            "amount": "32.00",
+            "payment_date": date.today().isoformat(),
+            "method": "cash",
+        },
+    )
+    assert partial.status_code == 200
+
+    overview = client.get("/api/v1/collections/overview", headers=auth_headers_admin)
+    assert overview.status_code == 200
+    assert Decimal(overview.json()["total_outstanding_amount"]) == Decimal("100.00")
+    client.get("/api/v1/collections/overview", headers=auth_headers_admin)
+
+    history = client.get("/api/v1/collections/overview/history", headers=auth_headers_admin)
+    assert history.status_code == 200
+    snapshots = history.json()
+    assert len(snapshots) == 1
+    snapshot = snapshots[0]
+    assert snapshot["open_cases"] + snapshot["in_progress_cases"] == 1
+    assert Decimal(snapshot["total_outstanding_amount"]) == Decimal("100.00")
+    assert Decimal(snapshot["category_totals"]["internet"]) == Decimal("100.00")
+    assert Decimal(snapshot["category_totals"]["mobile"]) == Decimal("0.00")
+    assert sum(Decimal(value) for value in snapshot["bucket_totals"].values()) == Decimal(
+        "100.00",
+    )
+
+    past_window = client.get(
+        "/api/v1/collections/overview/history?date_from=2020-01-01&date_to=2020-01-31",
+        headers=auth_headers_admin,
+    )
+    assert past_window.status_code == 200
+    assert past_window.json() == []
+
+    inverted = client.get(
+        "/api/v1/collections/overview/history?date_from=2020-02-01&date_to=2020-01-01",
+        headers=auth_headers_admin,
+    )
+    assert inverted.status_code == 422
+    assert inverted.json()["error"]["code"] == "invalid_snapshot_range"
+
+
+def test_collections_dunning_run_batches_actions_by_rule(
+    client: TestClient,
+    auth_headers_admin: dict[str, str],
+) -> None:
+    _, november_invoice_id = _setup_overdue_invoice(client, auth_headers_admin, cin="COLL1008")
+    december_invoice_id = _run_billing(
+        client,
+        auth_headers_admin,
+        key="billing-COLL1008-dec",
+        period_start="2025-12-01",
+        period_end="2025-12-31",
+    )
+    sweep = client.get("/api/v1/collections/cases?page=1&size=20", headers=auth_headers_admin)
+    assert sweep.json()["meta"]["total"] == 2
+    cases_by_invoice = {case["invoice_id"]: case for case in sweep.json()["data"]}
+
+    november_due = date.fromisoformat(
+        client.get(f"/api/v1/invoices/{november_invoice_id}", headers=auth_headers_admin).json()[
+            "due_date"
+        ],
+    )
+    as_of = november_due + timedelta(days=45)
+    payload = {
+        "as_of": as_of.isoformat(),
+        "rules": [
+            {"action_type": "warning_sent", "aging_buckets": ["31_60", "61_90", "90_plus"]},
+            {"action_type": "reminder_sent", "min_days_past_due": 1},
+        ],
+    }
+
+    endpoint = "/api/v1/collections/dunning/runs"
+    dry_run = client.post(endpoint, headers=auth_headers_admin, json={**payload, "dry_run": True})
+    assert dry_run.status_code == 200
+    assert [rule["matched_cases"] for rule in dry_run.json()["rules"]] == [1, 1]
+    assert dry_run.json()["actions_created"] == 0
+
+    run = client.post(endpoint, headers=auth_headers_admin, json=payload)
+    assert run.status_code == 200
+    result = run.json()
+    assert result["actions_created"] == 2
+    assert result["cases_moved_to_in_progress"] == 2
+    assert result["notifications_queued"] == 2
+
+    november_case_id = cases_by_invoice[november_invoice_id]["id"]
+    december_case_id = cases_by_invoice[december_invoice_id]["id"]
+    november_actions = client.get(
+        f"/api/v1/collections/cases/{november_case_id}/actions",
+        headers=auth_headers_admin,
+    ).json()
+    december_actions = client.get(
+        f"/api/v1/collections/cases/{december_case_id}/actions",
+        headers=auth_headers_admin,
+    ).json()
+    assert "warning_sent" in {action["action_type"] for action in november_actions}
+    assert "reminder_sent" in {action["action_type"] for action in december_actions}
+    assert "reminder_sent" not in {action["action_type"] for action in november_actions}
+
+    cases_after = client.get(
+        "/api/v1/collections/cases?page=1&size=20&status=in_progress",
+        headers=auth_headers_admin,
+    )
+    assert cases_after.json()["meta"]["total"] == 2
+
+    rerun = client.post(endpoint, headers=auth_headers_admin, json=payload)
+    assert rerun.status_code == 200
+    assert rerun.json()["actions_created"] == 0
+
+
+@pytest.fixture
+def file_engine(tmp_path: Path) -> Generator[Engine, None, None]:
+    engine = create_engine(
+        f"sqlite+pysqlite:///{tmp_path / 'concurrency.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+
+    # SQLite ignores FOR UPDATE; taking the write lock at BEGIN is its closest equivalent.
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_begin(dbapi_connection: Any, _record: Any) -> None:
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin_immediate(connection: Any) -> None:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def _seed_overdue_invoices(
+    session_factory: sessionmaker[Session],
+    *,
+    count: int,
+    total: Decimal,
+) -> list[str]:
+    with session_factory() as db:
+        run = BillingRun(
+            period_start=date(2025, 11, 1),
+            period_end=date(2025, 11, 30),
+            idempotency_key="stress-billing-run",
+            request_hash="0" * 64,
+        )
+        db.add(run)
+        db.flush()
+        invoice_ids: list[str] = []
+        for index in range(count):
+            owner = Client(client_type="individual", full_name=f"Stress Client {index}")
+            db.add(owner)
+            db.flush()
+            invoice = Invoice(
+                billing_run_id=run.id,
+                client_id=owner.id,
+                period_start=run.period_start,
+                period_end=run.period_end,
+                due_date=date.today() - timedelta(days=10),
+                status="overdue",
+                subtotal_amount=total,
+                tax_amount=Decimal("0.00"),
+                total_amount=total,
+            )
+            db.add(invoice)
+            db.flush()
+            invoice_ids.append(invoice.id)
+        db.commit()
+    return invoice_ids
+
+
+def test_collections_concurrent_payments_never_overdraw_invoice(file_engine: Engine) -> None:
+    session_factory = sessionmaker(bind=file_engine, autoflush=False, expire_on_commit=False)
+    shared_invoice_id, *other_invoice_ids = _seed_overdue_invoices(
+        session_factory,
+        count=9,
+        total=Decimal("100.00"),
+    )
+
+    # BEGIN IMMEDIATE already serializes SQLite writers, so the outcome below would hold even
+    # without the row lock; check that every posting asks Postgres for it.
+    locking_sql: list[str] = []
+    lock = threading.Lock()
+
+    @event.listens_for(session_factory, "do_orm_execute")
+    def _capture_invoice_locks(orm_execute_state: ORMExecuteState) -> None:
+        sql = str(orm_execute_state.statement.compile(dialect=postgresql.dialect()))
+        if sql.startswith("SELECT invoices.") and sql.endswith("FOR UPDATE"):
+            with lock:
+                locking_sql.append(sql)
+
+    def post(invoice_id: str, key: str) -> str:
+        with session_factory() as db:
+            try:
+                record_payment(
+                    db,
+                    payload=PaymentCreate(
+                        invoice_id=invoice_id,
+                        amount=Decimal("30.00"),
+                        payment_date=date.today(),
+                    ),
+                    idempotency_key=key,
+                    actor_id="stress",
+                )
+            except ApiException as exc:
+                return exc.code
+        return "posted"
+
+    jobs = [(shared_invoice_id, f"stress-shared-{index:03d}") for index in range(12)]
+    jobs += [
+        (invoice_id, f"stress-other-{index:03d}")
+        for index, invoice_id in enumerate(other_invoice_ids)
+    ]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        outcomes = list(pool.map(lambda job: post(*job), jobs))
+
+    assert len(locking_sql) == len(jobs)
+    assert all("WHERE invoices.id = " in sql for sql in locking_sql)
+
+    shared_outcomes = outcomes[:12]
+    assert shared_outcomes.count("posted") == 3
+    assert set(shared_outcomes) <= {"posted", "payment_exceeds_outstanding"}
+    assert outcomes[12:] == ["posted"] * len(other_invoice_ids)
+
+    with session_factory() as db:
+        shared_total = db.scalar(
+            select(func.sum(Payment.amount)).where(Payment.invoice_id == shared_invoice_id),
+        )
+        assert Decimal(str(shared_total)) == Decimal("90.00")
+        assert db.scalar(select(func.count()).select_from(Payment)) == 3 + len(other_invoice_ids)
+
+
+def test_customer_overview_loads_in_fixed_queries_and_caches_balance(
+    client: TestClient,
+    auth_headers_admin: dict[str, str],
+    query_counter: QueryCounter,
+) -> None:
+    client_id, invoice_id = _setup_overdue_invoice(client, auth_headers_admin, cin="COLL4801")
+    sweep = client.get("/api/v1/collections/cases?page=1&size=20", headers=auth_headers_admin)
+    assert sweep.status_code == 200
+    invoice_total = Decimal(
+        client.get(f"/api/v1/invoices/{invoice_id}", headers=auth_headers_admin).json()[
+            "total_amount"
+        ],
+    )
+    endpoint = f"/api/v1/customers/{client_id}/overview"
+
+    query_counter.reset()
+    first = client.get(endpoint, headers=auth_headers_admin)
+    assert first.status_code == 200
+    assert query_counter.count <= 5, query_counter.statements
+    overview = first.json()
+    assert overview["client"]["id"] == client_id
+    assert len(overview["subscribers"]) == 1
+    assert len(overview["open_contracts"]) == 1
+    assert overview["open_contracts"][0]["offer"]["name"] == "Collections Offer COLL4801"
+    assert [invoice["id"] for invoice in overview["recent_invoices"]] == [invoice_id]
+    assert overview["summary_cached"] is False
+    summary = overview["summary"]
+    assert Decimal(summary["outstanding_amount"]) == invoice_total
+    assert Decimal(summary["overdue_amount"]) == invoice_total
+    assert summary["open_invoice_count"] == 1
+    assert summary["overdue_invoice_count"] == 1
+    assert summary["open_collection_case_count"] == 1
+    assert summary["is_delinquent"] is True
+
+    query_counter.reset()
+    cached = client.get(endpoint, headers=auth_headers_admin)
+    assert cached.json()["summary_cached"] is True
+    assert query_counter.count <= 4, query_counter.statements
+
+    payment = client.post(
+        "/api/v1/collections/payments",
+        headers={**auth_headers_admin, "Idempotency-Key": "payment-coll-4801"},
+        json={
+            "invoice_id": invoice_id,
+            "amount": "50.00",
+            "payment_date": date.today().isoformat(),
+            "method": "cash",
+        },
+    )
+    assert payment.status_code == 200
+    refreshed = client.get(endpoint, headers=auth_headers_admin).json()
+    assert refreshed["summary_cached"] is False
+    assert Decimal(refreshed["summary"]["outstanding_amount"]) == invoice_total - Decimal("50.00")
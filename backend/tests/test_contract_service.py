@@ -1,7 +1,24 @@
 import json
-from datetime import date
+from datetime import date, timedelta
 
 from fastapi.testclient import TestClient
+from pytest import MonkeyPatch
+from sqlalchemy import delete, select
+
+from app.core.settings import get_settings
+from app.db.session import get_db
+from app.models.contract import ContractScheduledEvent
+from app.models.customer import Client
+from app.models.outbox import OutboxEvent
+from app.services.audit_service import (
+    pending_contract_audit_events,
+    record_contract_audit_event,
+)
+from app.services.contract_service import (
+    apply_due_contract_events,
+    backfill_contract_expiry_events,
+)
+from tests.helpers import QueryCounter
 
 
 def _create_offer(
@@ -338,6 +355,510 @@ def test_contract_provisioning_auto_new_line_with_identifier_even_if_upgrade_exi
     assert payload["contract"]["subscriber_id"] != existing_subscriber_id
 
 
+def test_contract_batch_provisioning_reports_each_item_and_preloads_lookups(
+    client: TestClient,
+    auth_headers_user: dict[str, str],
+    monkeypatch: MonkeyPatch,
+    query_counter: QueryCounter,
+) -> None:
+    monkeypatch.setattr(get_settings(), "contract_provision_chunk_size", 2)
+    offer_id = _create_offer(client, auth_headers_user, name="Mobile Fleet")
+    client_id = _create_client(client, auth_headers_user, full_name="Fleet Company")
+    existing_subscriber_id = _create_subscriber(
+        client,
+        auth_headers_user,
+        client_id=client_id,
+        identifier="MOB-FLEET-000",
+    )
+    _create_contract(
+        client,
+        auth_headers_user,
+        client_id=client_id,
+        subscriber_id=existing_subscriber_id,
+        offer_id=offer_id,
+    )
+
+    def new_line(identifier: str, *, item_offer_id: str = offer_id) -> dict[str, object]:
+        return {
+            "offer_id": item_offer_id,
+            "client_id": client_id,
+            "contract_start_date": date.today().isoformat(),
+            "provisioning_intent": "new_line",
+            "subscriber": {"service_identifier": identifier},
+        }
+
+    items = [
+        new_line("MOB-FLEET-001"),
+        new_line("MOB-FLEET-002"),
+        new_line("MOB-FLEET-001"),
+        new_line("MOB-FLEET-003", item_offer_id="missing-offer"),
+        new_line("MOB-FLEET-000"),
+        new_line("MOB-FLEET-004"),
+    ]
+    query_counter.reset()
+    response = client.post(
+        "/api/v1/contracts/provision/batch",
+        headers=auth_headers_user,
+        json={"items": items},
+    )
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["provisioned_count"] == 3
+    assert payload["failed_count"] == 3
+    assert [item["index"] for item in payload["items"]] == list(range(6))
+    assert [item["status"] for item in payload["items"]] == [
+        "provisioned",
+        "provisioned",
+        "failed",
+        "failed",
+        "failed",
+        "provisioned",
+    ]
+    assert payload["items"][2]["error"]["code"] == "subscriber_identifier_conflict"
+    assert payload["items"][3]["error"]["code"] == "offer_not_found"
+    assert payload["items"][4]["error"]["code"] == "subscriber_identifier_conflict"
+    assert payload["items"][0]["result"]["provisioning_mode"] == "new_contract"
+    assert payload["items"][0]["result"]["contract"]["status"] == "active"
+
+    # Offers, clients, candidates and subscribers are read once for the batch, plus one
+    # timestamp reload per committed chunk.
+    selects = [
+        statement
+        for statement in query_counter.statements
+        if statement.lstrip().upper().startswith("SELECT")
+    ]
+    assert len(selects) <= 4 + 3
+
+    contracts = client.get("/api/v1/contracts?page=1&size=20", headers=auth_headers_user)
+    assert contracts.json()["meta"]["total"] == 4
+
+
+def test_contract_audit_events_are_written_in_one_insert_at_commit(
+    client: TestClient,
+    auth_headers_user: dict[str, str],
+    query_counter: QueryCounter,
+) -> None:
+    offer_id = _create_offer(client, auth_headers_user, name="Audit Batch Offer")
+    client_id = _create_client(client, auth_headers_user, full_name="Audit Batch Company")
+    items = [
+        {
+            "offer_id": offer_id,
+            "client_id": client_id,
+            "contract_start_date": date.today().isoformat(),
+            "provisioning_intent": "new_line",
+            "subscriber": {"service_identifier": f"MOB-AUDIT-00{index}"},
+        }
+        for index in range(3)
+    ]
+    query_counter.reset()
+    response = client.post(
+        "/api/v1/contracts/provision/batch",
+        headers=auth_headers_user,
+        json={"items": items},
+    )
+    assert response.status_code == 200
+    assert response.json()["provisioned_count"] == 3
+    audit_inserts = [
+        statement
+        for statement in query_counter.statements
+        if statement.lstrip().upper().startswith("INSERT INTO CONTRACT_AUDIT_EVENTS")
+    ]
+    assert len(audit_inserts) == 1
+
+    contract_id = response.json()["items"][0]["result"]["contract"]["id"]
+    db = next(client.app.dependency_overrides[get_db]())  # type: ignore[attr-defined]
+    try:
+        record_contract_audit_event(db, contract_id, "kept", "auditor")
+        with db.begin_nested():
+            record_contract_audit_event(db, contract_id, "released_savepoint", "auditor")
+        savepoint = db.begin_nested()
+        record_contract_audit_event(db, contract_id, "rolled_back_savepoint", "auditor")
+        savepoint.rollback()
+        assert pending_contract_audit_events(db) == 2
+        db.commit()
+        assert pending_contract_audit_events(db) == 0
+
+        record_contract_audit_event(db, contract_id, "rolled_back_transaction", "auditor")
+        db.rollback()
+        assert pending_contract_audit_events(db) == 0
+
+        # Committing the root while a savepoint is still open writes the savepoint's events too.
+        record_contract_audit_event(db, contract_id, "committed_before_savepoint", "auditor")
+        db.begin_nested()
+        record_contract_audit_event(db, contract_id, "committed_open_savepoint", "auditor")
+        db.commit()
+        assert pending_contract_audit_events(db) == 0
+        root = db.begin()
+        db.begin_nested()
+        record_contract_audit_event(db, contract_id, "root_committed_open_savepoint", "auditor")
+        root.commit()
+        assert pending_contract_audit_events(db) == 0
+        outbox_types = set(
+            db.scalars(
+                select(OutboxEvent.event_type).where(OutboxEvent.aggregate_id == contract_id),
+            ),
+        )
+        assert {
+            "contract.committed_before_savepoint",
+            "contract.committed_open_savepoint",
+            "contract.root_committed_open_savepoint",
+        } <= outbox_types
+    finally:
+        db.close()
+
+    audit = client.get(f"/api/v1/contracts/{contract_id}/audit", headers=auth_headers_user).json()
+    event_types = {event["event_type"] for event in audit}
+    assert {
+        "kept",
+        "released_savepoint",
+        "committed_before_savepoint",
+        "committed_open_savepoint",
+        "root_committed_open_savepoint",
+    } <= event_types
+    assert not {"rolled_back_savepoint", "rolled_back_transaction"} & event_types
+
+
+def test_contract_bulk_status_transitions_by_ids_and_filter(
+    client: TestClient,
+    auth_headers_user: dict[str, str],
+    auth_headers_admin: dict[str, str],
+    monkeypatch: MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(get_settings(), "contract_bulk_status_batch_size", 2)
+    offer_id = _create_offer(client, auth_headers_user, name="Mobile Bulk")
+    delinquent_id = _create_client(client, auth_headers_user, full_name="Bulk Delinquent")
+    healthy_id = _create_client(client, auth_headers_user, full_name="Bulk Healthy")
+    delinquent_contracts = [
+        _create_contract(
+            client,
+            auth_headers_user,
+            client_id=delinquent_id,
+            subscriber_id=_create_subscriber(
+                client,
+                auth_headers_user,
+                client_id=delinquent_id,
+                identifier=f"MOB-BULK-00{index}",
+            ),
+            offer_id=offer_id,
+        )
+        for index in range(3)
+    ]
+    terminated_id = _create_contract(
+        client,
+        auth_headers_user,
+        client_id=delinquent_id,
+        subscriber_id=_create_subscriber(
+            client,
+            auth_headers_user,
+            client_id=delinquent_id,
+            identifier="MOB-BULK-009",
+        ),
+        offer_id=offer_id,
+        status="terminated",
+    )
+    healthy_contract_id = _create_contract(
+        client,
+        auth_headers_user,
+        client_id=healthy_id,
+        subscriber_id=_create_subscriber(
+            client,
+            auth_headers_user,
+            client_id=healthy_id,
+            identifier="MOB-BULK-010",
+        ),
+        offer_id=offer_id,
+    )
+
+    forbidden = client.post(
+        "/api/v1/contracts/status/bulk",
+        headers=auth_headers_user,
+        json={"status": "suspended", "contract_ids": delinquent_contracts},
+    )
+    assert forbidden.status_code == 403
+
+    by_ids = {
+        "status": "suspended",
+        "contract_ids": [*delinquent_contracts[:2], terminated_id, "missing-contract"],
+    }
+    dry_run = client.post(
+        "/api/v1/contracts/status/bulk",
+        headers=auth_headers_admin,
+        json={**by_ids, "dry_run": True},
+    )
+    assert dry_run.status_code == 200
+    assert dry_run.json()["transitions"] == [{"from_status": "active", "count": 2}]
+    unchanged = client.get(
+        f"/api/v1/contracts/{delinquent_contracts[0]}",
+        headers=auth_headers_user,
+    )
+    assert unchanged.json()["status"] == "active"
+
+    suspended = client.post(
+        "/api/v1/contracts/status/bulk",
+        headers=auth_headers_admin,
+        json=by_ids,
+    )
+    assert suspended.status_code == 200
+    suspended_payload = suspended.json()
+    assert suspended_payload["matched"] == 3
+    assert suspended_payload["changed"] == 2
+    assert suspended_payload["rejected"] == 1
+    assert suspended_payload["rejected_contract_ids"] == [terminated_id]
+    assert suspended_payload["missing_contract_ids"] == ["missing-contract"]
+
+    db = next(client.app.dependency_overrides[get_db]())  # type: ignore[attr-defined]
+    try:
+        delinquent = db.get(Client, delinquent_id)
+        assert delinquent is not None
+        delinquent.is_delinquent = True
+        db.commit()
+    finally:
+        db.close()
+
+    terminated = client.post(
+        "/api/v1/contracts/status/bulk",
+        headers=auth_headers_admin,
+        json={
+            "status": "terminated",
+            "filter": {"delinquent_clients_only": True, "from_statuses": ["active", "suspended"]},
+        },
+    )
+    assert terminated.status_code == 200
+    terminated_payload = terminated.json()
+    assert terminated_payload["changed"] == 3
+    assert terminated_payload["transitions"] == [
+        {"from_status": "active", "count": 1},
+        {"from_status": "suspended", "count": 2},
+    ]
+
+    for contract_id in delinquent_contracts:
+        contract = client.get(f"/api/v1/contracts/{contract_id}", headers=auth_headers_user).json()
+        assert contract["status"] == "terminated"
+        assert contract["end_date"] is not None
+        assert contract["terminated_at"] is not None
+    healthy = client.get(f"/api/v1/contracts/{healthy_contract_id}", headers=auth_headers_user)
+    assert healthy.json()["status"] == "active"
+
+    audit = client.get(
+        f"/api/v1/contracts/{delinquent_contracts[0]}/audit",
+        headers=auth_headers_user,
+    ).json()
+    bulk_details = [
+        json.loads(event["details"])
+        for event in audit
+        if event["event_type"] == "contract_status_changed"
+    ]
+    assert {"from": "active", "to": "suspended", "source": "bulk"} in bulk_details
+    assert {"from": "suspended", "to": "terminated", "source": "bulk"} in bulk_details
+
+
+def test_contract_scheduler_applies_expiry_and_scheduled_offer_changes(
+    client: TestClient,
+    auth_headers_user: dict[str, str],
+) -> None:
+    base_offer_id = _create_offer(client, auth_headers_user, name="Mobile Expiring")
+    next_offer_id = _create_offer(client, auth_headers_user, name="Mobile Next")
+    end_date = date.today() + timedelta(days=30)
+    expiring = client.post(
+        "/api/v1/contracts/provision",
+        headers=auth_headers_user,
+        json={
+            "offer_id": base_offer_id,
+            "contract_start_date": date.today().isoformat(),
+            "end_date": end_date.isoformat(),
+            "client": {"client_type": "individual", "full_name": "Expiring Client"},
+        },
+    )
+    assert expiring.status_code == 200
+    expiring_id = expiring.json()["contract"]["id"]
+    expiring_events = client.get(
+        f"/api/v1/contracts/{expiring_id}/scheduled-events",
+        headers=auth_headers_user,
+    ).json()
+    assert [
+        (event["event_type"], event["status"], event["due_date"]) for event in expiring_events
+    ] == [("terminate", "pending", (end_date + timedelta(days=1)).isoformat())]
+
+    client_id = _create_client(client, auth_headers_user, full_name="Scheduled Change Client")
+    changing_id = _create_contract(
+        client,
+        auth_headers_user,
+        client_id=client_id,
+        subscriber_id=_create_subscriber(
+            client,
+            auth_headers_user,
+            client_id=client_id,
+            identifier="MOB-SCHED-001",
+        ),
+        offer_id=base_offer_id,
+    )
+    invalid = client.post(
+        f"/api/v1/contracts/{changing_id}/scheduled-events",
+        headers=auth_headers_user,
+        json={"event_type": "offer_change", "due_date": date.today().isoformat()},
+    )
+    assert invalid.status_code == 422
+    scheduled = client.post(
+        f"/api/v1/contracts/{changing_id}/scheduled-events",
+        headers=auth_headers_user,
+        json={
+            "event_type": "offer_change",
+            "due_date": (date.today() + timedelta(days=7)).isoformat(),
+            "offer_id": next_offer_id,
+        },
+    )
+    assert scheduled.status_code == 200
+    assert scheduled.json()["status"] == "pending"
+
+    db = next(client.app.dependency_overrides[get_db]())  # type: ignore[attr-defined]
+    try:
+        assert apply_due_contract_events(db, today=date.today()).applied == 0
+        result = apply_due_contract_events(db, today=end_date + timedelta(days=1), batch_size=1)
+        assert (result.applied, result.failed) == (2, 0)
+        assert backfill_contract_expiry_events(db) == 0
+    finally:
+        db.close()
+
+    expired = client.get(f"/api/v1/contracts/{expiring_id}", headers=auth_headers_user).json()
+    assert expired["status"] == "terminated"
+    assert expired["end_date"] == end_date.isoformat()
+    changed = client.get(f"/api/v1/contracts/{changing_id}", headers=auth_headers_user).json()
+    assert changed["status"] == "active"
+    assert changed["offer_id"] == next_offer_id
+    events = client.get(
+        f"/api/v1/contracts/{changing_id}/scheduled-events",
+        headers=auth_headers_user,
+    ).json()
+    assert [event["status"] for event in events] == ["applied"]
+    audit = client.get(f"/api/v1/contracts/{changing_id}/audit", headers=auth_headers_user).json()
+    assert {
+        "from_offer_id": base_offer_id,
+        "to_offer_id": next_offer_id,
+        "source": "schedule",
+        "scheduled_event_id": events[0]["id"],
+    } in [json.loads(event["details"]) for event in audit]
+
+
+def test_contract_expiry_backfill_and_termination_cancels_pending_events(
+    client: TestClient,
+    auth_headers_user: dict[str, str],
+) -> None:
+    offer_id = _create_offer(client, auth_headers_user, name="Mobile Backfill")
+    client_id = _create_client(client, auth_headers_user, full_name="Backfill Client")
+    response = client.post(
+        "/api/v1/contracts",
+        headers=auth_headers_user,
+        json={
+            "client_id": client_id,
+            "subscriber_id": _create_subscriber(
+                client,
+                auth_headers_user,
+                client_id=client_id,
+                identifier="MOB-BACKFILL-001",
+            ),
+            "offer_id": offer_id,
+            "contract_start_date": "2026-02-16",
+            "end_date": "2027-02-15",
+            "status": "active",
+        },
+    )
+    assert response.status_code == 200
+    contract_id = response.json()["id"]
+
+    db = next(client.app.dependency_overrides[get_db]())  # type: ignore[attr-defined]
+    try:
+        db.execute(delete(ContractScheduledEvent))
+        db.commit()
+        assert backfill_contract_expiry_events(db) == 1
+        assert backfill_contract_expiry_events(db) == 0
+    finally:
+        db.close()
+
+    terminated = client.put(
+        f"/api/v1/contracts/{contract_id}/status",
+        headers=auth_headers_user,
+        json={"status": "terminated"},
+    )
+    assert terminated.status_code == 200
+    events = client.get(
+        f"/api/v1/contracts/{contract_id}/scheduled-events",
+        headers=auth_headers_user,
+    ).json()
+    assert [(event["event_type"], event["status"]) for event in events] == [
+        ("terminate", "cancelled"),
+    ]
+
+
+def test_contract_provisioning_query_count_is_capped_for_every_intent(
+    client: TestClient,
+    auth_headers_user: dict[str, str],
+    query_counter: QueryCounter,
+) -> None:
+    offer_id = _create_offer(client, auth_headers_user, name="Mobile Capped")
+    client_id = _create_client(client, auth_headers_user, full_name="Capped Client")
+    contract_id = _create_contract(
+        client,
+        auth_headers_user,
+        client_id=client_id,
+        subscriber_id=_create_subscriber(
+            client,
+            auth_headers_user,
+            client_id=client_id,
+            identifier="MOB-CAP-001",
+        ),
+        offer_id=offer_id,
+    )
+    base = {"offer_id": offer_id, "contract_start_date": date.today().isoformat()}
+    # (request, expected status, maximum statements): offer/client/candidate reads, the
+    # writes themselves (a new number is checked and claimed in the pool), and the final
+    # refresh of the returned contract.
+    cases: list[tuple[dict[str, object], int, int]] = [
+        ({**base, "client": {"client_type": "individual", "full_name": "Capped New"}}, 200, 7),
+        (
+            {
+                **base,
+                "client_id": client_id,
+                "provisioning_intent": "new_line",
+                "subscriber": {"service_identifier": "MOB-CAP-002"},
+            },
+            200,
+            10,
+        ),
+        (
+            {**base, "client_id": client_id, "subscriber": {"service_identifier": "MOB-CAP-001"}},
+            200,
+            7,
+        ),
+        (
+            {
+                **base,
+                "client_id": client_id,
+                "provisioning_intent": "upgrade",
+                "target_contract_id": contract_id,
+                "end_date": "2030-01-01",
+            },
+            200,
+            9,
+        ),
+        ({**base, "client_id": client_id}, 409, 3),
+    ]
+    for body, expected_status, max_statements in cases:
+        query_counter.reset()
+        response = client.post(
+            "/api/v1/contracts/provision",
+            headers=auth_headers_user,
+            json=body,
+        )
+        assert response.status_code == expected_status, response.json()
+        assert query_counter.count <= max_statements, query_counter.statements
+        candidate_loads = [
+            statement
+            for statement in query_counter.statements
+            if statement.startswith("SELECT contracts.") and "JOIN subscribers" in statement
+        ]
+        assert len(candidate_loads) <= 1
+
+
 def test_contract_status_transition_and_offer_change_audit(
     client: TestClient,
     auth_headers_user: dict[str, str],
@@ -422,3 +943,21 @@ def test_contract_status_transition_and_offer_change_audit(
     details = json.loads(offer_change_event["details"])
     assert details["from_offer_id"] == base_offer_id
     assert details["to_offer_id"] == upgraded_offer_id
+
+    filtered_response = client.get(
+        f"/api/v1/contracts/audit?to_offer_id={upgraded_offer_id}",
+        headers=auth_headers_user,
+    )
+    assert filtered_response.status_code == 200
+    filtered = filtered_response.json()
+    assert filtered["meta"]["total"] == 1
+    assert filtered["data"][0]["id"] == offer_change_event["id"]
+    assert json.loads(filtered["data"][0]["details"])["to_offer_id"] == upgraded_offer_id
+
+    no_match_response = client.get(
+        f"/api/v1/contracts/audit?from_offer_id={upgraded_offer_id}"
+        "&event_type=contract_offer_changed",
+        headers=auth_headers_user,
+    )
+    assert no_match_response.status_code == 200
+    assert no_match_response.json()["meta"]["total"] == 0
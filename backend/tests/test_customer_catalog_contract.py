@@ -1,4 +1,17 @@
+import json
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import delete
+from sqlalchemy.dialects import postgresql
+
+from app.core.settings import get_settings
+from app.db.session import get_db
+from app.models.customer import Subscriber
+from app.services.client_search_service import TrigramClientSearch
+from tests.helpers import QueryCounter
 
 
 def _mobile_offer_payload(name: str) -> dict[str, object]:
@@ -382,3 +395,336 @@ def test_new_domain_endpoints_require_authentication(client: TestClient) -> None
     response = client.get("/api/v1/customers")
     assert response.status_code == 401
     assert response.json()["error"]["code"] == "unauthorized"
+
+
+def test_client_search_ranks_name_cin_phone_and_identifier_matches(
+    client: TestClient,
+    auth_headers_user: dict[str, str],
+) -> None:
+    def create(full_name: str, *, cin: str, phone: str) -> str:
+        response = client.post(
+            "/api/v1/customers",
+            headers=auth_headers_user,
+            json={
+                "client_type": "individual",
+                "cin": cin,
+                "full_name": full_name,
+                "email": f"{full_name.split()[0].lower()}@example.com",
+                "phone": phone,
+                "status": "active",
+            },
+        )
+        assert response.status_code == 200
+        return response.json()["id"]
+
+    def search(query: str) -> list[dict[str, object]]:
+        response = client.get(
+            "/api/v1/customers/search",
+            headers=auth_headers_user,
+            params={"q": query},
+        )
+        assert response.status_code == 200
+        return response.json()["results"]
+
+    alice_id = create("Alice Martin", cin="AB123456", phone="+12125550000")
+    alicia_id = create("Alicia Keys", cin="CD654321", phone="+12125550001")
+    bob_id = create("Bob Martinez", cin="EF111111", phone="+12125550002")
+    subscriber_response = client.post(
+        f"/api/v1/customers/{bob_id}/subscribers",
+        headers=auth_headers_user,
+        json={"service_type": "mobile", "service_identifier": "21655123456", "status": "active"},
+    )
+    assert subscriber_response.status_code == 200
+
+    assert [hit["client"]["id"] for hit in search("ali")] == [alice_id, alicia_id]
+    assert [hit["client"]["id"] for hit in search("ali mar")] == [alice_id]
+    msisdn_hits = search("216 55 123")
+    assert [hit["client"]["id"] for hit in msisdn_hits] == [bob_id]
+    assert msisdn_hits[0]["matched_on"] == ["service_identifier"]
+    cin_hits = search("ab1234")
+    assert [hit["client"]["id"] for hit in cin_hits] == [alice_id]
+    assert cin_hits[0]["matched_on"] == ["cin"]
+
+    rename_response = client.put(
+        f"/api/v1/customers/{alice_id}",
+        headers=auth_headers_user,
+        json={"full_name": "Alice Durand"},
+    )
+    assert rename_response.status_code == 200
+    assert [hit["client"]["id"] for hit in search("mart")] == [bob_id]
+    delete_response = client.delete(f"/api/v1/customers/{alicia_id}", headers=auth_headers_user)
+    assert delete_response.status_code == 204
+    assert [hit["client"]["id"] for hit in search("ali")] == [alice_id]
+
+    # A deleted subscriber leaves no updated_at behind; its MSISDN must stop matching.
+    db = next(client.app.dependency_overrides[get_db]())  # type: ignore[attr-defined]
+    db.execute(delete(Subscriber).where(Subscriber.client_id == bob_id))
+    db.commit()
+    assert search("216 55 123") == []
+
+    too_short = client.get(
+        "/api/v1/customers/search",
+        headers=auth_headers_user,
+        params={"q": "al"},
+    )
+    assert too_short.status_code == 422
+
+
+def test_trigram_client_search_matches_digits_of_formatted_numbers() -> None:
+    statement = TrigramClientSearch().statement(["21655123456"], limit=10)
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    # Same expressions as the ix_*_digits_trgm indexes, so the planner can use them.
+    assert "regexp_replace(clients.phone, '\\D', '', 'g') LIKE" in sql
+    assert "regexp_replace(subscribers.service_identifier, '\\D', '', 'g') LIKE" in sql
+
+    text_sql = str(
+        TrigramClientSearch()
+        .statement(["alice", "martin"], limit=10)
+        .compile(dialect=postgresql.dialect()),
+    )
+    assert "regexp_replace" not in text_sql
+
+
+def test_customer_import_streams_rows_and_writes_rejects(
+    client: TestClient,
+    auth_headers_user: dict[str, str],
+    auth_headers_admin: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    monkeypatch.setattr(get_settings(), "customer_import_batch_size", 2)
+    monkeypatch.setattr(get_settings(), "customer_import_rejects_dir", str(tmp_path))
+    existing = client.post(
+        "/api/v1/customers",
+        headers=auth_headers_user,
+        json={"client_type": "individual", "cin": "ZZ000001", "full_name": "Existing Client"},
+    )
+    assert existing.status_code == 200
+    existing_id = existing.json()["id"]
+
+    csv_body = "\n".join(
+        [
+            "cin,client_type,full_name,phone,service_type,service_identifier",
+            "zz000001,individual,Existing Client,,,",
+            "IM000001,individual,Imported One,+21620000001,mobile,21620000001",
+            "IM000001,individual,Imported One,+21620000001,fiber,FIBER-IM-1",
+            "IM000002,business,Imported Two,,mobile,21620000001",
+            "IM000003,alien,Bad Type,,,",
+            ",individual,No Cin Prospect,,,",
+            "ZZ000001,individual,Existing Client,,mobile,21620000009",
+        ],
+    )
+    user_response = client.post(
+        "/api/v1/customers/import",
+        headers={**auth_headers_user, "Content-Type": "text/csv"},
+        content=csv_body,
+    )
+    assert user_response.status_code == 403
+    unsupported = client.post(
+        "/api/v1/customers/import",
+        headers={**auth_headers_admin, "Content-Type": "text/plain"},
+        content=csv_body,
+    )
+    assert unsupported.status_code == 415
+
+    response = client.post(
+        "/api/v1/customers/import",
+        headers={**auth_headers_admin, "Content-Type": "text/csv"},
+        content=csv_body,
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["rows_read"] == 7
+    assert result["clients_created"] == 2
+    assert result["clients_matched"] == 2
+    assert result["subscribers_created"] == 3
+    assert result["rejected_count"] == 3
+    assert [(reject["line"], reject["code"]) for reject in result["rejects_sample"]] == [
+        (2, "client_cin_conflict"),
+        (5, "subscriber_identifier_conflict"),
+        (6, "validation_error"),
+    ]
+    reject_lines = Path(result["reject_file"]).read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["record"]["full_name"] for line in reject_lines] == [
+        "Existing Client",
+        "Imported Two",
+        "Bad Type",
+    ]
+
+    existing_subscribers = client.get(
+        f"/api/v1/customers/{existing_id}/subscribers",
+        headers=auth_headers_user,
+    )
+    assert [item["service_identifier"] for item in existing_subscribers.json()["data"]] == [
+        "21620000009",
+    ]
+
+    # A byte that is not UTF-8 rejects its own row; the rows around it still import.
+    latin1_response = client.post(
+        "/api/v1/customers/import",
+        headers={**auth_headers_admin, "Content-Type": "text/csv"},
+        content=b"\n".join(
+            [
+                b"cin,client_type,full_name",
+                b"EN000001,individual,Before Bad Byte",
+                b"EN000002,individual,Caf\xe9 Latin-1",
+                b"EN000003,individual,After Bad Byte",
+            ],
+        ),
+    )
+    assert latin1_response.status_code == 200
+    latin1_result = latin1_response.json()
+    assert latin1_result["rows_read"] == 3
+    assert latin1_result["clients_created"] == 2
+    assert [
+        (reject["line"], reject["code"], reject["message"])
+        for reject in latin1_result["rejects_sample"]
+    ] == [(3, "parse_error", "Row is not valid UTF-8")]
+
+    ndjson_response = client.post(
+        "/api/v1/customers/import",
+        headers=auth_headers_admin,
+        params={"format": "ndjson"},
+        content="\n".join(
+            [
+                json.dumps(
+                    {
+                        "cin": "IM000001",
+                        "client_type": "individual",
+                        "full_name": "Imported One",
+                        "service_type": "tv",
+                        "service_identifier": "TV-IM-1",
+                        "subscriber_status": "suspended",
+                    },
+                ),
+                "{not json",
+            ],
+        ),
+    )
+    assert ndjson_response.status_code == 200
+    ndjson_result = ndjson_response.json()
+    assert ndjson_result["clients_matched"] == 1
+    assert ndjson_result["subscribers_created"] == 1
+    assert [reject["code"] for reject in ndjson_result["rejects_sample"]] == ["parse_error"]
+    matches = client.get(
+        "/api/v1/customers/search",
+        headers=auth_headers_user,
+        params={"q": "Imported One"},
+    ).json()["results"]
+    assert len(matches) == 1
+    subscribers = client.get(
+        f"/api/v1/customers/{matches[0]['client']['id']}/subscribers",
+        headers=auth_headers_user,
+    ).json()["data"]
+    assert sorted((item["service_identifier"], item["status"]) for item in subscribers) == [
+        ("21620000001", "active"),
+        ("FIBER-IM-1", "active"),
+        ("TV-IM-1", "suspended"),
+    ]
+
+
+def test_prospect_purge_deletes_clients_without_history_in_batches(
+    client: TestClient,
+    auth_headers_user: dict[str, str],
+    auth_headers_admin: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+    query_counter: QueryCounter,
+) -> None:
+    monkeypatch.setattr(get_settings(), "customer_purge_batch_size", 2)
+
+    def create(cin: str, *, identifier: str | None = None) -> str:
+        response = client.post(
+            "/api/v1/customers",
+            headers=auth_headers_user,
+            json={"client_type": "individual", "cin": cin, "full_name": f"Prospect {cin}"},
+        )
+        assert response.status_code == 200
+        client_id = response.json()["id"]
+        if identifier is not None:
+            subscriber_response = client.post(
+                f"/api/v1/customers/{client_id}/subscribers",
+                headers=auth_headers_user,
+                json={"service_type": "mobile", "service_identifier": identifier},
+            )
+            assert subscriber_response.status_code == 200
+        return client_id
+
+    prospect_ids = [
+        create("PURGE001", identifier="+212600000123"),
+        create("PURGE002"),
+        create("PURGE003", identifier="21630000003"),
+    ]
+    customer_id = create("PURGE004", identifier="21630000004")
+    pooled = client.post(
+        "/api/v1/numbering/pools/import",
+        headers=auth_headers_admin,
+        json={"kind": "mobile", "range_start": "600000123", "range_end": "600000123"},
+    )
+    assert pooled.json()["already_assigned"] == 1
+    subscriber_id = client.get(
+        f"/api/v1/customers/{customer_id}/subscribers",
+        headers=auth_headers_user,
+    ).json()["data"][0]["id"]
+    offer_response = client.post(
+        "/api/v1/offers",
+        headers=auth_headers_user,
+        json=_mobile_offer_payload("Purge Guard Offer"),
+    )
+    assert offer_response.status_code == 200
+    contract_response = client.post(
+        "/api/v1/contracts",
+        headers=auth_headers_user,
+        json={
+            "client_id": customer_id,
+            "subscriber_id": subscriber_id,
+            "offer_id": offer_response.json()["id"],
+            "contract_start_date": "2026-02-16",
+            "status": "active",
+        },
+    )
+    assert contract_response.status_code == 200
+
+    query_counter.reset()
+    blocked = client.delete(f"/api/v1/customers/{customer_id}", headers=auth_headers_user)
+    assert blocked.status_code == 409
+    assert blocked.json()["error"]["code"] == "client_delete_blocked"
+    assert query_counter.count == 1, query_counter.statements
+
+    forbidden = client.post("/api/v1/customers/purge-prospects", headers=auth_headers_user)
+    assert forbidden.status_code == 403
+
+    recent = client.post("/api/v1/customers/purge-prospects", headers=auth_headers_admin)
+    assert recent.status_code == 200
+    assert recent.json()["clients_matched"] == 0
+
+    cutoff = (datetime.now(UTC) + timedelta(minutes=1)).isoformat()
+    dry_run = client.post(
+        "/api/v1/customers/purge-prospects",
+        headers=auth_headers_admin,
+        params={"dry_run": "true", "created_before": cutoff},
+    )
+    assert dry_run.status_code == 200
+    assert dry_run.json()["dry_run"] is True
+    assert dry_run.json()["clients_matched"] == 3
+    assert dry_run.json()["clients_deleted"] == 0
+
+    purge = client.post(
+        "/api/v1/customers/purge-prospects",
+        headers=auth_headers_admin,
+        params={"created_before": cutoff},
+    )
+    assert purge.status_code == 200
+    assert {key: value for key, value in purge.json().items() if key != "created_before"} == {
+        "dry_run": False,
+        "clients_matched": 3,
+        "clients_deleted": 3,
+        "subscribers_deleted": 2,
+        "batches": 2,
+    }
+    pool_stats = client.get("/api/v1/numbering/pools/stats", headers=auth_headers_admin).json()
+    assert next(row for row in pool_stats if row["kind"] == "mobile")["released"] == 1
+    for prospect_id in prospect_ids:
+        response = client.get(f"/api/v1/customers/{prospect_id}", headers=auth_headers_user)
+        assert response.status_code == 404
+    kept = client.get(f"/api/v1/customers/{customer_id}", headers=auth_headers_user)
+    assert kept.status_code == 200
@@ -0,0 +1,179 @@
+import time
+from datetime import UTC, date, datetime, timedelta
+
+from fastapi.testclient import TestClient
+from pytest import MonkeyPatch
+from sqlalchemy import select
+
+from app.core.settings import get_settings
+from app.db.session import get_db
+from app.models.idempotency import IdempotencyRecord
+from app.schemas.contract import ContractScheduleRunResult
+from app.schemas.landing import LandingNewSubscriptionSubmitRequest
+from app.services.idempotency_service import (
+    get_reservation_heartbeat,
+    request_hash,
+    run_idempotent,
+)
+
+
+def _create_mobile_offer(client: TestClient, headers: dict[str, str]) -> str:
+    response = client.post(
+        "/api/v1/offers",
+        headers=headers,
+        json={
+            "name": "Idempotent Mobile",
+            "service_category": "mobile",
+            "mobile_data_gb": 10,
+            "mobile_calls_hours": 10,
+            "version": 1,
+            "monthly_fee": "49.90",
+            "status": "active",
+            "valid_from": "2026-01-01",
+            "valid_to": None,
+        },
+    )
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def test_in_progress_reservation_blocks_duplicates_until_it_completes_or_goes_stale(
+    client: TestClient,
+    auth_headers_user: dict[str, str],
+    monkeypatch: MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(get_settings(), "idempotency_wait_timeout_seconds", 0.05)
+    monkeypatch.setattr(get_settings(), "idempotency_wait_poll_seconds", 0.01)
+    offer_id = _create_mobile_offer(client, auth_headers_user)
+    endpoint = "/api/v1/landing/submit/new"
+    headers = {"Idempotency-Key": "idem-flow-0001"}
+    payload = {
+        "service_category": "mobile",
+        "offer_id": offer_id,
+        "cin": "ID12345",
+        "full_name": "Idempotent Client",
+        "contract_start_date": date.today().isoformat(),
+        "mobile_number_mode": "assign_new",
+    }
+
+    db = next(client.app.dependency_overrides[get_db]())  # type: ignore[attr-defined]
+    try:
+        reservation = IdempotencyRecord(
+            operation="landing_submit_new",
+            idempotency_key="idem-flow-0001",
+            request_hash=request_hash(
+                LandingNewSubscriptionSubmitRequest.model_validate(payload).model_dump(mode="json"),
+            ),
+            status="in_progress",
+        )
+        db.add(reservation)
+        db.commit()
+
+        waiting = client.post(endpoint, headers=headers, json=payload)
+        assert waiting.status_code == 409
+        assert waiting.json()["error"]["code"] == "idempotency_request_in_progress"
+
+        reservation.updated_at = datetime.now(UTC) - timedelta(hours=1)
+        db.add(reservation)
+        db.commit()
+
+        taken_over = client.post(endpoint, headers=headers, json=payload)
+        assert taken_over.status_code == 200
+        assert taken_over.json()["idempotency_replayed"] is False
+
+        record = db.scalar(
+            select(IdempotencyRecord)
+            .where(IdempotencyRecord.idempotency_key == "idem-flow-0001")
+            .execution_options(populate_existing=True),
+        )
+        assert record is not None
+        assert record.status == "completed"
+    finally:
+        db.close()
+
+    replay = client.post(endpoint, headers=headers, json=payload)
+    assert replay.status_code == 200
+    assert replay.json()["idempotency_replayed"] is True
+    assert replay.json()["contract"]["id"] == taken_over.json()["contract"]["id"]
+
+
+def test_failed_operation_releases_its_idempotency_key(
+    client: TestClient,
+    auth_headers_admin: dict[str, str],
+) -> None:
+    headers = {**auth_headers_admin, "Idempotency-Key": "idem-flow-0002"}
+    missing_invoice = client.post(
+        "/api/v1/collections/payments",
+        headers=headers,
+        json={
+            "invoice_id": "missing-invoice",
+            "amount": "10.00",
+            "payment_date": date.today().isoformat(),
+            "method": "cash",
+        },
+    )
+    assert missing_invoice.status_code == 404
+
+    run = client.post(
+        "/api/v1/billing/runs",
+        headers=headers,
+        json={"period_start": "2026-01-01", "period_end": "2026-01-31"},
+    )
+    assert run.status_code == 200
+    assert run.json()["idempotency_replayed"] is False
+
+    retried = client.post(
+        "/api/v1/collections/payments",
+        headers=headers,
+        json={
+            "invoice_id": "missing-invoice",
+            "amount": "10.00",
+            "payment_date": date.today().isoformat(),
+            "method": "cash",
+        },
+    )
+    assert retried.status_code == 404
+
+
+def test_long_running_reservation_heartbeat_keeps_it_from_going_stale(
+    client: TestClient,
+) -> None:
+    heartbeat = get_reservation_heartbeat()
+    db = next(client.app.dependency_overrides[get_db]())  # type: ignore[attr-defined]
+    heartbeats: list[datetime] = []
+
+    def reservation_updated_at() -> datetime:
+        record = db.scalar(
+            select(IdempotencyRecord)
+            .where(IdempotencyRecord.idempotency_key == "idem-flow-0003")
+            .execution_options(populate_existing=True),
+        )
+        assert record is not None
+        assert record.status == "in_progress"
+        return record.updated_at
+
+    def slow_operation() -> ContractScheduleRunResult:
+        heartbeats.append(reservation_updated_at())
+        time.sleep(0.05)
+        # The shared worker does this once a reservation is older than its interval.
+        assert heartbeat.refresh() == 0
+        assert heartbeat.refresh(min_age_seconds=0) == 1
+        heartbeats.append(reservation_updated_at())
+        return ContractScheduleRunResult(applied=1, failed=0)
+
+    try:
+        _, replayed = run_idempotent(
+            db,
+            operation="heartbeat_test",
+            idempotency_key="idem-flow-0003",
+            request_payload={"value": 1},
+            response_model=ContractScheduleRunResult,
+            execute=slow_operation,
+        )
+    finally:
+        db.close()
+
+    assert replayed is False
+    assert heartbeats[1] > heartbeats[0]
+    # Finished reservations are no longer refreshed.
+    assert heartbeat.refresh(min_age_seconds=0) == 0
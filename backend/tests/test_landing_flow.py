@@ -1,9 +1,16 @@
-from datetime import date
+from datetime import UTC, date, datetime, timedelta
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
 
 from fastapi.testclient import TestClient
 from pytest import MonkeyPatch
 
-from app.services import landing_service
+from app.api.v1.endpoints import landing as landing_endpoints
+from app.core.settings import get_settings
+from app.db.session import get_db
+from app.services import idempotency_service, landing_draft_service, landing_service
+from tests.helpers import QueryCounter
 
 
 def _create_offer(
@@ -182,6 +189,38 @@ def test_landing_new_mobile_subscription_creates_client_contract_and_number(
     assert pdf_response.status_code == 200
     assert "application/pdf" in (pdf_response.headers.get("content-type") or "")
     assert pdf_response.content.startswith(b"%PDF-1.4")
+    etag = pdf_response.headers["etag"]
+
+    partial = client.get(payload["document_download_url"], headers={"Range": "bytes=0-9"})
+    assert partial.status_code == 206
+    assert partial.headers["content-range"] == f"bytes 0-9/{len(pdf_response.content)}"
+    assert partial.content == pdf_response.content[:10]
+
+    # Revalidation is answered from the stored hash without touching the file.
+    db = next(client.app.dependency_overrides[get_db]())  # type: ignore[attr-defined]
+    try:
+        document = landing_service.resolve_contract_document_for_download(
+            db,
+            contract_id=payload["contract"]["id"],
+            access_token=parse_qs(urlsplit(payload["document_download_url"]).query)["token"][0],
+        )
+    finally:
+        db.close()
+    document_path = Path(document.file_path)
+    moved_path = document_path.with_suffix(".moved")
+    document_path.rename(moved_path)
+    try:
+        not_modified = client.get(
+            payload["document_download_url"],
+            headers={"If-None-Match": etag},
+        )
+        assert not_modified.status_code == 304
+        assert not_modified.headers["etag"] == etag
+        assert not_modified.content == b""
+        missing = client.get(payload["document_download_url"])
+        assert missing.status_code == 404
+    finally:
+        moved_path.rename(document_path)
 
     audit_response = client.get(
         f"/api/v1/contracts/{payload['contract']['id']}/audit",
@@ -205,6 +244,91 @@ def test_landing_new_mobile_subscription_creates_client_contract_and_number(
     assert any(item["cin"] == "AA12345" for item in clients)
 
 
+def test_landing_contract_document_renders_after_submit_response(
+    client: TestClient,
+    auth_headers_user: dict[str, str],
+    monkeypatch: MonkeyPatch,
+) -> None:
+    offer_id = _create_offer(
+        client,
+        auth_headers_user,
+        name="Mobile Async",
+        service_category="mobile",
+    )
+    queued: list[tuple[Any, str]] = []
+    monkeypatch.setattr(
+        landing_endpoints,
+        "render_pending_contract_document",
+        lambda bind, *, contract_id: queued.append((bind, contract_id)),
+    )
+
+    response = client.post(
+        "/api/v1/landing/submit/new",
+        headers={"Idempotency-Key": "landing-async-doc-0001"},
+        json={
+            "service_category": "mobile",
+            "offer_id": offer_id,
+            "cin": "AD12345",
+            "full_name": "Async Document",
+            "email": "async-document@example.com",
+            "contract_start_date": date.today().isoformat(),
+            "mobile_number_mode": "assign_new",
+        },
+    )
+    assert response.status_code == 200
+    contract_id = response.json()["contract"]["id"]
+    assert [queued_contract_id for _, queued_contract_id in queued] == [contract_id]
+
+    pending = client.get(response.json()["document_download_url"])
+    assert pending.status_code == 202
+    assert pending.headers["retry-after"] == str(
+        get_settings().contract_document_retry_after_seconds,
+    )
+    assert pending.json()["status"] == "pending"
+
+    landing_service.render_pending_contract_document(queued[0][0], contract_id=contract_id)
+    ready = client.get(response.json()["document_download_url"])
+    assert ready.status_code == 200
+    assert ready.content.startswith(b"%PDF")
+
+
+def test_landing_contract_document_renders_inline_when_background_render_stalls(
+    client: TestClient,
+    monkeypatch: MonkeyPatch,
+    auth_headers_user: dict[str, str],
+) -> None:
+    offer_id = _create_offer(
+        client,
+        auth_headers_user,
+        name="Mobile Stall",
+        service_category="mobile",
+    )
+    monkeypatch.setattr(
+        landing_endpoints,
+        "render_pending_contract_document",
+        lambda _bind, *, contract_id: None,
+    )
+    response = client.post(
+        "/api/v1/landing/submit/new",
+        headers={"Idempotency-Key": "landing-async-doc-0002"},
+        json={
+            "service_category": "mobile",
+            "offer_id": offer_id,
+            "cin": "AD67890",
+            "full_name": "Stalled Document",
+            "email": "stalled-document@example.com",
+            "contract_start_date": date.today().isoformat(),
+            "mobile_number_mode": "assign_new",
+        },
+    )
+    assert response.status_code == 200
+
+    monkeypatch.setattr(get_settings(), "contract_document_render_timeout_seconds", -1)
+    recovered = client.get(response.json()["document_download_url"])
+    assert recovered.status_code == 200
+    assert recovered.content.startswith(b"%PDF")
+
+
 def test_landing_existing_mobile_number_can_upgrade_existing_contract(
     client: TestClient,
     auth_headers_user: dict[str, str],
@@ -410,6 +534,72 @@ def test_landing_lookup_subscriptions_by_cin_returns_eligible_offers(
     assert len(subscription["eligible_offers"]) >= 1
 
 
+def test_landing_lookup_subscriptions_runs_fixed_number_of_queries(
+    client: TestClient,
+    auth_headers_user: dict[str, str],
+    query_counter: QueryCounter,
+) -> None:
+    mobile_offer_ids = [
+        _create_offer(client, auth_headers_user, name=f"Mobile {index}", service_category="mobile")
+        for index in range(3)
+    ]
+    _create_offer(client, auth_headers_user, name="Fiber 500", service_category="internet")
+    client_id = _create_client(client, auth_headers_user, full_name="Fleet Owner", cin="CQ12345")
+
+    def lookup_query_count() -> tuple[int, dict[str, Any]]:
+        lookup_token = _verify_lookup_token(client, cin="CQ12345")
+        query_counter.reset()
+        response = client.get(
+            "/api/v1/landing/clients/CQ12345/subscriptions",
+            params={"lookup_token": lookup_token},
+        )
+        assert response.status_code == 200
+        return query_counter.count, response.json()
+
+    for index in range(2):
+        subscriber_id = _create_subscriber(
+            client,
+            auth_headers_user,
+            client_id=client_id,
+            service_type="mobile",
+            service_identifier=f"+21261234{index:04d}",
+        )
+        _create_contract(
+            client,
+            auth_headers_user,
+            client_id=client_id,
+            subscriber_id=subscriber_id,
+            offer_id=mobile_offer_ids[index % len(mobile_offer_ids)],
+        )
+    small_count, small_payload = lookup_query_count()
+
+    for index in range(2, 12):
+        subscriber_id = _create_subscriber(
+            client,
+            auth_headers_user,
+            client_id=client_id,
+            service_type="mobile",
+            service_identifier=f"+21261234{index:04d}",
+        )
+        _create_contract(
+            client,
+            auth_headers_user,
+            client_id=client_id,
+            subscriber_id=subscriber_id,
+            offer_id=mobile_offer_ids[index % len(mobile_offer_ids)],
+        )
+    large_count, large_payload = lookup_query_count()
+
+    assert len(small_payload["subscriptions"]) == 2
+    assert len(large_payload["subscriptions"]) == 12
+    assert large_count == small_count
+    assert large_count <= 4
+    for subscription in large_payload["subscriptions"]:
+        eligible_ids = {offer["id"] for offer in subscription["eligible_offers"]}
+        assert subscription["current_offer"]["id"] not in eligible_ids
+        assert len(eligible_ids) == 2
+
+
 def test_landing_lookup_invoices_by_cin_and_download_pdf(
     client: TestClient,
     auth_headers_user: dict[str, str],
@@ -473,6 +663,102 @@ def test_landing_lookup_invoices_by_cin_and_download_pdf(
     assert pdf_response.content.startswith(b"%PDF")
 
 
+def test_landing_lookup_invoices_paginates_with_cursor_and_cin_scoped_token(
+    client: TestClient,
+    auth_headers_user: dict[str, str],
+) -> None:
+    offer_id = _create_offer(
+        client,
+        auth_headers_user,
+        name="Fiber Paged Lookup",
+        service_category="internet",
+        service_type="fiber",
+    )
+    owners: dict[str, str] = {}
+    for cin, identifier in (("PG12345", "+212512340201"), ("PG67890", "+212512340202")):
+        owners[cin] = _create_client(client, auth_headers_user, full_name=f"Paged {cin}", cin=cin)
+        subscriber_id = _create_subscriber(
+            client,
+            auth_headers_user,
+            client_id=owners[cin],
+            service_type="fiber",
+            service_identifier=identifier,
+        )
+        _create_contract(
+            client,
+            auth_headers_user,
+            client_id=owners[cin],
+            subscriber_id=subscriber_id,
+            offer_id=offer_id,
+        )
+    for month in ("03", "04", "05"):
+        run_response = client.post(
+            "/api/v1/billing/runs",
+            headers={**auth_headers_user, "Idempotency-Key": f"landing-paged-lookup-{month}"},
+            json={
+                "period_start": f"2026-{month}-01",
+                "period_end": f"2026-{month}-28",
+                "due_days": 15,
+                "tax_rate": "0.10",
+            },
+        )
+        assert run_response.status_code == 200
+
+    lookup_token = _verify_lookup_token(client, cin="PG12345")
+    first_page = client.get(
+        "/api/v1/landing/clients/PG12345/invoices",
+        params={"lookup_token": lookup_token, "limit": 2},
+    )
+    assert first_page.status_code == 200
+    first_payload = first_page.json()
+    assert len(first_payload["invoices"]) == 2
+    assert first_payload["next_cursor"]
+    tokens = {
+        entry["document_download_url"].split("token=")[1] for entry in first_payload["invoices"]
+    }
+    assert len(tokens) == 1
+
+    second_page = client.get(
+        "/api/v1/landing/clients/PG12345/invoices",
+        params={"lookup_token": lookup_token, "limit": 2, "cursor": first_payload["next_cursor"]},
+    )
+    assert second_page.status_code == 200
+    second_payload = second_page.json()
+    assert len(second_payload["invoices"]) == 1
+    assert second_payload["next_cursor"] is None
+    all_ids = [entry["invoice_id"] for entry in first_payload["invoices"]] + [
+        second_payload["invoices"][0]["invoice_id"],
+    ]
+    assert len(set(all_ids)) == 3
+
+    shared_token = tokens.pop()
+    last_invoice_id = second_payload["invoices"][0]["invoice_id"]
+    pdf_response = client.get(
+        f"/api/v1/landing/invoices/{last_invoice_id}/document",
+        params={"token": shared_token},
+    )
+    assert pdf_response.status_code == 200
+
+    other_token = _verify_lookup_token(client, cin="PG67890")
+    other_page = client.get(
+        "/api/v1/landing/clients/PG67890/invoices",
+        params={"lookup_token": other_token},
+    ).json()
+    foreign_token = other_page["invoices"][0]["document_download_url"].split("token=")[1]
+    forbidden = client.get(
+        f"/api/v1/landing/invoices/{last_invoice_id}/document",
+        params={"token": foreign_token},
+    )
+    assert forbidden.status_code == 403
+
+    bad_cursor = client.get(
+        "/api/v1/landing/clients/PG12345/invoices",
+        params={"lookup_token": lookup_token, "cursor": "not-a-cursor"},
+    )
+    assert bad_cursor.status_code == 422
+    assert bad_cursor.json()["error"]["code"] == "landing_invoice_cursor_invalid"
+
+
 def test_landing_lookup_requires_verification_token(client: TestClient) -> None:
     response = client.get("/api/v1/landing/clients/cc12345/subscriptions")
     assert response.status_code == 422
@@ -576,6 +862,38 @@ def test_landing_plan_change_api_journey_with_cin_lookup_and_pdf_download(
     assert pdf_response.status_code == 200
     assert "application/pdf" in (pdf_response.headers.get("content-type") or "")
     assert pdf_response.content.startswith(b"%PDF-1.4")
+    etag = pdf_response.headers["etag"]
+
+    partial = client.get(payload["document_download_url"], headers={"Range": "bytes=0-9"})
+    assert partial.status_code == 206
+    assert partial.headers["content-range"] == f"bytes 0-9/{len(pdf_response.content)}"
+    assert partial.content == pdf_response.content[:10]
+
+    # Revalidation is answered from the stored hash without touching the file.
+    db = next(client.app.dependency_overrides[get_db]())  # type: ignore[attr-defined]
+    try:
+        document = landing_service.resolve_contract_document_for_download(
+            db,
+            contract_id=payload["contract"]["id"],
+            access_token=parse_qs(urlsplit(payload["document_download_url"]).query)["token"][0],
+        )
+    finally:
+        db.close()
+    document_path = Path(document.file_path)
+    moved_path = document_path.with_suffix(".moved")
+    document_path.rename(moved_path)
+    try:
+        not_modified = client.get(
+            payload["document_download_url"],
+            headers={"If-None-Match": etag},
+        )
+        assert not_modified.status_code == 304
+        assert not_modified.headers["etag"] == etag
+        assert not_modified.content == b""
+        missing = client.get(payload["document_download_url"])
+        assert missing.status_code == 404
+    finally:
+        moved_path.rename(document_path)
 
 
 def test_landing_mobile_number_allocation_retries_on_collision(
@@ -698,3 +1016,129 @@ def test_landing_new_submit_idempotency_replay_and_payload_conflict(
     conflict = client.post(endpoint, headers=headers, json=changed_payload)
     assert conflict.status_code == 409
     assert conflict.json()["error"]["code"] == "idempotency_key_payload_conflict"
+
+
+def test_landing_idempotency_replay_is_cached_and_expired_records_are_purged(
+    client: TestClient,
+    auth_headers_user: dict[str, str],
+    query_counter: QueryCounter,
+) -> None:
+    offer_id = _create_offer(
+        client,
+        auth_headers_user,
+        name="Mobile Replay Cache",
+        service_category="mobile",
+    )
+    endpoint = "/api/v1/landing/submit/new"
+    headers = {"Idempotency-Key": "landing-idem-cache-0001"}
+    payload = {
+        "service_category": "mobile",
+        "offer_id": offer_id,
+        "cin": "DC12345",
+        "full_name": "Cached Replay Client",
+        "contract_start_date": date.today().isoformat(),
+        "mobile_number_mode": "assign_new",
+    }
+
+    first = client.post(endpoint, headers=headers, json=payload)
+    assert first.status_code == 200
+
+    query_counter.reset()
+    replay = client.post(endpoint, headers=headers, json=payload)
+    assert replay.status_code == 200
+    assert replay.json()["idempotency_replayed"] is True
+    assert replay.json()["contract"]["id"] == first.json()["contract"]["id"]
+    assert not [sql for sql in query_counter.statements if "idempotency_records" in sql]
+
+    db = next(client.app.dependency_overrides[get_db]())  # type: ignore[attr-defined]
+    try:
+        retention = timedelta(hours=get_settings().idempotency_retention_hours)
+        assert idempotency_service.purge_expired_idempotency_records(db) == 0
+        purged = idempotency_service.purge_expired_idempotency_records(
+            db,
+            now=datetime.now(UTC) + retention + timedelta(minutes=1),
+            batch_size=1,
+        )
+        assert purged == 1
+    finally:
+        db.close()
+
+    idempotency_service.get_idempotency_cache().clear()
+    changed_payload = dict(payload)
+    changed_payload["full_name"] = "Cached Replay Client Again"
+    reused = client.post(endpoint, headers=headers, json=changed_payload)
+    assert reused.status_code == 200
+    assert reused.json()["idempotency_replayed"] is False
+    assert reused.json()["contract"]["id"] != first.json()["contract"]["id"]
+
+
+def test_landing_draft_merge_patch_coalescing_and_expiry(
+    client: TestClient,
+    monkeypatch: MonkeyPatch,
+) -> None:
+    created = client.post(
+        "/api/v1/landing/drafts",
+        json={
+            "flow_type": "subscribe_new_service",
+            "step": "identity",
+            "payload": {"identity": {"cin": "DR12345", "full_name": "Draft Client"}, "offer": "x"},
+        },
+    )
+    assert created.status_code == 200
+    draft_id = created.json()["id"]
+
+    patched = client.patch(
+        f"/api/v1/landing/drafts/{draft_id}",
+        json={
+            "step": "offer",
+            "payload": {"identity": {"full_name": "Draft Owner"}, "offer": None},
+        },
+    )
+    assert patched.status_code == 200
+    assert patched.json()["step"] == "offer"
+    assert patched.json()["payload"] == {
+        "identity": {"cin": "DR12345", "full_name": "Draft Owner"},
+    }
+
+    monkeypatch.setattr(get_settings(), "landing_draft_coalesce_seconds", 60)
+    for index in range(3):
+        response = client.patch(
+            f"/api/v1/landing/drafts/{draft_id}",
+            json={"payload": {"offer_id": f"offer-{index}"}},
+        )
+        assert response.status_code == 200
+    fetched = client.get(f"/api/v1/landing/drafts/{draft_id}")
+    assert fetched.json()["payload"]["offer_id"] == "offer-2"
+
+    db = next(client.app.dependency_overrides[get_db]())  # type: ignore[attr-defined]
+    try:
+        stored = landing_draft_service.SqlLandingDraftStore().get(db, draft_id)
+        assert stored is not None
+        assert "offer_id" not in stored.payload
+
+        assert landing_draft_service.flush_landing_drafts(db, force=True) == 1
+        stored = landing_draft_service.SqlLandingDraftStore().get(db, draft_id)
+        assert stored is not None
+        assert stored.payload["offer_id"] == "offer-2"
+
+        submitted = client.put(f"/api/v1/landing/drafts/{draft_id}", json={"status": "submitted"})
+        assert submitted.status_code == 200
+        stored = landing_draft_service.SqlLandingDraftStore().get(db, draft_id)
+        assert stored is not None
+        assert stored.status == "submitted"
+
+        ttl = timedelta(hours=get_settings().landing_draft_ttl_hours)
+        assert landing_draft_service.purge_expired_landing_drafts(db) == 0
+        assert (
+            landing_draft_service.purge_expired_landing_drafts(
+                db,
+                now=datetime.now(UTC) + ttl + timedelta(minutes=1),
+            )
+            == 1
+        )
+    finally:
+        db.close()
+
+    missing = client.get(f"/api/v1/landing/drafts/{draft_id}")
+    assert missing.status_code == 404
+    assert missing.json()["error"]["code"] == "landing_draft_not_found"
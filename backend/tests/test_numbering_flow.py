@@ -0,0 +1,197 @@
+from datetime import date
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.settings import get_settings
+from tests.helpers import QueryCounter
+
+
+def _create_mobile_offer(client: TestClient, headers: dict[str, str]) -> str:
+    response = client.post(
+        "/api/v1/offers",
+        headers=headers,
+        json={
+            "name": "Pool Mobile",
+            "service_category": "mobile",
+            "mobile_data_gb": 10,
+            "mobile_calls_hours": 10,
+            "version": 1,
+            "monthly_fee": "49.90",
+            "status": "active",
+            "valid_from": "2026-01-01",
+            "valid_to": None,
+        },
+    )
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def _submit_assign_new(client: TestClient, *, offer_id: str, cin: str, key: str) -> dict[str, Any]:
+    response = client.post(
+        "/api/v1/landing/submit/new",
+        headers={"Idempotency-Key": key},
+        json={
+            "service_category": "mobile",
+            "offer_id": offer_id,
+            "cin": cin,
+            "full_name": "Pool Client",
+            "contract_start_date": date.today().isoformat(),
+            "mobile_number_mode": "assign_new",
+        },
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def _pool_stats(client: TestClient, headers: dict[str, str], kind: str) -> dict[str, Any]:
+    response = client.get("/api/v1/numbering/pools/stats", headers=headers)
+    assert response.status_code == 200
+    return next(row for row in response.json() if row["kind"] == kind)
+
+
+def test_identifier_pool_import_allocation_and_release(
+    client: TestClient,
+    auth_headers_admin: dict[str, str],
+    auth_headers_user: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+    query_counter: QueryCounter,
+) -> None:
+    offer_id = _create_mobile_offer(client, auth_headers_admin)
+    existing = _submit_assign_new(client, offer_id=offer_id, cin="POOL0001", key="pool-0001")
+
+    forbidden = client.post(
+        "/api/v1/numbering/pools/import",
+        headers=auth_headers_user,
+        json={"kind": "mobile", "range_start": "600000000", "range_end": "600000009"},
+    )
+    assert forbidden.status_code == 403
+
+    invalid = client.post(
+        "/api/v1/numbering/pools/import",
+        headers=auth_headers_admin,
+        json={"kind": "mobile", "range_start": "500000000", "range_end": "500000009"},
+    )
+    assert invalid.status_code == 422
+
+    held_nsn = existing["service_identifier"].removeprefix("+212")
+    imported = client.post(
+        "/api/v1/numbering/pools/import",
+        headers=auth_headers_admin,
+        json={"kind": "mobile", "range_start": "600000000", "range_end": "600000002"},
+    )
+    assert imported.status_code == 200
+    assert imported.json()["inserted"] == 3
+    held = client.post(
+        "/api/v1/numbering/pools/import",
+        headers=auth_headers_admin,
+        json={"kind": "mobile", "range_start": held_nsn, "range_end": held_nsn},
+    )
+    assert held.status_code == 200
+    assert held.json()["already_assigned"] == 1
+
+    reimported = client.post(
+        "/api/v1/numbering/pools/import",
+        headers=auth_headers_admin,
+        json={"kind": "mobile", "range_start": "600000000", "range_end": "600000002"},
+    )
+    assert reimported.status_code == 200
+    assert reimported.json()["inserted"] == 0
+    assert reimported.json()["skipped_existing"] == 3
+
+    first = _submit_assign_new(client, offer_id=offer_id, cin="POOL0002", key="pool-0002")
+    second = _submit_assign_new(client, offer_id=offer_id, cin="POOL0003", key="pool-0003")
+    assert first["service_identifier"] == "+212600000000"
+    assert second["service_identifier"] == "+212600000001"
+
+    stats = _pool_stats(client, auth_headers_admin, "mobile")
+    assert stats == {
+        "kind": "mobile",
+        "available": 1,
+        "allocated": 3,
+        "released": 0,
+        "total": 4,
+    }
+
+    terminated = client.put(
+        f"/api/v1/contracts/{first['contract']['id']}/status",
+        headers=auth_headers_user,
+        json={"status": "terminated"},
+    )
+    assert terminated.status_code == 200
+
+    stats = _pool_stats(client, auth_headers_admin, "mobile")
+    assert stats["allocated"] == 2
+    assert stats["released"] == 1
+
+    # Released numbers stay quarantined, so the next allocation takes the remaining free one.
+    third = _submit_assign_new(client, offer_id=offer_id, cin="POOL0004", key="pool-0004")
+    assert third["service_identifier"] == "+212600000002"
+
+    quarantined = client.post(
+        f"/api/v1/customers/{first['contract']['client_id']}/subscribers",
+        headers=auth_headers_user,
+        json={"service_type": "mobile", "service_identifier": "+212600000000"},
+    )
+    assert quarantined.status_code == 409
+    assert quarantined.json()["error"]["code"] == "service_identifier_quarantined"
+
+    # Once the quarantine has passed and the free numbers are gone, the released number is
+    # reused; the terminated subscriber no longer holds it.
+    monkeypatch.setattr(get_settings(), "identifier_release_quarantine_days", 0)
+    query_counter.reset()
+    fourth = _submit_assign_new(client, offer_id=offer_id, cin="POOL0005", key="pool-0005")
+    assert fourth["service_identifier"] == "+212600000000"
+    pool_picks = [
+        statement
+        for statement in query_counter.statements
+        if statement.lstrip().startswith("SELECT")
+        and "FROM service_identifier_pool" in statement
+        and "LIMIT" in statement
+    ]
+    assert len(pool_picks) == 2, query_counter.statements
+    assert all("subscribers" not in statement for statement in pool_picks)
+
+    released_subscriber = client.get(
+        f"/api/v1/subscribers/{first['contract']['subscriber_id']}",
+        headers=auth_headers_user,
+    )
+    assert released_subscriber.status_code == 200
+    assert released_subscriber.json()["status"] == "terminated"
+    # History keeps the number; only live subscribers are unique.
+    assert released_subscriber.json()["service_identifier"] == "+212600000000"
+    assert _pool_stats(client, auth_headers_admin, "mobile")["released"] == 0
+
+
+def test_back_office_provisioning_claims_pool_numbers(
+    client: TestClient,
+    auth_headers_admin: dict[str, str],
+    auth_headers_user: dict[str, str],
+) -> None:
+    offer_id = _create_mobile_offer(client, auth_headers_admin)
+    imported = client.post(
+        "/api/v1/numbering/pools/import",
+        headers=auth_headers_admin,
+        json={"kind": "mobile", "range_start": "600000000", "range_end": "600000001"},
+    )
+    assert imported.status_code == 200
+
+    provisioned = client.post(
+        "/api/v1/contracts/provision",
+        headers=auth_headers_user,
+        json={
+            "offer_id": offer_id,
+            "contract_start_date": date.today().isoformat(),
+            "client": {"client_type": "individual", "full_name": "Hand Entered"},
+            "subscriber": {"service_identifier": "+212600000000"},
+        },
+    )
+    assert provisioned.status_code == 200, provisioned.json()
+    stats = _pool_stats(client, auth_headers_admin, "mobile")
+    assert stats["available"] == 1
+    assert stats["allocated"] == 1
+
+    # Automatic allocation skips the hand-entered number instead of conflicting on it.
+    assigned = _submit_assign_new(client, offer_id=offer_id, cin="POOL0101", key="pool-0101")
+    assert assigned["service_identifier"] == "+212600000001"
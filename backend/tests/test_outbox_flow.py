@@ -0,0 +1,152 @@
+import json
+from collections.abc import Generator
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.base import Base
+from app.models.outbox import OutboxEvent
+from app.services.outbox_service import dispatch_outbox_batch, enqueue_event
+
+
+def _create_contract(client: TestClient, headers: dict[str, str]) -> str:
+    offer = client.post(
+        "/api/v1/offers",
+        headers=headers,
+        json={
+            "name": "Outbox Mobile",
+            "service_category": "mobile",
+            "mobile_data_gb": 10,
+            "mobile_calls_hours": 10,
+            "version": 1,
+            "monthly_fee": "49.90",
+            "status": "active",
+            "valid_from": "2025-01-01",
+            "valid_to": None,
+        },
+    )
+    assert offer.status_code == 200
+    customer = client.post(
+        "/api/v1/customers",
+        headers=headers,
+        json={"client_type": "individual", "full_name": "Outbox Client", "status": "active"},
+    )
+    assert customer.status_code == 200
+    subscriber = client.post(
+        f"/api/v1/customers/{customer.json()['id']}/subscribers",
+        headers=headers,
+        json={"service_type": "mobile", "service_identifier": "+212612340001", "status": "active"},
+    )
+    assert subscriber.status_code == 200
+    contract = client.post(
+        "/api/v1/contracts",
+        headers=headers,
+        json={
+            "client_id": customer.json()["id"],
+            "subscriber_id": subscriber.json()["id"],
+            "offer_id": offer.json()["id"],
+            "contract_start_date": "2025-10-01",
+            "status": "active",
+        },
+    )
+    assert contract.status_code == 200
+    return contract.json()["id"]
+
+
+def test_outbox_records_domain_events_and_dispatches_them(
+    client: TestClient,
+    auth_headers_admin: dict[str, str],
+    auth_headers_user: dict[str, str],
+) -> None:
+    contract_id = _create_contract(client, auth_headers_admin)
+
+    pending = client.get(
+        "/api/v1/admin/outbox/events?page=1&size=20&status=pending",
+        headers=auth_headers_admin,
+    )
+    assert pending.status_code == 200
+    created_events = [
+        event
+        for event in pending.json()["data"]
+        if event["event_type"] == "contract.contract_created"
+    ]
+    assert len(created_events) == 1
+    assert created_events[0]["aggregate_id"] == contract_id
+    assert json.loads(created_events[0]["payload"])["contract_id"] == contract_id
+
+    forbidden = client.post("/api/v1/admin/outbox/dispatch", headers=auth_headers_user)
+    assert forbidden.status_code == 403
+
+    dispatched = client.post("/api/v1/admin/outbox/dispatch", headers=auth_headers_admin)
+    assert dispatched.status_code == 200
+    assert dispatched.json()["delivered"] == pending.json()["meta"]["total"]
+
+    remaining = client.get(
+        "/api/v1/admin/outbox/events?page=1&size=20&status=pending",
+        headers=auth_headers_admin,
+    )
+    assert remaining.json()["meta"]["total"] == 0
+
+
+class _RecordingSink:
+    name = "recording"
+
+    def __init__(self, *, fail: bool = False) -> None:
+        self.fail = fail
+        self.batches: list[list[dict[str, Any]]] = []
+
+    def deliver(self, messages: list[dict[str, Any]]) -> None:
+        if self.fail:
+            raise ConnectionError("downstream unavailable")
+        self.batches.append(messages)
+
+
+@pytest.fixture
+def outbox_session() -> Generator[Session, None, None]:
+    engine = create_engine(
+        "sqlite+pysqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine, expire_on_commit=False)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def test_outbox_dispatch_retries_with_backoff(outbox_session: Session) -> None:
+    enqueue_event(
+        outbox_session,
+        event_type="billing.run_completed",
+        aggregate_type="billing_run",
+        aggregate_id="run-1",
+        payload={"run_id": "run-1"},
+    )
+    outbox_session.commit()
+    now = datetime.now(UTC) + timedelta(seconds=1)
+
+    failed = dispatch_outbox_batch(outbox_session, sink=_RecordingSink(fail=True), now=now)
+    assert (failed.claimed, failed.delivered, failed.retried) == (1, 0, 1)
+    event = outbox_session.query(OutboxEvent).one()
+    assert event.status == "pending"
+    assert event.attempts == 1
+    assert "downstream unavailable" in (event.last_error or "")
+
+    sink = _RecordingSink()
+    too_early = dispatch_outbox_batch(outbox_session, sink=sink, now=now)
+    assert too_early.claimed == 0
+
+    delivered = dispatch_outbox_batch(outbox_session, sink=sink, now=now + timedelta(hours=1))
+    assert delivered.delivered == 1
+    assert sink.batches[0][0]["payload"] == {"run_id": "run-1"}
+    outbox_session.refresh(event)
+    assert event.status == "delivered"
+    assert event.attempts == 2
@@ -0,0 +1,90 @@
+from fastapi.testclient import TestClient
+from pytest import MonkeyPatch
+
+from app.common.rate_limit import (
+    BucketPolicy,
+    DatabaseRateLimitBackend,
+    MemoryRateLimitBackend,
+    get_rate_limiter,
+)
+from app.db.session import get_db
+from tests.helpers import QueryCounter
+
+
+def test_landing_rate_limit_rejects_before_database_work_and_counts(
+    client: TestClient,
+    auth_headers_admin: dict[str, str],
+    monkeypatch: MonkeyPatch,
+    query_counter: QueryCounter,
+) -> None:
+    limiter = get_rate_limiter()
+    monkeypatch.setattr(
+        limiter,
+        "policies",
+        {
+            "ip": BucketPolicy(capacity=100, refill_per_second=0),
+            "cin": BucketPolicy(capacity=2, refill_per_second=0),
+        },
+    )
+
+    for _ in range(2):
+        response = client.post("/api/v1/landing/clients/verify-cin", json={"cin": "RL12345"})
+        assert response.status_code != 429
+
+    query_counter.reset()
+    limited = client.post("/api/v1/landing/clients/verify-cin", json={"cin": " rl12345 "})
+    assert limited.status_code == 429
+    assert limited.json()["error"]["code"] == "rate_limited"
+    assert limited.json()["error"]["details"]["scope"] == "cin"
+    assert int(limited.headers["Retry-After"]) >= 1
+    assert query_counter.count == 0
+
+    path_limited = client.get("/api/v1/landing/clients/RL12345/subscriptions")
+    assert path_limited.status_code == 429
+
+    other_cin = client.post("/api/v1/landing/clients/verify-cin", json={"cin": "RL54321"})
+    assert other_cin.status_code != 429
+
+    stats = client.get("/api/v1/admin/rate-limits", headers=auth_headers_admin)
+    assert stats.status_code == 200
+    scopes = {row["scope"]: row for row in stats.json()["scopes"]}
+    assert scopes["cin"]["limited"] == 2
+    assert scopes["ip"]["allowed"] == 5
+
+
+def test_landing_load_shedding_and_shared_database_buckets(
+    client: TestClient,
+    monkeypatch: MonkeyPatch,
+) -> None:
+    limiter = get_rate_limiter()
+    monkeypatch.setattr(limiter, "max_inflight", 1)
+    assert limiter.try_enter()
+    try:
+        shed = client.get("/api/v1/landing/bootstrap")
+        assert shed.status_code == 503
+        assert shed.json()["error"]["code"] == "service_overloaded"
+    finally:
+        limiter.leave()
+    assert client.get("/api/v1/landing/bootstrap").status_code == 200
+    assert limiter.stats().shed == 1
+
+    session_factory = client.app.dependency_overrides[get_db]  # type: ignore[attr-defined]
+    backend = DatabaseRateLimitBackend(lambda: next(session_factory()), clock=lambda: 1000.0)
+    policy = BucketPolicy(capacity=2, refill_per_second=0.5)
+    decisions = [backend.consume("cin:DB12345", policy=policy) for _ in range(3)]
+    assert [decision.allowed for decision in decisions] == [True, True, False]
+    assert decisions[2].retry_after_seconds == 2.0
+
+    backend.consume("cin:DB54321", policy=policy)
+    later = DatabaseRateLimitBackend(lambda: next(session_factory()), clock=lambda: 1010.0)
+    later.consume("cin:DB54321", policy=policy)
+    assert later.purge_idle(idle_seconds=5, batch_size=1) == 1
+    assert later.purge_idle(idle_seconds=5, batch_size=1) == 0
+    refreshed = [later.consume("cin:DB12345", policy=policy) for _ in range(2)]
+    assert [decision.allowed for decision in refreshed] == [True, True]
+
+    memory = MemoryRateLimitBackend(clock=iter([0.0, 1.0, 2.0, 10.0]).__next__)
+    memory.consume("ip:a", policy=policy)
+    memory.consume("ip:b", policy=policy)
+    memory.consume("ip:a", policy=policy)
+    assert memory.purge_idle(idle_seconds=8.5, batch_size=100) == 1